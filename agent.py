@@ -1,25 +1,22 @@
-import os
-from typing import Optional
-
 from google.adk.planners import BuiltInPlanner
 from google.adk.agents import LlmAgent
-from google.adk.agents.callback_context import CallbackContext
-from google.adk.models import LlmResponse, LlmRequest
 from google.adk.tools.agent_tool import AgentTool
 from google.genai import types
 
-# =========================
-# ENV SETUP
-# =========================
-try:
-    from dotenv import load_dotenv
-
-    load_dotenv()
-except Exception:
-    pass
-
+from config import CHECKPOINTS, FIX_STORE, OVERLAY_FS, SPECULATIVE_FIX_CANDIDATES, MODEL_ROUTING
+from codebase_browser import browse_codebase
+from checkpoint_store import STAGE_OUTPUT_KEYS, checkpoint_completed_stage, skip_completed_stage
+from fix_store import record_fix_on_validation_pass
+from overlay_fs import record_overlay_validation
 from memory_agent import save_memory, get_all_memories
 from callback_tool import memory_search_callback
+from model_router import agent_model, model_routing_callback, escalate_on_validation_failure
+from prompt_cache import stable_prefix_callback, record_cache_usage
+from history_compaction import compact_history_callback
+from speculative_fix import speculative_fix
+from static_sweep import static_sweep
+from symbol_index import query_symbols
+from validation import VALIDATION_PASS, VALIDATION_FAIL
 from file_tools import (
     read_file,
     write_file,
@@ -34,10 +31,24 @@ from file_tools import (
 # AGENTS
 # ========================================
 
+# Callbacks shared by every agent. With model routing enabled the router runs first
+# and picks the model and thinking budget for each call. History is compacted before
+# memory is appended, and stable_prefix_callback runs last so it sees (and caches)
+# the final static prefix of the request.
+before_model_callbacks = [compact_history_callback, memory_search_callback, stable_prefix_callback]
+if MODEL_ROUTING:
+    before_model_callbacks.insert(0, model_routing_callback)
+
+after_model_callbacks = [record_cache_usage]
+
+# Stage checkpoints: a restarted incident skips the agents whose stage already completed
+before_agent_callbacks = [skip_completed_stage] if CHECKPOINTS else []
+after_agent_callbacks = [checkpoint_completed_stage] if CHECKPOINTS else []
+
 # 1. Analyzer Agent: Analyzes the trace and code to find the root cause
 analyzer_agent = LlmAgent(
     name="analyzer_agent",
-    model="gemini-2.5-flash",
+    model=agent_model("gemini-2.5-flash"),
     description="Analyzes faulty code and trace.json to identify root causes.",
     instruction="""
     You are an expert AIOps Analyzer. Your task is to:
@@ -47,54 +58,79 @@ analyzer_agent = LlmAgent(
     4. **IMPORTANT**: First check if the error from trace.json still exists in the current code.
     5. If the code is already fixed (error no longer present), save to memory: "Code already fixed - no action needed" and STOP.
     6. If the error still exists, analyze and identify the root cause.
-    7. Identify the exact line and cause of the failure based on the trace.
-    8. Save your analysis to memory so other agents can access it.
+       Use query_symbols() instead of reading other files to look up definitions, e.g.
+       query_symbols("attributes of User"), query_symbols("definition of load_user"),
+       query_symbols("callers of load_user").
+       Use browse_codebase() to explore large trees (filters, depth, pages; the failing
+       file's neighbourhood comes first) instead of listing every file.
+    7. Once the bug class is known, call static_sweep() (e.g. static_sweep("attributes", "emails"))
+       to find sibling occurrences of the same mistake in other files, and include every
+       occurrence in your analysis.
+    8. Identify the exact line and cause of the failure based on the trace.
+    9. Save your analysis to memory so other agents can access it.
     """,
     tools=[
         check_if_error_exists,
         find_error_source_file,
         find_trace_file,
         list_codebase_files,
+        browse_codebase,
+        query_symbols,
+        static_sweep,
         read_file,
         list_files,
         save_memory,
         get_all_memories,
     ],
-    before_model_callback=memory_search_callback,
+    before_model_callback=before_model_callbacks,
+    after_model_callback=after_model_callbacks,
+    output_key=STAGE_OUTPUT_KEYS["analyzer_agent"][1],
+    before_agent_callback=before_agent_callbacks,
+    after_agent_callback=after_agent_callbacks,
 )
 
 # 2. Fixer Agent: Proposes and applies the fix
 fixer_agent = LlmAgent(
     name="fixer_agent",
-    model="gemini-2.5-flash",
+    model=agent_model("gemini-2.5-flash"),
     description="Fixes the faulty code based on analysis.",
     instruction="""
     You are an expert AIOps Fixer. Your task is to:
     1. Retrieve the analysis from memory or from the analyzer_agent.
     2. Use find_error_source_file() to get the path of the faulty code file if needed.
     3. Read the faulty code using read_file().
-    4. Apply the necessary fixes to the code.
+    4. Apply the necessary fixes to the code. Check names you are unsure of with
+       query_symbols(), e.g. query_symbols("columns of User").
     5. Use write_file(original_file_path, fixed_content) to save the fix.
        IMPORTANT: write_file() will automatically create a new file with 'fixed_' prefix
        in the same directory as the original file. The original file remains unchanged.
        Example: If fixing 'codebase/services/user.py', it creates 'codebase/services/fixed_user.py'
-    6. Save the details of the fix to memory, including the path to the new fixed file.
+    6. If the analysis lists sibling occurrences in other files, fix each of those files the
+       same way with write_file(). Then run static_sweep() with the same checks: it checks your
+       fixed files in place of their originals, so any finding left in them still needs fixing.
+    7. Save the details of the fix to memory, including the paths to all new fixed files.
     """,
     tools=[
         find_error_source_file,
         find_trace_file,
+        query_symbols,
+        static_sweep,
         read_file,
         write_file,
         save_memory,
         get_all_memories,
     ],
-    before_model_callback=memory_search_callback,
+    before_model_callback=before_model_callbacks,
+    after_model_callback=after_model_callbacks,
+    output_key=STAGE_OUTPUT_KEYS["fixer_agent"][1],
+    before_agent_callback=before_agent_callbacks,
+    after_agent_callback=after_agent_callbacks,
 )
 
 # 3. Validator Agent: Validates the fix by running the code
 validator_agent = LlmAgent(
     name="validator_agent",
-    model="gemini-2.5-flash",
+    model=agent_model("gemini-2.5-flash"),
     description="Validates the fix by executing the code.",
     instruction="""
     You are an expert AIOps Validator. Your task is to:
@@ -107,7 +143,8 @@ validator_agent = LlmAgent(
     5. Verify the fix in the 'fixed_' file addresses the error from trace.json.
     6. Confirm the fix resolves the issue completely.
     7. Save the validation result to memory.
-    """,
+    8. End your answer with exactly '%s' or '%s'.
+    """ % (VALIDATION_PASS, VALIDATION_FAIL),
     tools=[
         find_error_source_file,
         find_trace_file,
@@ -115,23 +152,22 @@ validator_agent = LlmAgent(
         save_memory,
         get_all_memories,
     ],
-    before_model_callback=memory_search_callback,
+    before_model_callback=before_model_callbacks,
+    after_model_callback=(
+        after_model_callbacks
+        + ([escalate_on_validation_failure] if MODEL_ROUTING else [])
+        + ([record_fix_on_validation_pass] if FIX_STORE else [])
+        + ([record_overlay_validation] if OVERLAY_FS else [])
+    ),
+    output_key=STAGE_OUTPUT_KEYS["validator_agent"][1],
+    before_agent_callback=before_agent_callbacks,
+    after_agent_callback=after_agent_callbacks,
 )
 
 # ========================================
 # ROOT AGENT (ORCHESTRATOR)
 # ========================================
-root_agent = LlmAgent(
-    name="root_agent",
-    model="gemini-2.5-flash",
-    description="AIOps Orchestrator that coordinates analysis, fixing, and validation.",
-    planner=BuiltInPlanner(
-        thinking_config=types.ThinkingConfig(
-            include_thoughts=True,
-            thinking_budget=512,
-        )
-    ),
-    instruction="""
+root_instruction = """
     You are the AIOps Root Agent. Your goal is to fix a faulty application in the codebase folder.
     
     The codebase folder contains:
@@ -148,13 +184,39 @@ root_agent = LlmAgent(
     
     Always use shared memory to pass information between agents.
     The agents have tools to automatically find trace.json and error source files in the codebase folder.
-    """,
-    tools=[
-        AgentTool(analyzer_agent),
-        AgentTool(fixer_agent),
-        AgentTool(validator_agent),
-        save_memory,
-        get_all_memories,
-    ],
-    before_model_callback=memory_search_callback,
+    """
+
+root_tools = [
+    AgentTool(analyzer_agent),
+    AgentTool(fixer_agent),
+    AgentTool(validator_agent),
+    save_memory,
+    get_all_memories,
+]
+
+# Speculative mode: several fix candidates are generated and validated in parallel,
+# so a failed validation does not cost another full serial fix -> validate cycle.
+if SPECULATIVE_FIX_CANDIDATES > 1:
+    root_instruction += """
+    Speculative fixing is enabled:
+    - Instead of steps 3-5, call speculative_fix(analysis) with the analyzer's findings.
+      It generates several fix candidates in parallel and keeps the first one that passes validation.
+    - Only fall back to the fixer_agent and validator_agent if speculative_fix reports that no candidate passed.
+    """
+    root_tools.append(speculative_fix)
+
+root_agent = LlmAgent(
+    name="root_agent",
+    model=agent_model("gemini-2.5-flash"),
+    description="AIOps Orchestrator that coordinates analysis, fixing, and validation.",
+    planner=BuiltInPlanner(
+        thinking_config=types.ThinkingConfig(
+            include_thoughts=True,
+            thinking_budget=512,
+        )
+    ),
+    instruction=root_instruction,
+    tools=root_tools,
+    before_model_callback=before_model_callbacks,
+    after_model_callback=after_model_callbacks,
 )
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from incident_context import DEFAULT_PRIORITY, PRIORITIES
+from runtime import AgentRuntime, DEFAULT_QUERY
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class AgentServer:
+    """
+    Long-running server that keeps the agent runtime warm.
+    Incidents are accepted over local HTTP and run on a single background event loop,
+    so every request reuses the same agents, memory index and codebase file index.
+
+    Endpoints:
+        GET  /health             -> {"status": "ok", "uptime_seconds": ...}
+        GET  /metrics/scheduler  -> model call queue depth and wait times per priority
+        POST /incidents          -> body {"query": "...", "priority": "critical|high|normal|low"}
+                                    (both optional), returns the agent output
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.runtime = AgentRuntime()
+        self.loop = asyncio.new_event_loop()
+        self.started_at = time.monotonic()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, query: str, priority: str = DEFAULT_PRIORITY) -> dict:
+        """Runs an incident on the server loop and waits for its result."""
+        started = time.perf_counter()
+        future = asyncio.run_coroutine_threadsafe(
+            self.runtime.run_incident(query, priority=priority), self.loop
+        )
+        output = future.result()
+        return {"status": "success", "output": output, "seconds": round(time.perf_counter() - started, 3)}
+
+    def scheduler_metrics(self) -> dict:
+        """Scheduler metrics, read on the server loop that owns the scheduler's queues."""
+        async def take():
+            from llm_scheduler import get_scheduler
+            return get_scheduler().metrics()
+        return asyncio.run_coroutine_threadsafe(take(), self.loop).result()
+
+    def serve_forever(self):
+        threading.Thread(target=self._run_loop, name="agent-loop", daemon=True).start()
+
+        warm_seconds = asyncio.run_coroutine_threadsafe(self.runtime.warm(), self.loop).result()
+        print(f"🔥 [SERVER] Runtime warmed in {warm_seconds:.2f}s")
+
+        server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        print(f"🚀 [SERVER] Accepting incidents on http://{self.host}:{self.port}/incidents")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _make_handler(agent_server: AgentServer):
+    class IncidentHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics/scheduler":
+                return self._send_json(200, agent_server.scheduler_metrics())
+            if self.path != "/health":
+                return self._send_json(404, {"status": "error", "message": "Not found"})
+            uptime = round(time.monotonic() - agent_server.started_at, 1)
+            self._send_json(200, {"status": "ok", "uptime_seconds": uptime})
+
+        def do_POST(self):
+            if self.path != "/incidents":
+                return self._send_json(404, {"status": "error", "message": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                query = body.get("query") or DEFAULT_QUERY
+                priority = body.get("priority") or DEFAULT_PRIORITY
+                if priority not in PRIORITIES:
+                    raise ValueError(f"unknown priority '{priority}', use one of {', '.join(PRIORITIES)}")
+            except Exception as e:
+                return self._send_json(400, {"status": "error", "message": f"Invalid request: {str(e)}"})
+
+            try:
+                self._send_json(200, agent_server.submit(query, priority))
+            except Exception as e:
+                self._send_json(500, {"status": "error", "message": str(e)})
+
+        def log_message(self, format, *args):
+            print(f"🌐 [SERVER] {self.address_string()} {format % args}")
+
+    return IncidentHandler
+
+
+def submit_incident(
+    query: str = DEFAULT_QUERY,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    priority: str = DEFAULT_PRIORITY,
+) -> dict:
+    """Sends an incident to a running server. Needs only the standard library."""
+    from urllib.request import Request, urlopen
+
+    request = Request(
+        f"http://{host}:{port}/incidents",
+        data=json.dumps({"query": query, "priority": priority}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urlopen(request) as response:
+        return json.loads(response.read())
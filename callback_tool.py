@@ -1,17 +1,8 @@
-import os
-from google.adk.planners import BuiltInPlanner
-from google.adk.agents import LlmAgent
+from typing import Optional
+
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models import LlmResponse, LlmRequest
 from google.genai import types
-from typing import Optional, Union, Awaitable
-from google.adk.tools.agent_tool import AgentTool
-
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except Exception:
-    pass
 
 from memory_agent import search_memory
 
@@ -23,7 +14,8 @@ async def memory_search_callback(
 ) -> Optional[LlmResponse]:
     """
     Runs BEFORE every LLM call to inject memory context.
-    Searches memory based on user's message and adds results to system instruction.
+    Searches memory based on user's message and appends the results as the last
+    content of the request, after the static instruction and the conversation.
     """
     try:
         agent_name = callback_context.agent_name
@@ -51,24 +43,11 @@ async def memory_search_callback(
         else:
             return None  # No memory to inject
 
-        # Inject memory into system instruction
+        # Append memory AFTER the conversation. The system instruction and the
+        # history stay byte-identical between calls, so the provider can reuse its
+        # cached prefix; only this trailing block changes from call to call.
         if memory_context:
-            original_instruction = (
-                llm_request.config.system_instruction
-                or types.Content(role="system", parts=[])
-            )
-
-            # Ensure system_instruction is Content type
-            if not isinstance(original_instruction, types.Content):
-                original_instruction = types.Content(
-                    role="system", parts=[types.Part(text=str(original_instruction))]
-                )
-
-            if not original_instruction.parts:
-                original_instruction.parts.append(types.Part(text=""))
-
-            # Add memory context to system instruction
-            memory_prefix = f"""
+            memory_block = f"""
 ========================================
 RELEVANT MEMORIES FROM PAST CONVERSATIONS
 ========================================
@@ -77,15 +56,10 @@ RELEVANT MEMORIES FROM PAST CONVERSATIONS
 
 IMPORTANT: Apply constraints from memories above when relevant to current query.
 ========================================
-
 """
-
-            # Prepend memory to existing instruction
-            original_text = original_instruction.parts[0].text or ""
-            modified_text = memory_prefix + original_text
-            original_instruction.parts[0].text = modified_text
-
-            llm_request.config.system_instruction = original_instruction
+            llm_request.contents.append(
+                types.Content(role="user", parts=[types.Part(text=memory_block)])
+            )
             print(f"✅ [MEMORY] Injected {memory_count} relevant memories for {agent_name}")
 
         # Return None to proceed with modified request
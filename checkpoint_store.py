@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from config import CHECKPOINT_DB
+from overlay_fs import read_text
+from validation import validation_failed, validation_passed
+
+# ========================================
+# INCIDENT CHECKPOINTS
+# ========================================
+# One row per completed pipeline stage of an incident, in a local SQLite file:
+#   analysis   - the analyzer's findings plus a hash of the traced source file
+#   fix        - the fixer's summary plus the fixed_ files it wrote (recorded in the
+#                session state by write_file) and their hashes
+#   validation - the validator's verdict
+# A restarted run skips every stage that already has a checkpoint. The analysis only
+# counts while the traced source file is unchanged, the fix stage only while its
+# fixed_ files are still there with the same content; fixes that were never committed
+# from an overlay workspace are gone after a restart. A failed validation drops the
+# analysis and the fix, so the retry analyzes and fixes again instead of replaying them.
+
+STAGES = ("analysis", "fix", "validation")
+
+# Session state keys the sub-agents write their final answer to (LlmAgent.output_key)
+STAGE_OUTPUT_KEYS = {
+    "analyzer_agent": ("analysis", "analysis"),
+    "fixer_agent": ("fix", "fix_summary"),
+    "validator_agent": ("validation", "validation_result"),
+}
+
+INCIDENT_STATE_KEY = "incident_id"
+
+
+def incident_id_for(trace_path: str) -> str:
+    """Stable id of an incident: the hash of its trace content."""
+    with open(trace_path, "rb") as f:
+        return "incident-" + hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def traced_source_hash(trace_path: str) -> Optional[str]:
+    """Content hash of the source file of the trace's failing frame; None when it is not in the codebase."""
+    from code_compare import compare_frame
+    from trace_parser import app_frames, load_trace_attributes, parse_stack_frames
+
+    frames = app_frames(parse_stack_frames(load_trace_attributes(trace_path)))
+    file_path = compare_frame(frames[0]).file_path if frames else None
+    if not file_path:
+        return None
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def current_source_hash() -> Optional[str]:
+    """traced_source_hash() of the current incident's trace."""
+    from file_tools import find_trace_file
+    trace_path = find_trace_file()
+    return traced_source_hash(trace_path) if os.path.isfile(trace_path) else None
+
+
+def file_hashes(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Content hash of each path as the incident sees it (its overlay workspace first,
+    then the disk); None for a path that does not exist.
+    """
+    hashes = {}
+    for path in paths:
+        try:
+            hashes[path] = hashlib.sha256(read_text(path).encode()).hexdigest()
+        except OSError:
+            hashes[path] = None
+    return hashes
+
+
+def written_fixed_files(state) -> Dict[str, Optional[str]]:
+    """The fixed_ files this incident's session wrote, with their content hashes."""
+    from file_tools import FIXED_FILES_STATE_KEY
+    return file_hashes((state.get(FIXED_FILES_STATE_KEY) or {}).values())
+
+
+class CheckpointStore:
+
+    def __init__(self, path: str = CHECKPOINT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoints ("
+                " incident_id TEXT NOT NULL, stage TEXT NOT NULL, payload TEXT NOT NULL,"
+                " created_at REAL NOT NULL, PRIMARY KEY (incident_id, stage))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def save(self, incident_id: str, stage: str, payload: dict):
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO checkpoints (incident_id, stage, payload, created_at) VALUES (?, ?, ?, ?)",
+                (incident_id, stage, json.dumps(payload), time.time()),
+            )
+        print(f"💾 [CHECKPOINT] {incident_id}: {stage} done")
+
+    def load(self, incident_id: str) -> Dict[str, dict]:
+        with self._lock, self._connect() as connection:
+            rows = connection.execute(
+                "SELECT stage, payload FROM checkpoints WHERE incident_id = ?", (incident_id,)
+            ).fetchall()
+        return {stage: json.loads(payload) for stage, payload in rows}
+
+    def discard(self, incident_id: str, *stages: str):
+        with self._lock, self._connect() as connection:
+            connection.executemany(
+                "DELETE FROM checkpoints WHERE incident_id = ? AND stage = ?",
+                [(incident_id, stage) for stage in (stages or STAGES)],
+            )
+
+    def completed(self, incident_id: str) -> Dict[str, dict]:
+        """
+        Checkpoints still valid for a restart. An analysis of a traced source file that
+        changed since is dropped with every later stage; a fix whose fixed_ files are gone
+        or were changed since is dropped, together with the validation that depended on it.
+        """
+        checkpoints = self.load(incident_id)
+        analysis = checkpoints.get("analysis")
+        if analysis is not None and analysis.get("source") != current_source_hash():
+            print(f"♻️ [CHECKPOINT] {incident_id}: traced source changed - redoing every stage")
+            self.discard(incident_id)
+            return {}
+        fix = checkpoints.get("fix")
+        if fix is not None:
+            written = fix.get("files", {})
+            current = file_hashes(written)
+            if not written or any(digest is None or current[path] != digest for path, digest in written.items()):
+                print(f"♻️ [CHECKPOINT] {incident_id}: fixed files changed - redoing fix and validation")
+                self.discard(incident_id, "fix", "validation")
+                checkpoints.pop("fix", None)
+                checkpoints.pop("validation", None)
+        return checkpoints
+
+
+_checkpoint_store: Optional[CheckpointStore] = None
+
+
+def get_checkpoint_store() -> CheckpointStore:
+    global _checkpoint_store
+    if _checkpoint_store is None:
+        _checkpoint_store = CheckpointStore()
+    return _checkpoint_store
+
+
+# ========================================
+# AGENT CALLBACKS
+# ========================================
+def _incident_id(callback_context) -> Optional[str]:
+    incident_id = callback_context.state.get(INCIDENT_STATE_KEY)
+    if incident_id:
+        return incident_id
+    from file_tools import find_trace_file
+    trace_path = find_trace_file()
+    return incident_id_for(trace_path) if os.path.isfile(trace_path) else None
+
+
+async def skip_completed_stage(callback_context):
+    """
+    Runs BEFORE a pipeline agent. When its stage already has a valid checkpoint, the
+    stored answer is returned instead of running the agent again.
+    """
+    try:
+        from google.genai import types
+
+        stage, output_key = STAGE_OUTPUT_KEYS[callback_context.agent_name]
+        incident_id = _incident_id(callback_context)
+        checkpoint = get_checkpoint_store().completed(incident_id).get(stage) if incident_id else None
+        if not checkpoint:
+            return None
+        print(f"⏭️ [CHECKPOINT] {incident_id}: reusing {stage} from the previous run")
+        callback_context.state[output_key] = checkpoint["text"]
+        return types.Content(role="model", parts=[types.Part(text=checkpoint["text"])])
+
+    except Exception as e:
+        return None
+
+
+async def checkpoint_completed_stage(callback_context):
+    """Runs AFTER a pipeline agent and checkpoints its stage from the agent's output_key."""
+    try:
+        stage, output_key = STAGE_OUTPUT_KEYS[callback_context.agent_name]
+        text = callback_context.state.get(output_key)
+        incident_id = _incident_id(callback_context)
+        if not text or not incident_id:
+            return None
+
+        store = get_checkpoint_store()
+        if stage == "fix":
+            files = {path: digest for path, digest in written_fixed_files(callback_context.state).items() if digest}
+            if not files:
+                return None  # the fixer did not write anything - nothing to resume from
+            store.save(incident_id, stage, {"text": text, "files": files})
+        elif stage == "validation":
+            # Only a passing validation is final; a failed one is redone on the next attempt
+            if validation_passed(text):
+                store.save(incident_id, stage, {"text": text, "files": written_fixed_files(callback_context.state)})
+            elif validation_failed(text):
+                # The rejected fix and the analysis behind it must not be replayed on the retry
+                print(f"♻️ [CHECKPOINT] {incident_id}: validation failed - dropping analysis and fix")
+                store.discard(incident_id)
+        else:
+            store.save(incident_id, stage, {"text": text, "source": current_source_hash()})
+        return None
+
+    except Exception as e:
+        return None
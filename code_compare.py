@@ -0,0 +1,186 @@
+import ast
+import difflib
+import hashlib
+import re
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from trace_parser import app_frames, load_trace_attributes, parse_stack_frames, relative_app_path, resolve_codebase_file
+
+# ========================================
+# TRACE vs CURRENT CODE COMPARISON
+# ========================================
+# Every app frame in exception.stack_details carries the function body as it was
+# deployed. Comparing it with the same function in the current file tells, without
+# any model call, whether the code at the failing spot has been touched since.
+
+UNCHANGED = "unchanged"
+CHANGED = "changed"
+MISSING = "missing"
+
+# Identifier the exception complains about, per exception message shape
+_OFFENDING_IDENTIFIER_PATTERNS = [
+    (re.compile(r"has no attribute '(\w+)'"), r"\.{}\b"),
+    (re.compile(r"name '(\w+)' is not defined"), r"\b{}\b"),
+    (re.compile(r"(\w+)\(\) (?:missing|takes|got)"), r"\b{}\s*\("),
+]
+
+
+@dataclass
+class FrameComparison:
+    function_name: str
+    file_path: Optional[str]
+    verdict: str
+    traced_hash: str
+    current_hash: Optional[str] = None
+    current_start_line: Optional[int] = None
+    failing_line: Optional[str] = None
+    failing_line_present: Optional[bool] = None
+    current_function: str = ""
+    diff: str = ""
+
+
+def normalize_source(source: str) -> List[str]:
+    """Dedents and drops blank lines, comment-only lines and trailing whitespace."""
+    lines = []
+    for line in textwrap.dedent(source).splitlines():
+        stripped = line.rstrip()
+        if stripped and not stripped.lstrip().startswith("#"):
+            lines.append(stripped)
+    return lines
+
+
+def source_hash(lines: List[str]) -> str:
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def locate_function(source: str, function_name: str, near_line: int = 0) -> Optional[tuple]:
+    """
+    Finds a function by name in a module's source via the AST.
+    Returns (start_line, end_line) including decorators, picking the definition
+    closest to near_line when the name is defined more than once.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return None
+
+    matches = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == function_name:
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            matches.append((start, node.end_lineno))
+    if not matches:
+        return None
+    return min(matches, key=lambda span: abs(span[0] - near_line))
+
+
+def compare_frame(frame: dict, base_directory: str = "codebase") -> FrameComparison:
+    traced_body = frame.get("exception.function_body", "")
+    function_name = frame.get("exception.function_name", "")
+    traced_lines = normalize_source(traced_body)
+    comparison = FrameComparison(function_name=function_name, file_path=None,
+                                 verdict=MISSING, traced_hash=source_hash(traced_lines))
+
+    # The failing line, relative to the traced body
+    start_line, error_line = frame.get("exception.start_line"), frame.get("exception.line")
+    raw_lines = traced_body.splitlines()
+    if isinstance(start_line, int) and isinstance(error_line, int) and 0 <= error_line - start_line < len(raw_lines):
+        comparison.failing_line = raw_lines[error_line - start_line].strip()
+
+    traced_path = frame.get("exception.file", "")
+    candidate = Path(base_directory) / relative_app_path(traced_path)
+    file_path = str(candidate) if candidate.is_file() else resolve_codebase_file(traced_path, base_directory)
+    if not file_path:
+        return comparison
+    comparison.file_path = file_path
+
+    try:
+        current_source = Path(file_path).read_text()
+    except OSError:
+        return comparison
+    span = locate_function(current_source, function_name, start_line if isinstance(start_line, int) else 0)
+    if span is None:
+        return comparison
+
+    # Traces may carry only the head of a long function, so compare the same number of lines
+    current_function = "\n".join(current_source.splitlines()[span[0] - 1:span[1]])
+    current_lines = normalize_source(current_function)[:len(traced_lines)]
+    comparison.current_start_line = span[0]
+    comparison.current_hash = source_hash(current_lines)
+    comparison.verdict = UNCHANGED if comparison.current_hash == comparison.traced_hash else CHANGED
+    if comparison.failing_line:
+        comparison.failing_line_present = any(line.strip() == comparison.failing_line
+                                              for line in current_function.splitlines())
+    if comparison.verdict == CHANGED:
+        comparison.diff = "\n".join(difflib.unified_diff(
+            traced_lines, current_lines, fromfile=f"trace:{function_name}",
+            tofile=f"{file_path}:{function_name}", n=1, lineterm=""))
+    comparison.current_function = current_function
+    return comparison
+
+
+def offending_identifier(error_message: str) -> Optional[tuple]:
+    """Returns (identifier, regex matching its use) for the exception message, if recognised."""
+    for message_pattern, use_pattern in _OFFENDING_IDENTIFIER_PATTERNS:
+        match = message_pattern.search(error_message or "")
+        if match:
+            name = match.group(1)
+            return name, re.compile(use_pattern.format(re.escape(name)))
+    return None
+
+
+@dataclass
+class IncidentVerdict:
+    resolved: bool
+    reason: str
+    error_message: str
+    frame: Optional[FrameComparison] = None
+
+
+def check_incident(trace_path: str, base_directory: str = "codebase") -> IncidentVerdict:
+    """
+    Decides whether the traced error can still happen.
+    An incident counts as resolved only when the failing function has changed, the
+    failing line is gone and the identifier the exception names is no longer used there.
+    Anything less is left to the agents.
+    """
+    attrs = load_trace_attributes(trace_path)
+    error_message = attrs.get("exception.message", "")
+    frames = app_frames(parse_stack_frames(attrs))
+    if not frames:
+        return IncidentVerdict(False, "trace has no application frame with a function body", error_message)
+
+    frame = compare_frame(frames[0], base_directory)
+    if frame.verdict == MISSING:
+        return IncidentVerdict(False, f"function '{frame.function_name}' not found in the current code",
+                               error_message, frame)
+    if frame.verdict == UNCHANGED:
+        return IncidentVerdict(False, "failing function is unchanged since the trace", error_message, frame)
+    if frame.failing_line_present:
+        return IncidentVerdict(False, "failing line is still present", error_message, frame)
+
+    identifier = offending_identifier(error_message)
+    if identifier is None:
+        # Without a recognised identifier there is no positive sign the error is gone
+        return IncidentVerdict(False, "exception message names no identifier to check", error_message, frame)
+    if identifier[1].search(frame.current_function):
+        return IncidentVerdict(False, f"'{identifier[0]}' is still used in the failing function",
+                               error_message, frame)
+    return IncidentVerdict(True, "failing function changed and the failing code is gone", error_message, frame)
+
+
+def format_verdict(verdict: IncidentVerdict) -> str:
+    frame = verdict.frame
+    lines = [f"- Verdict: {'RESOLVED' if verdict.resolved else 'NOT RESOLVED'} ({verdict.reason})"]
+    if frame:
+        lines.append(f"- Function: {frame.function_name} in {frame.file_path or 'unknown file'} "
+                     f"[{frame.verdict}]")
+        if frame.failing_line:
+            lines.append(f"- Failing line in trace: {frame.failing_line}")
+        if frame.diff:
+            lines.append("- Diff (trace -> current):")
+            lines.append(frame.diff)
+    return "\n".join(lines)
@@ -0,0 +1,80 @@
+"""
+Email dispatch benchmark.
+
+Sends a burst of verification emails to a local stub SMTP server twice: once the old
+way (fresh connection and template render per email, as FastMail.send_message does)
+and once through the pooled, batched dispatcher. Checks every email arrived and
+prints emails/s and SMTP connections opened for each:
+
+    python -m app.benchmarks.email_dispatch --emails 500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Send to the stub server started below instead of a real mail server
+os.environ.update({"MAIL_SERVER": "127.0.0.1", "USE_CREDENTIALS": "false", "MAIL_STARTTLS": "false", "MAIL_SSL_TLS": "false"})
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader
+
+from app.benchmarks.smtp_sink import SmtpSink
+from app.config.email import conf
+from app.config.mail_dispatch import mail_dispatcher
+
+TEMPLATE = "user/account-verification.html"
+
+
+def _context(n: int) -> dict:
+    return {"app_name": "Bench", "name": f"User {n}", "activate_url": f"http://localhost/verify?token={n}"}
+
+
+async def _per_email(port: int, emails: int):
+    async def send(n: int):
+        # What each background task did before: new environment, new render, new connection
+        env = Environment(loader=FileSystemLoader(str(conf.TEMPLATE_FOLDER)))
+        html = env.get_template(TEMPLATE).render(**_context(n))
+        message = mail_dispatcher.build_message([f"user{n}@example.com"], "Account Verification", html)
+        await aiosmtplib.send(message, hostname="127.0.0.1", port=port)
+
+    await asyncio.gather(*(send(n) for n in range(emails)))
+
+
+async def _dispatched(emails: int):
+    await mail_dispatcher.start()
+    for n in range(emails):
+        await mail_dispatcher.enqueue([f"user{n}@example.com"], "Account Verification", TEMPLATE, _context(n))
+    await mail_dispatcher.stop()
+
+
+async def run(emails: int):
+    print(f"{'mode':<18}{'emails/s':>10}{'connections':>13}{'delivered':>11}")
+    for name in ("per-email", "dispatcher"):
+        sink = SmtpSink()
+        port = await sink.start()
+        conf.MAIL_PORT = port
+
+        started = time.perf_counter()
+        if name == "per-email":
+            await _per_email(port, emails)
+        else:
+            await _dispatched(emails)
+        elapsed = time.perf_counter() - started
+        await sink.stop()
+
+        print(f"{name:<18}{emails / elapsed:>10.1f}{sink.connections:>13}{sink.messages:>11}")
+        if sink.messages != emails:
+            raise SystemExit(f"{name}: expected {emails} emails, the sink received {sink.messages}")
+    print(f"dispatcher metrics: {mail_dispatcher.metrics.as_dict()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.emails))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Load test for the user service, entirely in-process.
+
+Boots the FastAPI app (with its lifespan) on a scratch SQLite database and a stub
+SMTP sink, seeds verified users, then drives a concurrent mix of register, login,
+refresh and /users/me requests through httpx's ASGI transport. Reports requests/s,
+latency percentiles and error counts per endpoint:
+
+    python -m app.benchmarks.load_test --users 200 --concurrency 32 --duration 20
+
+Run it before and after a change to services/user.py or config/security.py and
+compare the tables. Settings that are not pinned below (for example
+PASSWORD_HASH_WORKERS or AUTH_CACHE_TTL_SECONDS) can be varied through the environment.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+
+from app.benchmarks.smtp_sink import SmtpSink
+
+PASSWORD = "Secret@123"
+ENDPOINTS = {
+    "register": ("POST", "/users"),
+    "login": ("POST", "/auth/login"),
+    "refresh": ("POST", "/auth/refresh"),
+    "me": ("GET", "/users/me"),
+}
+
+
+def _configure(args, smtp_port: int):
+    # Must run before the app is imported: its settings and mail config read the environment once
+    database = os.path.abspath("load_test.db")
+    if os.path.exists(database):
+        os.remove(database)
+    os.environ.update({
+        "DATABASE_URI": f"sqlite:///{database}",
+        "ASYNC_DATABASE_URI": f"sqlite+aiosqlite:///{database}",
+        "DATABASE_ASYNC": "true" if args.db == "async" else "false",
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "FAST_REGISTRATION": "false" if args.legacy_registration else "true",
+        "TOKEN_PURGE_INTERVAL_SECONDS": "0",
+        "MAIL_SERVER": "127.0.0.1",
+        "MAIL_PORT": str(smtp_port),
+        "USE_CREDENTIALS": "false",
+        "MAIL_STARTTLS": "false",
+        "MAIL_SSL_TLS": "false",
+    })
+
+
+def _seed(count: int) -> list:
+    from datetime import datetime
+    from sqlalchemy import insert
+    from app.config.database import Base, SessionLocal, engine
+    from app.config.security import hash_password
+    from app.models.user import User
+
+    Base.metadata.create_all(engine)
+    hashed, now = hash_password(PASSWORD), datetime.utcnow()
+    emails = [f"seed{n}@example.com" for n in range(count)]
+    with SessionLocal() as session:
+        session.execute(insert(User), [
+            {"name": f"Seed {n}", "email": email, "password": hashed, "is_active": True,
+             "verified_at": now, "updated_at": now, "created_at": now}
+            for n, email in enumerate(emails)
+        ])
+        session.commit()
+    return emails
+
+
+def _percentile(values: list, fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+class LoadTest:
+
+    def __init__(self, client, emails: list, mix: dict):
+        self.client = client
+        self.emails = emails
+        self.mix = mix
+        self.sessions = []  # token pairs ready for refresh and /me
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.registered = 0
+
+    async def _call(self, name: str, **kwargs):
+        method, path = ENDPOINTS[name]
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.latencies[name].append(time.perf_counter() - started)
+        if not ok:
+            self.errors[name] += 1
+        return response if ok else None
+
+    async def login(self):
+        data = {"username": random.choice(self.emails), "password": PASSWORD}
+        response = await self._call("login", data=data)
+        if response is not None:
+            self.sessions.append(response.json())
+
+    async def register(self):
+        self.registered += 1
+        email = f"load{self.registered}-{random.getrandbits(32)}@example.com"
+        await self._call("register", json={"name": "Load Test", "email": email, "password": PASSWORD})
+
+    async def refresh(self):
+        if not self.sessions:
+            return await self.login()
+        tokens = self.sessions.pop(random.randrange(len(self.sessions)))
+        response = await self._call("refresh", headers={"refresh-token": tokens["refresh_token"]})
+        if response is not None:
+            self.sessions.append(response.json())
+
+    async def me(self):
+        if not self.sessions:
+            return await self.login()
+        tokens = random.choice(self.sessions)
+        await self._call("me", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+    async def worker(self, deadline: float):
+        names, weights = list(self.mix), list(self.mix.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, random.choices(names, weights)[0])()
+
+    def report(self, elapsed: float):
+        print(f"{'endpoint':<10}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name in ENDPOINTS:
+            values = sorted(self.latencies[name])
+            if not values:
+                continue
+            print(f"{name:<10}{len(values):>10}{len(values) / elapsed:>9.1f}{_percentile(values, 0.5):>9.1f}"
+                  f"{_percentile(values, 0.95):>9.1f}{_percentile(values, 0.99):>9.1f}{self.errors[name]:>8}")
+        total = sum(len(values) for values in self.latencies.values())
+        print(f"{'total':<10}{total:>10}{total / elapsed:>9.1f}")
+
+
+async def run(args):
+    sink = SmtpSink()
+    _configure(args, await sink.start())
+
+    import httpx
+    from app.main import app
+    emails = _seed(args.users)
+    mix = {"register": args.register, "login": args.login, "refresh": args.refresh, "me": args.me}
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            test = LoadTest(client, emails, mix)
+            for _ in range(min(args.concurrency, args.users)):
+                await test.login()
+            test.latencies.clear()
+
+            started = time.perf_counter()
+            deadline = started + args.duration
+            await asyncio.gather(*(test.worker(deadline) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+    await sink.stop()
+
+    print(f"{args.users} seeded users, {args.concurrency} concurrent clients, {elapsed:.1f}s, "
+          f"db={args.db}, bcrypt rounds={args.bcrypt_rounds}")
+    test.report(elapsed)
+    print(f"emails received by the stub sink: {sink.messages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200, help="verified users seeded before the run")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of traffic")
+    parser.add_argument("--db", choices=["async", "sync"], default="async", help="SQLAlchemy session mode")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--legacy-registration", action="store_true",
+                        help="register through create_user_account instead of the single-insert path")
+    parser.add_argument("--register", type=float, default=1, help="weight of register requests in the mix")
+    parser.add_argument("--login", type=float, default=2)
+    parser.add_argument("--refresh", type=float, default=2)
+    parser.add_argument("--me", type=float, default=10)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
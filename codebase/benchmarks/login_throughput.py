@@ -0,0 +1,102 @@
+"""
+Login throughput benchmark.
+
+In-process mode (default) measures password verifications per second, the work that
+dominates /auth/login, with the hashing pool sized from 1 worker up to the core count,
+next to the old blocking call on the event loop:
+
+    python -m app.benchmarks.login_throughput --requests 64
+
+HTTP mode drives /auth/login of a running server (start it with different
+PASSWORD_HASH_WORKERS values to compare):
+
+    python -m app.benchmarks.login_throughput --url http://localhost:8000 --email a@b.com --password Secret@123
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from app.config import security
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+
+async def _blocking_logins(hashed: str, requests: int) -> float:
+    async def login():
+        security.verify_password("Secret@123", hashed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def _pooled_logins(hashed: str, requests: int, workers: int) -> float:
+    settings.PASSWORD_HASH_WORKERS = workers
+    security.shutdown_hash_executor()
+    await security.verify_password_async("Secret@123", hashed)  # start the pool outside the timing
+
+    started = time.perf_counter()
+    await asyncio.gather(*(security.verify_password_async("Secret@123", hashed) for _ in range(requests)))
+    return requests / (time.perf_counter() - started)
+
+
+async def run_in_process(requests: int):
+    hashed = security.hash_password("Secret@123")
+    cores = os.cpu_count() or 1
+    print(f"bcrypt rounds={settings.BCRYPT_ROUNDS}, executor={settings.PASSWORD_HASH_EXECUTOR}, "
+          f"{requests} concurrent logins")
+    print(f"{'mode':<22}{'logins/s':>10}")
+    print(f"{'blocking event loop':<22}{await _blocking_logins(hashed, requests):>10.1f}")
+
+    workers = 1
+    while True:
+        print(f"{f'pool, {workers} workers':<22}{await _pooled_logins(hashed, requests, workers):>10.1f}")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+    security.shutdown_hash_executor()
+
+
+async def run_http(url: str, email: str, password: str, requests: int, concurrency: int):
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        async def login():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/auth/login", data={"username": email, "password": password})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"/auth/login: {requests / elapsed:.1f} req/s, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--url")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_http(args.url, args.email, args.password, args.requests, args.concurrency))
+    else:
+        asyncio.run(run_in_process(args.requests))
+
+
+if __name__ == "__main__":
+    main()
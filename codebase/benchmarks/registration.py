@@ -0,0 +1,99 @@
+"""
+Registration benchmark and concurrency check.
+
+Fires concurrent registrations at a scratch SQLite database, with every email sent
+several times at once, through two paths:
+- check-then-insert: the SELECT / INSERT / COMMIT / refresh flow of create_user_account
+  (with the email attribute spelled correctly)
+- register_user_account: single INSERT guarded by the users.email unique index
+
+For each path it checks that every email ended up in exactly one row, and prints the
+400s, unexpected errors and latency percentiles:
+
+    python -m app.benchmarks.registration --emails 200 --duplicates 4
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Scratch database in async mode, so requests really interleave. Cheap hashing keeps
+# the comparison about the database round trips.
+os.environ.setdefault("DATABASE_URI", "sqlite:///./registration_bench.db")
+os.environ.setdefault("ASYNC_DATABASE_URI", "sqlite+aiosqlite:///./registration_bench.db")
+os.environ.setdefault("DATABASE_ASYNC", "true")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from fastapi import BackgroundTasks, HTTPException
+from sqlalchemy import func, select
+
+from app.config.database import AsyncSessionLocal, Base, commit, engine, execute, refresh
+from app.config.security import hash_password_async
+from app.models.user import User, UserToken
+from app.schemas.user import RegisterUserRequest
+from app.services.user import register_user_account
+
+
+async def check_then_insert(data, session, background_tasks):
+    user_exist = (await execute(session, select(User).where(User.email == data.email))).scalars().first()
+    if user_exist:
+        raise HTTPException(status_code=400, detail="Email is already exists.")
+    user = User(name=data.name, email=data.email, password=await hash_password_async(data.password), is_active=False)
+    session.add(user)
+    await commit(session)
+    await refresh(session, user)
+    return user
+
+
+async def _run(register, emails: int, duplicates: int) -> dict:
+    Base.metadata.drop_all(engine, tables=[UserToken.__table__, User.__table__])
+    Base.metadata.create_all(engine, tables=[User.__table__, UserToken.__table__])
+
+    latencies, outcome = [], {"created": 0, "rejected": 0, "errors": 0}
+
+    async def attempt(n: int):
+        data = RegisterUserRequest(name=f"User {n}", email=f"user{n}@example.com", password="Secret@123")
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as session:
+            try:
+                await register(data, session, BackgroundTasks())
+                outcome["created"] += 1
+            except HTTPException:
+                outcome["rejected"] += 1
+            except Exception:
+                outcome["errors"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(attempt(n) for n in range(emails) for _ in range(duplicates)))
+
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(select(func.count(User.id)))).scalar()
+        distinct = (await session.execute(select(func.count(func.distinct(User.email))))).scalar()
+    latencies.sort()
+    outcome.update(rows=rows, duplicates=rows - distinct,
+                   p50_ms=latencies[len(latencies) // 2] * 1000,
+                   p95_ms=latencies[int(len(latencies) * 0.95) - 1] * 1000)
+    return outcome
+
+
+async def run(emails: int, duplicates: int):
+    print(f"{emails} emails x {duplicates} concurrent attempts")
+    print(f"{'path':<24}{'rows':>6}{'dupes':>7}{'400s':>6}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, register in (("check-then-insert", check_then_insert), ("register_user_account", register_user_account)):
+        result = await _run(register, emails, duplicates)
+        print(f"{name:<24}{result['rows']:>6}{result['duplicates']:>7}{result['rejected']:>6}"
+              f"{result['errors']:>8}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}")
+        if name == "register_user_account" and (result["rows"] != emails or result["errors"]):
+            raise SystemExit("register_user_account left duplicate or missing rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--duplicates", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(run(args.emails, args.duplicates))
+
+
+if __name__ == "__main__":
+    main()
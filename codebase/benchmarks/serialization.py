@@ -0,0 +1,64 @@
+"""
+Response serialization benchmark.
+
+Measures the cost of turning a User into response bytes, per request:
+- response_model: what FastAPI does for an endpoint returning the ORM object
+  (validate from attributes, jsonable_encoder, JSONResponse)
+- fast path: UserResponse.from_trusted + DefaultResponse (orjson when installed)
+
+    python -m app.benchmarks.serialization --requests 50000
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+os.environ.setdefault("DATABASE_URI", "sqlite:///./serialization_bench.db")
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.models.user import User
+from app.responses.base import DefaultResponse
+from app.responses.user import LoginResponse, UserResponse, login_response, user_response
+
+
+def _users(count: int) -> list:
+    now = datetime.utcnow()
+    return [User(id=n, name=f"User {n}", email=f"user{n}@example.com", is_active=True, created_at=now)
+            for n in range(count)]
+
+
+def _time_per_request(render, items: list) -> float:
+    started = time.perf_counter()
+    for item in items:
+        render(item)
+    return (time.perf_counter() - started) / len(items) * 1_000_000
+
+
+def run(count: int):
+    users = _users(count)
+    tokens = [{"access_token": "a" * 220, "refresh_token": "r" * 260, "expires_in": 180}] * count
+    print(f"{count} responses, fast path renders with {DefaultResponse.__name__}")
+    print(f"{'payload':<10}{'response_model us':>19}{'fast path us':>14}")
+
+    baseline = _time_per_request(
+        lambda user: JSONResponse(jsonable_encoder(UserResponse.model_validate(user))).body, users)
+    fast = _time_per_request(lambda user: user_response(user).body, users)
+    print(f"{'user':<10}{baseline:>19.2f}{fast:>14.2f}")
+
+    baseline = _time_per_request(
+        lambda token: JSONResponse(jsonable_encoder(LoginResponse.model_validate(token))).body, tokens)
+    fast = _time_per_request(lambda token: login_response(token).body, tokens)
+    print(f"{'login':<10}{baseline:>19.2f}{fast:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50000)
+    args = parser.parse_args()
+    run(args.requests)
+
+
+if __name__ == "__main__":
+    main()
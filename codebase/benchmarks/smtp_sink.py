@@ -0,0 +1,91 @@
+"""
+Stub SMTP server that accepts and discards mail, counting connections and messages.
+Used by the email and load benchmarks; can also run on its own for local testing:
+
+    python -m app.benchmarks.smtp_sink --port 1025
+"""
+import argparse
+import asyncio
+
+
+class SmtpSink:
+    # Speaks just enough SMTP for aiosmtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT.
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_every: int = 0):
+        self.host = host
+        self.port = port
+        self.fail_every = fail_every
+        self.connections = 0
+        self.messages = 0
+        self._server = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+
+        await reply("220 smtp-sink ready")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith("EHLO"):
+                    writer.write(b"250-smtp-sink\r\n250-8BITMIME\r\n")
+                    await reply("250 SMTPUTF8")
+                elif command.startswith(("HELO", "MAIL", "RCPT", "RSET", "NOOP")):
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while (await reader.readline()) not in (b".\r\n", b""):
+                        pass
+                    self.messages += 1
+                    if self.fail_every and self.messages % self.fail_every == 0:
+                        await reply("451 Try again later")
+                    else:
+                        await reply("250 Queued")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int):
+    sink = SmtpSink(host, port)
+    await sink.start()
+    print(f"SMTP sink listening on {host}:{sink.port}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            print(f"connections={sink.connections} messages={sink.messages}")
+    finally:
+        await sink.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
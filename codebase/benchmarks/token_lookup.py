@@ -0,0 +1,115 @@
+"""
+Token lookup benchmark.
+
+Fills a scratch SQLite database with token rows in growing steps and times the
+refresh-token and access-token lookups at each size, then prints the query plans
+so the composite indexes can be seen in use. Latency should stay flat as the
+table grows:
+
+    python -m app.benchmarks.token_lookup --rows 4000000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# Point the app at a scratch database before its settings are loaded
+os.environ.setdefault("DATABASE_URI", "sqlite:///./token_lookup_bench.db")
+
+from sqlalchemy import insert, select, text
+
+from app.config.database import Base, SessionLocal, engine
+from app.models.user import User, UserToken
+from app.utils.string import key_hash, unique_string
+
+BATCH_SIZE = 50_000
+USERS = 1_000
+
+
+def _refresh_lookup(refresh_key: str, access_key: str, user_id: int):
+    return select(UserToken).where(
+        UserToken.refresh_key_hash == key_hash(refresh_key),
+        UserToken.access_key_hash == key_hash(access_key),
+        UserToken.user_id == user_id,
+        UserToken.expires_at > datetime.utcnow(),
+    )
+
+
+def _access_lookup(access_key: str, token_id: int, user_id: int):
+    return select(UserToken).where(
+        UserToken.access_key_hash == key_hash(access_key),
+        UserToken.id == token_id,
+        UserToken.user_id == user_id,
+        UserToken.expires_at > datetime.utcnow(),
+    )
+
+
+def _fill(session, rows: int, keys: list):
+    """Inserts rows in batches. Keeps a sample of raw keys to look up later."""
+    expires = datetime.utcnow() + timedelta(days=1)
+    inserted = 0
+    while inserted < rows:
+        batch = []
+        for _ in range(min(BATCH_SIZE, rows - inserted)):
+            refresh_key, access_key = unique_string(100), unique_string(50)
+            user_id = random.randint(1, USERS)
+            batch.append({"user_id": user_id, "refresh_key_hash": key_hash(refresh_key),
+                          "access_key_hash": key_hash(access_key), "expires_at": expires})
+            if len(keys) < 10_000:
+                keys.append((refresh_key, access_key, user_id))
+        session.execute(insert(UserToken), batch)
+        session.commit()
+        inserted += len(batch)
+
+
+def _time_lookups(session, keys: list, lookups: int) -> tuple:
+    sample = random.sample(keys, min(lookups, len(keys)))
+    tokens = {}
+
+    started = time.perf_counter()
+    for refresh_key, access_key, user_id in sample:
+        tokens[access_key] = session.execute(_refresh_lookup(refresh_key, access_key, user_id)).scalars().first()
+    refresh_us = (time.perf_counter() - started) / len(sample) * 1_000_000
+
+    started = time.perf_counter()
+    for _, access_key, user_id in sample:
+        session.execute(_access_lookup(access_key, tokens[access_key].id, user_id)).scalars().first()
+    access_us = (time.perf_counter() - started) / len(sample) * 1_000_000
+    return refresh_us, access_us
+
+
+def _print_plans(session, keys: list):
+    refresh_key, access_key, user_id = keys[0]
+    for name, statement in (("refresh", _refresh_lookup(refresh_key, access_key, user_id)),
+                            ("access", _access_lookup(access_key, 1, user_id))):
+        compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+        plan = session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+        print(f"{name} plan: " + "; ".join(row[-1] for row in plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="final number of token rows")
+    parser.add_argument("--lookups", type=int, default=1_000, help="lookups timed at each size")
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(engine, tables=[UserToken.__table__])
+    Base.metadata.create_all(engine, tables=[User.__table__, UserToken.__table__])
+
+    keys = []
+    print(f"{'rows':>12}{'refresh us':>14}{'access us':>14}")
+    with SessionLocal() as session:
+        size, step = 0, 10_000
+        while size < args.rows:
+            target = min(step, args.rows)
+            _fill(session, target - size, keys)
+            size = target
+            refresh_us, access_us = _time_lookups(session, keys, args.lookups)
+            print(f"{size:>12,}{refresh_us:>14.1f}{access_us:>14.1f}")
+            step *= 4
+        _print_plans(session, keys)
+
+
+if __name__ == "__main__":
+    main()
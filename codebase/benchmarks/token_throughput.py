@@ -0,0 +1,72 @@
+"""
+Token encode/decode microbenchmark.
+
+Compares the original security.py path (jwt.encode / jwt.decode with raw string
+secrets and base85 encoded claims) with TokenCodec, for single tokens and for
+batch verification:
+
+    python -m app.benchmarks.token_throughput --tokens 20000
+"""
+import argparse
+import time
+from datetime import timedelta
+
+from app.config.security import generate_token, get_token_payload, str_decode, str_encode
+from app.config.settings import get_settings
+from app.config.token_codec import access_token_codec, claim
+
+settings = get_settings()
+EXPIRY = timedelta(minutes=3)
+
+
+def _original_claims(n: int) -> dict:
+    return {"sub": str_encode(str(n)), "a": "k" * 68, "r": str_encode(str(n * 7)), "n": str_encode(f"User {n}")}
+
+
+def _codec_claims(n: int) -> dict:
+    return {"sub": str(n), "a": "k" * 68, "r": n * 7, "n": f"User {n}"}
+
+
+def _rate(count: int, started: float) -> float:
+    return count / (time.perf_counter() - started)
+
+
+def run(count: int):
+    print(f"{count} tokens, {settings.JWT_ALGORITHM}")
+    print(f"{'path':<22}{'encode/s':>12}{'decode/s':>12}")
+
+    started = time.perf_counter()
+    tokens = [generate_token(_original_claims(n), settings.JWT_SECRET, settings.JWT_ALGORITHM, EXPIRY)
+              for n in range(count)]
+    encode = _rate(count, started)
+    started = time.perf_counter()
+    for token in tokens:
+        payload = get_token_payload(token, settings.JWT_SECRET, settings.JWT_ALGORITHM)
+        str_decode(payload["sub"]), str_decode(payload["r"])
+    print(f"{'security.py':<22}{encode:>12.0f}{_rate(count, started):>12.0f}")
+
+    started = time.perf_counter()
+    tokens = [access_token_codec.encode(_codec_claims(n), EXPIRY) for n in range(count)]
+    encode = _rate(count, started)
+    started = time.perf_counter()
+    for token in tokens:
+        payload = access_token_codec.decode(token)
+        claim(payload, "sub"), claim(payload, "r")
+    print(f"{'TokenCodec':<22}{encode:>12.0f}{_rate(count, started):>12.0f}")
+
+    started = time.perf_counter()
+    payloads = access_token_codec.decode_many(tokens)
+    print(f"{'TokenCodec batch':<22}{'':>12}{_rate(count, started):>12.0f}")
+    if not all(payloads):
+        raise SystemExit("TokenCodec rejected a token it issued")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.tokens)
+
+
+if __name__ == "__main__":
+    main()
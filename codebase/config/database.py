@@ -1,19 +1,35 @@
 from app.config.settings import get_settings
-from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import Generator
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from typing import AsyncGenerator, Generator, Union
 from sqlalchemy import create_engine
 
 settings = get_settings()
 
-engine = create_engine(settings.DATABASE_URI,
-                       pool_pre_ping=True,
-                       pool_recycle=3600,
-                       pool_size=20,
-                       max_overflow=0)
+DbSession = Union[Session, AsyncSession]
+
+
+def _engine_options(uri: str) -> dict:
+    # SQLite uses its own pool classes, which do not take the pool sizing options
+    if uri.startswith("sqlite"):
+        return {}
+    return dict(pool_pre_ping=True,
+                pool_recycle=3600,
+                pool_size=20,
+                max_overflow=0)
+
+
+engine = create_engine(settings.DATABASE_URI, **_engine_options(settings.DATABASE_URI))
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URI, **_engine_options(settings.ASYNC_DATABASE_URI))
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 def get_session() -> Generator:
     session = SessionLocal()
@@ -21,3 +37,40 @@ def get_session() -> Generator:
         yield session
     finally:
         session.close()
+
+
+async def get_async_session() -> AsyncGenerator:
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# Request dependency: async sessions when DATABASE_ASYNC is enabled, blocking ones otherwise
+get_db = get_async_session if settings.DATABASE_ASYNC else get_session
+
+
+# The helpers below let the services run unchanged on either kind of session.
+async def execute(session: DbSession, statement):
+    if isinstance(session, AsyncSession):
+        return await session.execute(statement)
+    return session.execute(statement)
+
+
+async def commit(session: DbSession):
+    if isinstance(session, AsyncSession):
+        await session.commit()
+    else:
+        session.commit()
+
+
+async def refresh(session: DbSession, instance):
+    if isinstance(session, AsyncSession):
+        await session.refresh(instance)
+    else:
+        session.refresh(instance)
+
+
+async def rollback(session: DbSession):
+    if isinstance(session, AsyncSession):
+        await session.rollback()
+    else:
+        session.rollback()
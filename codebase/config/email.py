@@ -25,6 +25,11 @@ fm = FastMail(conf)
 
 async def send_email(recipients: list, subject: str, context: dict, template_name: str,
                      background_tasks: BackgroundTasks):
+    from app.config.mail_dispatch import mail_dispatcher
+    if mail_dispatcher.running:
+        await mail_dispatcher.enqueue(recipients, subject, template_name, context)
+        return
+
     message = MessageSchema(
         subject=subject,
         recipients=recipients,
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import List, Optional, Set
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.config.email import conf
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+
+class TemplateCache:
+    # One Jinja environment for the process. Templates are compiled once, at warm()
+    # or on first use, and auto_reload is off so renders never stat the template files.
+
+    def __init__(self, folder):
+        self.env = Environment(
+            loader=FileSystemLoader(str(folder)),
+            autoescape=select_autoescape(["html", "xml"]),
+            auto_reload=False,
+            cache_size=-1,
+        )
+
+    def warm(self) -> int:
+        names = self.env.list_templates(extensions=["html"])
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+    def render(self, template_name: str, context: dict) -> str:
+        return self.env.get_template(template_name).render(**context)
+
+
+class SmtpPool:
+    # Keeps up to `size` authenticated SMTP connections open and hands them out one
+    # at a time. A connection that fails is closed and reopened on its next use.
+
+    def __init__(self, size: int):
+        self.size = size
+        self.connections_opened = 0
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=conf.MAIL_SERVER,
+            port=int(conf.MAIL_PORT),
+            use_tls=bool(conf.MAIL_SSL_TLS),
+            start_tls=bool(conf.MAIL_STARTTLS),
+            timeout=conf.TIMEOUT,
+        )
+        await client.connect()
+        if conf.USE_CREDENTIALS and conf.MAIL_USERNAME:
+            await client.login(conf.MAIL_USERNAME, conf.MAIL_PASSWORD.get_secret_value())
+        self.connections_opened += 1
+        return client
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        client = await self._idle.get()
+        try:
+            if client is None or not client.is_connected:
+                client = await self._connect()
+        except Exception:
+            self._idle.put_nowait(None)
+            raise
+        return client
+
+    def release(self, client: Optional[aiosmtplib.SMTP]):
+        self._idle.put_nowait(client)
+
+    async def discard(self, client: aiosmtplib.SMTP):
+        try:
+            client.close()
+        finally:
+            self._idle.put_nowait(None)
+
+    async def close(self):
+        while not self._idle.empty():
+            client = self._idle.get_nowait()
+            if client is not None and client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+
+
+@dataclass
+class DispatchMetrics:
+    queued: int = 0
+    sent: int = 0
+    failed: int = 0
+    retries: int = 0
+    batches: int = 0
+    send_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class MailDispatcher:
+    """
+    Delivers mail from a bounded in-process queue.
+    Workers take up to MAIL_BATCH_SIZE messages at a time and send the whole batch over
+    one pooled connection, retrying failed messages with exponential backoff. When the
+    queue is full, enqueue() waits, which pushes back on the request that produced the mail.
+    """
+
+    def __init__(self, pool_size: int, queue_size: int, batch_size: int, max_retries: int):
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.templates = TemplateCache(conf.TEMPLATE_FOLDER)
+        self.metrics = DispatchMetrics()
+        self.pool: Optional[SmtpPool] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Retries waiting out their backoff; stop() waits for them before draining the queue
+        self._retries: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def build_message(self, recipients: list, subject: str, html: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((conf.MAIL_FROM_NAME or "", conf.MAIL_FROM))
+        message["To"] = ", ".join(recipients)
+        message["Subject"] = subject
+        message.set_content(html, subtype="html")
+        return message
+
+    async def start(self):
+        if self.running:
+            return
+        self.templates.warm()
+        self.pool = SmtpPool(self.pool_size)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.pool_size)]
+
+    async def stop(self):
+        """Delivers what is already queued, then closes the pooled connections."""
+        if not self.running:
+            return
+        # A batch sent while draining may schedule new retries, so repeat until both are empty
+        while True:
+            if self._retries:
+                await asyncio.gather(*list(self._retries), return_exceptions=True)
+                continue
+            await self._queue.join()
+            if not self._retries:
+                break
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await self.pool.close()
+
+    async def enqueue(self, recipients: list, subject: str, template_name: str, context: dict):
+        html = self.templates.render(template_name, context)
+        await self._queue.put((self.build_message(recipients, subject, html), 0))
+        self.metrics.queued += 1
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _worker(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._send_batch(batch)
+            except Exception as worker_exec:
+                # Never let one bad batch take a worker down; the queue would stall behind it
+                logging.exception(f"Mail worker failed on a batch: {str(worker_exec)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _send_batch(self, batch: list):
+        started = time.perf_counter()
+        self.metrics.batches += 1
+        failed = []
+        try:
+            client = await self.pool.acquire()
+        except Exception as connect_exec:
+            logging.warning(f"SMTP connect failed: {str(connect_exec)}")
+            failed = batch
+        else:
+            try:
+                for index, (message, attempt) in enumerate(batch):
+                    try:
+                        await client.send_message(message)
+                        self.metrics.sent += 1
+                    except (aiosmtplib.SMTPServerDisconnected, OSError, asyncio.TimeoutError) as connection_exec:
+                        # The connection is gone; everything not yet sent goes back for a retry
+                        logging.warning(f"SMTP connection lost: {str(connection_exec)}")
+                        failed.extend(batch[index:])
+                        broken, client = client, None
+                        await self.pool.discard(broken)
+                        break
+                    except aiosmtplib.SMTPException as send_exec:
+                        logging.warning(f"SMTP send failed: {str(send_exec)}")
+                        failed.append((message, attempt))
+                    except Exception as message_exec:
+                        # Broken message (e.g. a bad header): retrying cannot help
+                        self.metrics.failed += 1
+                        logging.error(f"Dropping email to {message['To']}: {str(message_exec)}")
+            finally:
+                # The pool slot must come back whatever happened above
+                if client is not None:
+                    self.pool.release(client)
+        self.metrics.send_seconds += time.perf_counter() - started
+
+        for message, attempt in failed:
+            if attempt >= self.max_retries:
+                self.metrics.failed += 1
+                logging.error(f"Dropping email to {message['To']} after {attempt + 1} attempts")
+                continue
+            self.metrics.retries += 1
+            retry = asyncio.create_task(self._retry(message, attempt + 1))
+            self._retries.add(retry)
+            retry.add_done_callback(self._retries.discard)
+
+    async def _retry(self, message: EmailMessage, attempt: int):
+        await asyncio.sleep(min(2 ** attempt * 0.5, 30))
+        await self._queue.put((message, attempt))
+
+
+mail_dispatcher = MailDispatcher(
+    pool_size=settings.MAIL_POOL_SIZE,
+    queue_size=settings.MAIL_QUEUE_SIZE,
+    batch_size=settings.MAIL_BATCH_SIZE,
+    max_retries=settings.MAIL_MAX_RETRIES,
+)
@@ -1,22 +1,33 @@
+import asyncio
 import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from passlib.context import CryptContext
 import base64
-from sqlalchemy.orm import joinedload, Session
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta
-from app.config.database import get_session
+from typing import Optional
+from app.config.database import DbSession, execute, get_db
 from app.config.settings import get_settings
+from app.config.token_cache import TokenUserCache
+from app.config.token_codec import access_token_codec, claim
 from app.models.user import UserToken
+from app.utils.string import key_hash
 
 SPECIAL_CHARACTERS = ['@', '#', '$', '%', '=', ':', '?', '.', '/', '|', '~', '>']
 
 settings = get_settings()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+_hash_executor: Optional[Executor] = None
+
+token_user_cache = TokenUserCache(max_size=settings.AUTH_CACHE_MAX_SIZE, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS)
+
 
 def hash_password(password):
     return pwd_context.hash(password)
@@ -26,6 +37,37 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def get_hash_executor() -> Executor:
+    # bcrypt is CPU bound, so it runs on a bounded pool instead of the event loop.
+    # Threads are enough because bcrypt releases the GIL; a process pool is available
+    # for runtimes where it does not.
+    global _hash_executor
+    if _hash_executor is None:
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS,
+                                                thread_name_prefix="password-hash")
+    return _hash_executor
+
+
+def shutdown_hash_executor():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
+async def hash_password_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), hash_password, password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), verify_password, plain_password, hashed_password)
+
+
 def is_password_strong_enough(password: str) -> bool:
     if len(password) < 8:
         return False
@@ -69,32 +111,36 @@ def generate_token(payload: dict, secret: str, algo: str, expiry: timedelta):
 
 
 async def get_token_user(token: str, db):
-    payload = get_token_payload(token, settings.JWT_SECRET, settings.JWT_ALGORITHM)
+    payload = access_token_codec.decode(token)
     if payload:
-        user_token_id = str_decode(payload.get('r'))
-        user_id = str_decode(payload.get('sub'))
+        user_token_id = claim(payload, 'r')
+        user_id = claim(payload, 'sub')
         access_key = payload.get('a')
-        user_token = db.query(UserToken).options(joinedload(UserToken.user)).filter(UserToken.access_key == access_key,
-                                                 UserToken.id == user_token_id,
-                                                 UserToken.user_id == user_id,
-                                                 UserToken.expires_at > datetime.utcnow()
-                                                 ).first()
+        cached_user = token_user_cache.get(user_token_id, access_key)
+        if cached_user and str(cached_user.id) == user_id:
+            return cached_user
+        user_token = (await execute(db, select(UserToken).options(joinedload(UserToken.user)).where(
+            UserToken.access_key_hash == key_hash(access_key),
+            UserToken.id == user_token_id,
+            UserToken.user_id == user_id,
+            UserToken.expires_at > datetime.utcnow()
+        ))).scalars().first()
         if user_token:
-            return user_token.user
+            return token_user_cache.put(user_token_id, access_key, user_token.user, token_exp=payload.get('exp'))
     return None
 
 
 async def load_user(email: str, db):
     from app.models.user import User
     try:
-        user = db.query(User).filter(User.email == email).first()
+        user = (await execute(db, select(User).where(User.email == email))).scalars().first()
     except Exception as user_exec:
         logging.info(f"User Not Found, Email: {email}")
         user = None
     return user
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: DbSession = Depends(get_db)):
     user = await get_token_user(token=token, db=db)
     if user:
         return user
@@ -24,7 +24,13 @@ class Settings(BaseSettings):
     MYSQL_PASS: str = os.environ.get("MYSQL_PASSWORD", 'secret')
     MYSQL_PORT: int = int(os.environ.get("MYSQL_PORT", 3306))
     MYSQL_DB: str = os.environ.get("MYSQL_DB", 'fastapi')
-    DATABASE_URI: str = f"mysql+pymysql://{MYSQL_USER}:%s@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}" % quote_plus(MYSQL_PASS)
+    DATABASE_URI: str = os.environ.get(
+        "DATABASE_URI", f"mysql+pymysql://{MYSQL_USER}:%s@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}" % quote_plus(MYSQL_PASS))
+
+    # Async Database Config (e.g. sqlite+aiosqlite:///./app.db for local testing)
+    DATABASE_ASYNC: bool = os.environ.get("DATABASE_ASYNC", "false").lower() in ("1", "true")
+    ASYNC_DATABASE_URI: str = os.environ.get(
+        "ASYNC_DATABASE_URI", f"mysql+aiomysql://{MYSQL_USER}:%s@{MYSQL_HOST}:{MYSQL_PORT}/{MYSQL_DB}" % quote_plus(MYSQL_PASS))
 
     # JWT Secret Key
     JWT_SECRET: str = os.environ.get("JWT_SECRET", "649fb93ef34e4fdf4187709c84d643dd61ce730d91856418fdcf563f895ea40f")
@@ -32,6 +38,31 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 3))
     REFRESH_TOKEN_EXPIRE_MINUTES: int = int(os.environ.get("REFRESH_TOKEN_EXPIRE_MINUTES", 1440))
 
+    # Registration: single INSERT relying on the users.email unique index
+    FAST_REGISTRATION: bool = os.environ.get("FAST_REGISTRATION", "false").lower() in ("1", "true")
+
+    # Authenticated User Cache (0 disables it)
+    AUTH_CACHE_TTL_SECONDS: int = int(os.environ.get("AUTH_CACHE_TTL_SECONDS", 30))
+    AUTH_CACHE_MAX_SIZE: int = int(os.environ.get("AUTH_CACHE_MAX_SIZE", 10000))
+
+    # Email Dispatch (pooled SMTP connections, bounded queue; false sends one background task per email)
+    MAIL_DISPATCH: bool = os.environ.get("MAIL_DISPATCH", "true").lower() in ("1", "true")
+    MAIL_POOL_SIZE: int = int(os.environ.get("MAIL_POOL_SIZE", 2))
+    MAIL_QUEUE_SIZE: int = int(os.environ.get("MAIL_QUEUE_SIZE", 1000))
+    MAIL_BATCH_SIZE: int = int(os.environ.get("MAIL_BATCH_SIZE", 20))
+    MAIL_MAX_RETRIES: int = int(os.environ.get("MAIL_MAX_RETRIES", 3))
+
+    # Expired Token Purge (interval 0 disables it)
+    TOKEN_PURGE_INTERVAL_SECONDS: int = int(os.environ.get("TOKEN_PURGE_INTERVAL_SECONDS", 300))
+    TOKEN_PURGE_BATCH_SIZE: int = int(os.environ.get("TOKEN_PURGE_BATCH_SIZE", 500))
+    TOKEN_PURGE_PAUSE_SECONDS: float = float(os.environ.get("TOKEN_PURGE_PAUSE_SECONDS", 0.2))
+    TOKEN_PURGE_MAX_BATCHES: int = int(os.environ.get("TOKEN_PURGE_MAX_BATCHES", 200))
+
+    # Password Hashing
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS: int = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 4))
+    PASSWORD_HASH_EXECUTOR: str = os.environ.get("PASSWORD_HASH_EXECUTOR", "thread")
+
     # App Secret Key
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "8deadce9449770680910741063cd0a3fe0acb62a8978661f421bbcbb66dc41f1")
 
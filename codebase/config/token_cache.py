@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    id: int
+    name: str
+    email: str
+    is_active: bool
+    verified_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(id=user.id, name=user.name, email=user.email, is_active=user.is_active,
+                   verified_at=user.verified_at, created_at=user.created_at)
+
+
+class TokenUserCache:
+    # Validated (token id, access key) -> user snapshot, so protected requests can skip
+    # the UserToken lookup. Entries live at most ttl_seconds and never past the access
+    # token's own expiry. The cache is per process: other workers only see an
+    # invalidation once the short TTL runs out.
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_id, access_key: str) -> Optional[UserSnapshot]:
+        key = (str(token_id), access_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, snapshot = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def put(self, token_id, access_key: str, user, token_exp: Optional[float] = None) -> UserSnapshot:
+        snapshot = user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user)
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return snapshot
+
+        expires_at = time.time() + self.ttl_seconds
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+
+        key = (str(token_id), access_key)
+        with self._lock:
+            self._entries[key] = (expires_at, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, token_id, access_key: str):
+        with self._lock:
+            self._entries.pop((str(token_id), access_key), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,93 @@
+import base64
+import hmac
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import Iterable, List, Optional
+
+from jwt.algorithms import HMACAlgorithm, get_default_algorithms
+from jwt.utils import base64url_decode, base64url_encode
+
+from app.config.settings import get_settings
+
+settings = get_settings()
+
+# Claims of tokens issued by TokenCodec are plain values. Tokens issued before it base85
+# encode 'sub', 'r' and 'n'; claim() still reads those until they expire.
+COMPACT_CLAIMS_VERSION = 2
+
+
+def _json_segment(data: dict) -> bytes:
+    return base64url_encode(json.dumps(data, separators=(",", ":")).encode())
+
+
+class TokenCodec:
+    """
+    Signs and verifies JWTs for one secret and algorithm.
+    The PyJWT algorithm object, the prepared key and the encoded header are built once,
+    instead of on every jwt.encode / jwt.decode call. For HMAC algorithms the keyed
+    hash state is also prepared once and copied per token.
+    Produces standard JWTs, so PyJWT can still decode them and vice versa.
+    """
+
+    def __init__(self, secret: str, algorithm: str, verify_secret: Optional[str] = None):
+        self.algorithm_name = algorithm
+        self._algorithm = get_default_algorithms()[algorithm]
+        self._signing_key = self._algorithm.prepare_key(secret)
+        self._verify_key = self._algorithm.prepare_key(verify_secret or secret)
+        self._header = _json_segment({"alg": algorithm, "typ": "JWT"})
+        self._hmac = None
+        if isinstance(self._algorithm, HMACAlgorithm):
+            self._hmac = hmac.new(self._signing_key, digestmod=self._algorithm.hash_alg)
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        if self._hmac is not None:
+            mac = self._hmac.copy()
+            mac.update(signing_input)
+            return mac.digest()
+        return self._algorithm.sign(signing_input, self._signing_key)
+
+    def _verify(self, signing_input: bytes, signature: bytes) -> bool:
+        if self._hmac is not None:
+            return hmac.compare_digest(self._sign(signing_input), signature)
+        return self._algorithm.verify(signing_input, self._verify_key, signature)
+
+    def encode(self, claims: dict, expiry: timedelta) -> str:
+        payload = dict(claims, v=COMPACT_CLAIMS_VERSION, exp=int(time.time() + expiry.total_seconds()))
+        signing_input = self._header + b"." + _json_segment(payload)
+        return (signing_input + b"." + base64url_encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str, now: Optional[float] = None) -> Optional[dict]:
+        """Returns the claims of a valid, unexpired token, otherwise None."""
+        try:
+            signing_input, _, signature = token.encode().rpartition(b".")
+            header, _, payload = signing_input.partition(b".")
+            if header != self._header and json.loads(base64url_decode(header)).get("alg") != self.algorithm_name:
+                return None
+            if not self._verify(signing_input, base64url_decode(signature)):
+                return None
+            claims = json.loads(base64url_decode(payload))
+        except Exception as jwt_exec:
+            logging.debug(f"JWT Error: {str(jwt_exec)}")
+            return None
+        exp = claims.get("exp")
+        if exp is None or float(exp) <= (now if now is not None else time.time()):
+            return None
+        return claims
+
+    def decode_many(self, tokens: Iterable[str]) -> List[Optional[dict]]:
+        """Verifies a batch of tokens against one clock reading; None marks the invalid ones."""
+        now = time.time()
+        return [self.decode(token, now) for token in tokens]
+
+
+def claim(payload: dict, name: str) -> Optional[str]:
+    value = payload.get(name)
+    if value is None or payload.get("v") == COMPACT_CLAIMS_VERSION:
+        return value if value is None else str(value)
+    return base64.b85decode(value.encode('ascii')).decode('ascii')
+
+
+access_token_codec = TokenCodec(settings.JWT_SECRET, settings.JWT_ALGORITHM)
+refresh_token_codec = TokenCodec(settings.SECRET_KEY, settings.JWT_ALGORITHM)
@@ -1,8 +1,17 @@
 from middleware import mw_tracker, MWOptions, record_exception
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app.config.mail_dispatch import mail_dispatcher
+from app.config.security import shutdown_hash_executor
+from app.config.settings import get_settings
+from app.responses.base import DefaultResponse
 from app.routes import user
+from app.services.token_purge import purge_metrics, run_token_purge
+import asyncio
 import sys
 
+settings = get_settings()
+
 
 # tracker = mw_tracker(
 #      MWOptions(
@@ -24,8 +33,32 @@ import sys
 #  )
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    stop = asyncio.Event()
+    purge_task = None
+    try:
+        if settings.TOKEN_PURGE_INTERVAL_SECONDS > 0:
+            purge_task = asyncio.create_task(run_token_purge(stop))
+        if settings.MAIL_DISPATCH:
+            await mail_dispatcher.start()
+        yield
+    finally:
+        # Also on a failed startup or shutdown and on cancellation: queued mail is still delivered
+        stop.set()
+        try:
+            if purge_task:
+                await asyncio.gather(purge_task, return_exceptions=True)
+        finally:
+            try:
+                await mail_dispatcher.stop()
+            finally:
+                # Last, once nothing is left that hashes passwords or verification tokens
+                shutdown_hash_executor()
+
+
 def create_application():
-    application = FastAPI()
+    application = FastAPI(lifespan=lifespan, default_response_class=DefaultResponse)
     application.include_router(user.user_router)
     application.include_router(user.guest_router)
     application.include_router(user.auth_router)
@@ -42,3 +75,13 @@ async def root():
     except Exception as e:
         sys.excepthook(type(e), e, e.__traceback__)
         raise e
+
+
+@app.get("/metrics/token-purge")
+async def token_purge_metrics():
+    return purge_metrics.as_dict()
+
+
+@app.get("/metrics/mail")
+async def mail_metrics():
+    return mail_dispatcher.metrics.as_dict()
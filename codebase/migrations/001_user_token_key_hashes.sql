@@ -0,0 +1,25 @@
+-- Replace the raw 250-char token keys with fixed-length SHA-256 digests and
+-- index the columns the refresh and access token lookups filter on (MySQL).
+-- InnoDB secondary indexes carry the primary key, so the access lookup index
+-- also covers UserToken.id.
+
+ALTER TABLE user_tokens
+    ADD COLUMN access_key_hash CHAR(64) NULL DEFAULT NULL AFTER user_id,
+    ADD COLUMN refresh_key_hash CHAR(64) NULL DEFAULT NULL AFTER access_key_hash;
+
+UPDATE user_tokens
+SET access_key_hash = SHA2(access_key, 256),
+    refresh_key_hash = SHA2(refresh_key, 256)
+WHERE access_key IS NOT NULL OR refresh_key IS NOT NULL;
+
+CREATE INDEX ix_user_tokens_refresh_lookup
+    ON user_tokens (refresh_key_hash, access_key_hash, user_id, expires_at);
+CREATE INDEX ix_user_tokens_access_lookup
+    ON user_tokens (access_key_hash, user_id, expires_at);
+
+DROP INDEX ix_user_tokens_access_key ON user_tokens;
+DROP INDEX ix_user_tokens_refresh_key ON user_tokens;
+
+ALTER TABLE user_tokens
+    DROP COLUMN access_key,
+    DROP COLUMN refresh_key;
@@ -0,0 +1,3 @@
+-- Lets the expired token purge find the oldest expired rows without a table scan.
+
+CREATE INDEX ix_user_tokens_expires_at ON user_tokens (expires_at);
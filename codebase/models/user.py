@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, DateTime, Integer, String, func, ForeignKey
+from sqlalchemy import Boolean, CHAR, Column, DateTime, Index, Integer, String, func, ForeignKey
 from app.config.database import Base
 from sqlalchemy.orm import mapped_column, relationship
 
@@ -23,10 +23,17 @@ class User(Base):
 
 class UserToken(Base):
     __tablename__ = "user_tokens"
+    # Keys are stored as fixed-length SHA-256 hex digests (see utils.string.key_hash).
+    # The composite indexes cover every column the refresh and access lookups filter on.
+    __table_args__ = (
+        Index("ix_user_tokens_refresh_lookup", "refresh_key_hash", "access_key_hash", "user_id", "expires_at"),
+        Index("ix_user_tokens_access_lookup", "access_key_hash", "user_id", "expires_at"),
+        Index("ix_user_tokens_expires_at", "expires_at"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = mapped_column(ForeignKey('users.id'))
-    access_key = Column(String(250), nullable=True, index=True, default=None)
-    refresh_key = Column(String(250), nullable=True, index=True, default=None)
+    access_key_hash = Column(CHAR(64), nullable=True, default=None)
+    refresh_key_hash = Column(CHAR(64), nullable=True, default=None)
     created_at = Column(DateTime, nullable=False, server_default=func.now())
     expires_at = Column(DateTime, nullable=False)
     
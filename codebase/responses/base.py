@@ -3,4 +3,11 @@ from pydantic import BaseModel, ConfigDict
 
 
 class BaseResponse(BaseModel):
-    model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
+
+
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
@@ -1,7 +1,7 @@
-from typing import Union
+from typing import Optional
 from datetime import datetime
 from pydantic import EmailStr, BaseModel
-from app.responses.base import BaseResponse
+from app.responses.base import BaseResponse, DefaultResponse
 
 
 class UserResponse(BaseResponse):
@@ -9,7 +9,14 @@ class UserResponse(BaseResponse):
     name: str
     email: EmailStr
     is_active: bool
-    created_at: Union[str, None, datetime] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_trusted(cls, user) -> "UserResponse":
+        # Users come from our own database or token cache, already typed and validated,
+        # so the model is built without running validation again.
+        return cls.model_construct(id=user.id, name=user.name, email=user.email,
+                                   is_active=user.is_active, created_at=user.created_at)
     
     
 
@@ -17,4 +24,14 @@ class LoginResponse(BaseModel):
     access_token: str
     refresh_token: str
     expires_in: int
-    token_type: str = "Bearer"
\ No newline at end of file
+    token_type: str = "Bearer"
+
+
+def user_response(user, status_code: int = 200) -> DefaultResponse:
+    # Returning a Response makes FastAPI skip its response_model validation and encoding;
+    # the decorators keep response_model for the OpenAPI schema.
+    return DefaultResponse(UserResponse.from_trusted(user).model_dump(mode="json"), status_code=status_code)
+
+
+def login_response(tokens: dict) -> DefaultResponse:
+    return DefaultResponse({**tokens, "token_type": "Bearer"})
\ No newline at end of file
@@ -1,14 +1,15 @@
 
 from fastapi import APIRouter, BackgroundTasks, Depends, status, Header
-from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-
-from app.config.database import get_session
-from app.responses.user import UserResponse, LoginResponse
+from app.config.database import DbSession, get_db
+from app.responses.base import DefaultResponse
+from app.responses.user import UserResponse, LoginResponse, login_response, user_response
 from app.schemas.user import RegisterUserRequest, ResetRequest, VerifyUserRequest, EmailRequest
 from app.services import user
 from app.config.security import get_current_user, oauth2_scheme
+from app.config.settings import get_settings
+
+settings = get_settings()
 
 
 user_router = APIRouter(
@@ -31,38 +32,40 @@ guest_router = APIRouter(
 )
 
 @user_router.post("", status_code=status.HTTP_201_CREATED, response_model=UserResponse)
-async def register_user(data: RegisterUserRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def register_user(data: RegisterUserRequest, background_tasks: BackgroundTasks, session: DbSession = Depends(get_db)):
+    if settings.FAST_REGISTRATION:
+        return user_response(await user.register_user_account(data, session, background_tasks), status.HTTP_201_CREATED)
     return await user.create_user_account(data, session, background_tasks)
 
 @user_router.post("/verify", status_code=status.HTTP_200_OK)
-async def verify_user_account(data: VerifyUserRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def verify_user_account(data: VerifyUserRequest, background_tasks: BackgroundTasks, session: DbSession = Depends(get_db)):
     await user.activate_user_account(data, session, background_tasks)
-    return JSONResponse({"message": "Account is activated successfully."})
+    return DefaultResponse({"message": "Account is activated successfully."})
 
 @guest_router.post("/login", status_code=status.HTTP_200_OK, response_model=LoginResponse)
-async def user_login(data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    return await user.get_login_token(data, session)
+async def user_login(data: OAuth2PasswordRequestForm = Depends(), session: DbSession = Depends(get_db)):
+    return login_response(await user.get_login_token(data, session))
 
 @guest_router.post("/refresh", status_code=status.HTTP_200_OK, response_model=LoginResponse)
-async def refresh_token(refresh_token = Header(), session: Session = Depends(get_session)):
-    return await user.get_refresh_token(refresh_token, session)
+async def refresh_token(refresh_token = Header(), session: DbSession = Depends(get_db)):
+    return login_response(await user.get_refresh_token(refresh_token, session))
 
 
 @guest_router.post("/forgot-password", status_code=status.HTTP_200_OK)
-async def forgot_password(data: EmailRequest, background_tasks: BackgroundTasks, session: Session = Depends(get_session)):
+async def forgot_password(data: EmailRequest, background_tasks: BackgroundTasks, session: DbSession = Depends(get_db)):
     await user.email_forgot_password_link(data, background_tasks, session)
-    return JSONResponse({"message": "A email with password reset link has been sent to you."})
+    return DefaultResponse({"message": "A email with password reset link has been sent to you."})
 
 @guest_router.put("/reset-password", status_code=status.HTTP_200_OK)
-async def reset_password(data: ResetRequest, session: Session = Depends(get_session)):
+async def reset_password(data: ResetRequest, session: DbSession = Depends(get_db)):
     await user.reset_user_password(data, session)
-    return JSONResponse({"message": "Your password has been updated."})
+    return DefaultResponse({"message": "Your password has been updated."})
 
 @auth_router.get("/me", status_code=status.HTTP_200_OK, response_model=UserResponse)
 async def fetch_user(user = Depends(get_current_user)):
-    return user
+    return user_response(user)
 
 
 @auth_router.get("/{pk}", status_code=status.HTTP_200_OK, response_model=UserResponse)
-async def get_user_info(pk, session: Session = Depends(get_session)):
-    return await user.fetch_user_detail(pk, session)
\ No newline at end of file
+async def get_user_info(pk, session: DbSession = Depends(get_db)):
+    return user_response(await user.fetch_user_detail(pk, session))
\ No newline at end of file
@@ -8,9 +8,9 @@ settings = get_settings()
 
 
 async def send_account_verification_email(user: User, background_tasks: BackgroundTasks):
-    from app.config.security import hash_password
+    from app.config.security import hash_password_async
     string_context = user.get_context_string(context=USER_VERIFY_ACCOUNT)
-    token = hash_password(string_context)
+    token = await hash_password_async(string_context)
     activate_url = f"{settings.FRONTEND_HOST}/auth/account-verify?token={token}&email={user.email}"
     data = {
         'app_name': settings.APP_NAME,
@@ -43,9 +43,9 @@ async def send_account_activation_confirmation_email(user: User, background_task
     )
     
 async def send_password_reset_email(user: User, background_tasks: BackgroundTasks):
-    from app.config.security import hash_password
+    from app.config.security import hash_password_async
     string_context = user.get_context_string(context=FORGOT_PASSWORD)
-    token = hash_password(string_context)
+    token = await hash_password_async(string_context)
     reset_url = f"{settings.FRONTEND_HOST}/reset-password?token={token}&email={user.email}"
     data = {
         'app_name': settings.APP_NAME,
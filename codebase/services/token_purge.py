@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.config.database import AsyncSessionLocal, SessionLocal
+from app.config.settings import get_settings
+from app.models.user import UserToken
+
+settings = get_settings()
+
+
+@dataclass
+class TokenPurgeMetrics:
+    runs: int = 0
+    batches: int = 0
+    rows_purged: int = 0
+    seconds_spent: float = 0.0
+    last_run_at: Optional[datetime] = None
+    last_run_rows: int = 0
+    last_run_seconds: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["last_run_at"] = self.last_run_at.isoformat() if self.last_run_at else None
+        return data
+
+
+purge_metrics = TokenPurgeMetrics()
+
+
+def _delete_batch(session: Session, cutoff: datetime, batch_size: int) -> int:
+    # Pick the oldest expired ids through the expires_at index, then delete them by
+    # primary key. Each batch is its own short transaction, so row locks are only
+    # held for batch_size rows at a time.
+    ids = session.execute(
+        select(UserToken.id)
+        .where(UserToken.expires_at <= cutoff)
+        .order_by(UserToken.expires_at, UserToken.id)
+        .limit(batch_size)
+    ).scalars().all()
+    if ids:
+        session.execute(delete(UserToken).where(UserToken.id.in_(ids)))
+        session.commit()
+    return len(ids)
+
+
+def _delete_batch_blocking(cutoff: datetime, batch_size: int) -> int:
+    with SessionLocal() as session:
+        return _delete_batch(session, cutoff, batch_size)
+
+
+async def purge_expired_batch(cutoff: datetime, batch_size: int) -> int:
+    if settings.DATABASE_ASYNC:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(_delete_batch, cutoff, batch_size)
+    return await asyncio.to_thread(_delete_batch_blocking, cutoff, batch_size)
+
+
+async def purge_expired_tokens() -> int:
+    """
+    Deletes tokens that expired before this run started, batch by batch, pausing
+    between batches so the purge never competes with request traffic for long.
+    A run stops after TOKEN_PURGE_MAX_BATCHES; the rest is picked up next interval.
+    """
+    cutoff = datetime.utcnow()
+    started = time.perf_counter()
+    purged = 0
+    try:
+        for _ in range(settings.TOKEN_PURGE_MAX_BATCHES):
+            deleted = await purge_expired_batch(cutoff, settings.TOKEN_PURGE_BATCH_SIZE)
+            purged += deleted
+            purge_metrics.batches += 1 if deleted else 0
+            if deleted < settings.TOKEN_PURGE_BATCH_SIZE:
+                break
+            await asyncio.sleep(settings.TOKEN_PURGE_PAUSE_SECONDS)
+        purge_metrics.last_error = None
+    except Exception as purge_exec:
+        purge_metrics.last_error = str(purge_exec)
+        logging.exception(purge_exec)
+    finally:
+        elapsed = time.perf_counter() - started
+        purge_metrics.runs += 1
+        purge_metrics.rows_purged += purged
+        purge_metrics.seconds_spent += elapsed
+        purge_metrics.last_run_at = cutoff
+        purge_metrics.last_run_rows = purged
+        purge_metrics.last_run_seconds = elapsed
+    return purged
+
+
+async def run_token_purge(stop: asyncio.Event):
+    """Purges expired tokens every TOKEN_PURGE_INTERVAL_SECONDS until stop is set."""
+    while not stop.is_set():
+        purged = await purge_expired_tokens()
+        if purged:
+            logging.info(f"Purged {purged} expired tokens in {purge_metrics.last_run_seconds:.2f}s")
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.TOKEN_PURGE_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
@@ -2,20 +2,33 @@
 
 from datetime import datetime, timedelta
 import logging
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
 from fastapi import HTTPException
-from app.config.security import generate_token, get_token_payload, hash_password, is_password_strong_enough, load_user, str_decode, str_encode, verify_password
+from app.config.database import commit, execute, refresh, rollback
+from app.config.security import hash_password_async, is_password_strong_enough, load_user, token_user_cache, verify_password_async
+from app.config.token_codec import access_token_codec, claim, refresh_token_codec
 from app.models.user import User, UserToken
 from app.services.email import send_account_activation_confirmation_email, send_account_verification_email, send_password_reset_email
 from app.utils.email_context import FORGOT_PASSWORD, USER_VERIFY_ACCOUNT
-from app.utils.string import unique_string
+from app.utils.string import key_hash, unique_string
 from app.config.settings import get_settings
 
 settings = get_settings()
 
+# How the users.email unique index names itself in the driver error: MySQL and PostgreSQL
+# report the index (ix_users_email), SQLite the column
+DUPLICATE_EMAIL_MARKERS = ("ix_users_email", "UNIQUE constraint failed: users.email")
+
+
+def is_duplicate_email(error: IntegrityError) -> bool:
+    message = str(error.orig)
+    return any(marker in message for marker in DUPLICATE_EMAIL_MARKERS)
+
 async def create_user_account(data, session, background_tasks):
     
-    user_exist = session.query(User).filter(User.emails == data.email).first()
+    user_exist = (await execute(session, select(User).where(User.emails == data.email))).scalars().first()
     if user_exist:
         raise HTTPException(status_code=400, detail="Email is already exists.")
     
@@ -26,26 +39,53 @@ async def create_user_account(data, session, background_tasks):
     user = User()
     user.name = data.name
     user.email = data.email
-    user.password = hash_password(data.password)
+    user.password = await hash_password_async(data.password)
     user.is_active = False
     user.updated_at = datetime.utcnow()
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await commit(session)
+    await refresh(session, user)
     
     # Account Verification Email
     await send_account_verification_email(user, background_tasks=background_tasks)
     return user
+
+
+async def register_user_account(data, session, background_tasks):
+    # One INSERT and one COMMIT: the users.email unique index rejects duplicates, including
+    # two requests racing on the same email, so there is no SELECT before the insert.
+    # The primary key comes back with the insert and created_at is set here, so the row
+    # does not need a refresh after the commit.
+    if not is_password_strong_enough(data.password):
+        raise HTTPException(status_code=400, detail="Please provide a strong password.")
+
+    now = datetime.utcnow()
+    values = dict(name=data.name, email=data.email, password=await hash_password_async(data.password),
+                  is_active=False, updated_at=now, created_at=now)
+    try:
+        result = await execute(session, insert(User).values(**values))
+        await commit(session)
+    except IntegrityError as integrity_error:
+        await rollback(session)
+        if is_duplicate_email(integrity_error):
+            raise HTTPException(status_code=400, detail="Email is already exists.")
+        # Any other constraint failure is a bug, not a user error
+        raise
+
+    user = User(id=result.inserted_primary_key[0], **values)
+    # Account Verification Email, hashed and queued after the response is sent
+    background_tasks.add_task(send_account_verification_email, user, background_tasks)
+    return user
     
     
 async def activate_user_account(data, session, background_tasks):
-    user = session.query(User).filter(User.email == data.email).first()
+    user = (await execute(session, select(User).where(User.email == data.email))).scalars().first()
     if not user:
         raise HTTPException(status_code=400, detail="This link is not valid.")
     
     user_token = user.get_context_string(context=USER_VERIFY_ACCOUNT)
     try:
-        token_valid = verify_password(user_token, data.token)
+        token_valid = await verify_password_async(user_token, data.token)
     except Exception as verify_exec:
         logging.exception(verify_exec)
         token_valid = False
@@ -56,8 +96,8 @@ async def activate_user_account(data, session, background_tasks):
     user.updated_at = datetime.utcnow()
     user.verified_at = datetime.utcnow()
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await commit(session)
+    await refresh(session, user)
     # Activation confirmation email
     await send_account_activation_confirmation_email(user, background_tasks)
     return user
@@ -73,7 +113,7 @@ async def get_login_token(data, session):
     if not user:
         raise HTTPException(status_code=400, detail="Email is not registered with us.")
     
-    if not verify_password(data.password, user.password):
+    if not await verify_password_async(data.password, user.password):
         raise HTTPException(status_code=400, detail="Incorrect email or password.")
     
     if not user.verified_at:
@@ -83,56 +123,60 @@ async def get_login_token(data, session):
         raise HTTPException(status_code=400, detail="Your account has been dactivated. Please contact support.")
         
     # Generate the JWT Token
-    return _generate_tokens(user, session)
+    return await _generate_tokens(user, session)
 
 
 async def get_refresh_token(refresh_token, session):
-    token_payload = get_token_payload(refresh_token, settings.SECRET_KEY, settings.JWT_ALGORITHM)
+    token_payload = refresh_token_codec.decode(refresh_token)
     if not token_payload:
         raise HTTPException(status_code=400, detail="Invalid Request.")
     
     refresh_key = token_payload.get('t')
     access_key = token_payload.get('a')
-    user_id = str_decode(token_payload.get('sub'))
-    user_token = session.query(UserToken).options(joinedload(UserToken.user)).filter(UserToken.refresh_key == refresh_key,
-                                                 UserToken.access_key == access_key,
-                                                 UserToken.user_id == user_id,
-                                                 UserToken.expires_at > datetime.utcnow()
-                                                 ).first()
+    user_id = claim(token_payload, 'sub')
+    user_token = (await execute(session, select(UserToken).options(joinedload(UserToken.user)).where(
+        UserToken.refresh_key_hash == key_hash(refresh_key),
+        UserToken.access_key_hash == key_hash(access_key),
+        UserToken.user_id == user_id,
+        UserToken.expires_at > datetime.utcnow()
+    ))).scalars().first()
     if not user_token:
         raise HTTPException(status_code=400, detail="Invalid Request.")
     
     user_token.expires_at = datetime.utcnow()
     session.add(user_token)
-    session.commit()
-    return _generate_tokens(user_token.user, session)
+    await commit(session)
+    # The old access token must stop working right away, not when its cache entry runs out
+    token_user_cache.invalidate(user_token.id, access_key)
+    return await _generate_tokens(user_token.user, session)
 
 
-def _generate_tokens(user, session):
+async def _generate_tokens(user, session):
     refresh_key = unique_string(100)
     access_key = unique_string(50)
     rt_expires = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
 
     user_token = UserToken()
     user_token.user_id = user.id
-    user_token.refresh_key = refresh_key
-    user_token.access_key = access_key
+    user_token.refresh_key_hash = key_hash(refresh_key)
+    user_token.access_key_hash = key_hash(access_key)
     user_token.expires_at = datetime.utcnow() + rt_expires
     session.add(user_token)
-    session.refresh(user_token)
+    await commit(session)
+    await refresh(session, user_token)
 
     at_payload = {
-        "sub": str_encode(str(user.id)),
+        "sub": str(user.id),
         'a': access_key,
-        'r': str_encode(str(user_token.id)),
-        'n': str_encode(f"{user.name}")
+        'r': user_token.id,
+        'n': user.name
     }
 
     at_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = generate_token(at_payload, settings.JWT_SECRET, settings.JWT_ALGORITHM, at_expires)
+    access_token = access_token_codec.encode(at_payload, at_expires)
 
-    rt_payload = {"sub": str_encode(str(user.id)), "t": refresh_key, 'a': access_key}
-    refresh_token = generate_token(rt_payload, settings.SECRET_KEY, settings.JWT_ALGORITHM, rt_expires)
+    rt_payload = {"sub": str(user.id), "t": refresh_key, 'a': access_key}
+    refresh_token = refresh_token_codec.encode(rt_payload, rt_expires)
     return {
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -165,23 +209,23 @@ async def reset_user_password(data, session):
     
     user_token = user.get_context_string(context=FORGOT_PASSWORD)
     try:
-        token_valid = verify_password(user_token, data.token)
+        token_valid = await verify_password_async(user_token, data.token)
     except Exception as verify_exec:
         logging.exception(verify_exec)
         token_valid = False
     if not token_valid:
         raise HTTPException(status_code=400, detail="Invalid window.")
     
-    user.password = hash_password(data.password)
+    user.password = await hash_password_async(data.password)
     user.updated_at = datetime.now()
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await commit(session)
+    await refresh(session, user)
     # Notify user that password has been updated
     
     
 async def fetch_user_detail(pk, session):
-    user = session.query(User).filter(User.id == pk).first()
+    user = (await execute(session, select(User).where(User.id == pk))).scalars().first()
     if user:
         return user
     raise HTTPException(status_code=400, detail="User does not exists.")
\ No newline at end of file
@@ -1,4 +1,9 @@
+import hashlib
 import secrets
 
 def unique_string(byte: int = 8) -> str:
-    return secrets.token_urlsafe(byte)
\ No newline at end of file
+    return secrets.token_urlsafe(byte)
+
+
+def key_hash(key: str) -> str:
+    return hashlib.sha256(key.encode('ascii')).hexdigest()
\ No newline at end of file
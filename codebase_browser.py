@@ -0,0 +1,180 @@
+import fnmatch
+import os
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+from file_tools import find_trace_file, get_codebase_index
+from trace_parser import app_frames, load_trace_attributes, parse_stack_frames, relative_app_path
+
+# ========================================
+# CODEBASE BROWSER
+# ========================================
+# Summarized, paginated view of the codebase for large trees. Built on the cached
+# file index; file sizes are stat'ed once per index snapshot. Entries deeper than
+# the requested depth are rolled up into their directory (file count, total size,
+# most common extensions), and entries are ranked by how close they are to the
+# file of the failing frame in trace.json.
+
+DEFAULT_PAGE_SIZE = 50
+
+# Never useful to the agents
+_IGNORED_PARTS = {"__pycache__", ".git", ".pytest_cache", ".mypy_cache", "node_modules", ".venv"}
+
+# base directory -> (index list the sizes belong to, {relative path: size})
+_sizes: Dict[str, Tuple[list, Dict[str, int]]] = {}
+
+
+def _file_sizes(base_directory: str) -> Dict[str, int]:
+    files = get_codebase_index(base_directory)
+    cached = _sizes.get(base_directory)
+    if cached and cached[0] is files:
+        return cached[1]
+    sizes = {}
+    for path in files:
+        if _IGNORED_PARTS.intersection(PurePosixPath(path).parts):
+            continue
+        try:
+            sizes[path] = os.path.getsize(os.path.join(base_directory, path))
+        except OSError:
+            continue
+    _sizes[base_directory] = (files, sizes)
+    return sizes
+
+
+def failing_file(base_directory: str = "codebase") -> Optional[str]:
+    """Relative path of the failing frame's file in the codebase, if the trace names one."""
+    trace_path = find_trace_file()
+    if not os.path.isfile(trace_path):
+        return None
+    frames = app_frames(parse_stack_frames(load_trace_attributes(trace_path)))
+    if not frames:
+        return None
+    traced = relative_app_path(frames[0].get("exception.file", ""))
+    sizes = _file_sizes(base_directory)
+    if traced in sizes:
+        return traced
+    # Deployed layouts differ; fall back to the closest path with the same file name
+    name = PurePosixPath(traced).name
+    same_name = [path for path in sizes if PurePosixPath(path).name == name]
+    return min(same_name, key=lambda path: -_shared_parts(path, traced)) if same_name else None
+
+
+def _shared_parts(a: str, b: str) -> int:
+    shared = 0
+    for left, right in zip(PurePosixPath(a).parts, PurePosixPath(b).parts):
+        if left != right:
+            break
+        shared += 1
+    return shared
+
+
+def _proximity(path: str, target: Optional[str]) -> tuple:
+    """Sort key: the target itself, then entries sharing the most leading directories with it."""
+    if not target:
+        return (0, 0)
+    if path == target or target.startswith(path + "/"):
+        return (0, -len(PurePosixPath(path).parts))
+    shared = _shared_parts(path, target)
+    hops = len(PurePosixPath(path).parts) + len(PurePosixPath(target).parts) - 2 * shared
+    return (1, hops)
+
+
+@dataclass
+class Entry:
+    path: str
+    is_dir: bool
+    files: int = 0
+    size: int = 0
+    extensions: Dict[str, int] = field(default_factory=dict)
+
+    def format(self, marker: str = "") -> str:
+        if not self.is_dir:
+            return f"{self.path} ({_human_size(self.size)}){marker}"
+        top = sorted(self.extensions.items(), key=lambda item: (-item[1], item[0]))[:3]
+        kinds = ", ".join(f"{count} {extension or 'other'}" for extension, count in top)
+        files = f"{self.files} file" + ("s" if self.files != 1 else "")
+        return f"{self.path}/ [{files}, {_human_size(self.size)}; {kinds}]{marker}"
+
+
+def _human_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def browse(directory: str = "", pattern: str = "", depth: int = 1,
+           base_directory: str = "codebase") -> Tuple[List[Entry], Optional[str]]:
+    """
+    Entries under directory (relative to base_directory) down to depth levels, with
+    deeper files rolled up into their directory. pattern filters files by glob on the
+    relative path ('*.py', 'services/*', 'user*'). Returns (ranked entries, failing file).
+    """
+    prefix = directory.strip("/")
+    prefix_parts = len(PurePosixPath(prefix).parts) if prefix else 0
+    entries: Dict[str, Entry] = {}
+    for path, size in _file_sizes(base_directory).items():
+        if prefix and not path.startswith(prefix + "/"):
+            continue
+        if pattern and not (fnmatch.fnmatch(path, pattern) or fnmatch.fnmatch(PurePosixPath(path).name, pattern)):
+            continue
+        parts = PurePosixPath(path).parts
+        if len(parts) - prefix_parts <= max(depth, 1):
+            entries[path] = Entry(path, False, 1, size)
+            continue
+        rolled_up = "/".join(parts[:prefix_parts + max(depth, 1)])
+        entry = entries.setdefault(rolled_up, Entry(rolled_up, True))
+        entry.files += 1
+        entry.size += size
+        extension = PurePosixPath(path).suffix
+        entry.extensions[extension] = entry.extensions.get(extension, 0) + 1
+
+    target = failing_file(base_directory)
+    ranked = sorted(entries.values(), key=lambda entry: (_proximity(entry.path, target), entry.path))
+    return ranked, target
+
+
+# ========================================
+# TOOL
+# ========================================
+def browse_codebase(directory: str = "", pattern: str = "", depth: int = 1,
+                    page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> str:
+    """
+    Browses the codebase as a summarized tree instead of a full file listing.
+    Directories below the depth limit are shown as rollups with file counts and sizes.
+    Entries closest to the file of the failing frame in trace.json come first.
+
+    Args:
+        directory: Directory inside the codebase to start from, e.g. "services" ("" for the root).
+        pattern: Optional glob on file paths or names, e.g. "*.py", "routes/*", "user*".
+        depth: How many directory levels below `directory` to list individually.
+        page: Page number, starting at 1.
+        page_size: Entries per page.
+    """
+    print(f"🌳 [BROWSE] {directory or '.'} pattern={pattern or '*'} depth={depth} page={page}")
+    try:
+        entries, target = browse(directory, pattern, depth)
+    except Exception as e:
+        return f"Error browsing codebase: {str(e)}"
+    if not entries:
+        return f"No files in codebase/{directory}" + (f" matching '{pattern}'" if pattern else "")
+
+    page_size = max(1, page_size)
+    pages = (len(entries) + page_size - 1) // page_size
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    shown = entries[start:start + page_size]
+
+    files = sum(entry.files for entry in entries)
+    total_size = sum(entry.size for entry in entries)
+    lines = [f"codebase/{directory.strip('/')}: {files} files, {_human_size(total_size)} "
+             f"(page {page}/{pages}, entries {start + 1}-{start + len(shown)} of {len(entries)})"]
+    if target:
+        lines.append(f"Ranked by proximity to the failing file codebase/{target}")
+    lines.extend("- " + entry.format("  <- failing file" if entry.path == target else "") for entry in shown)
+    if page < pages:
+        lines.append(f"More: browse_codebase(directory={directory!r}, pattern={pattern!r}, depth={depth}, "
+                     f"page={page + 1})")
+    return "\n".join(lines)
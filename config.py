@@ -1,6 +1,89 @@
+import os
 
+# =========================
+# ENV SETUP
+# =========================
+# Loaded once here - every module reads its settings from config
+try:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+except Exception:
+    pass
 
 # MCP Server configuration for SSE transport
 
 
 MEMORY_USER_ID = "aiops"
+
+# Number of fix candidates generated concurrently by speculative_fix().
+# 0 or 1 keeps the regular serial analyze -> fix -> validate workflow.
+SPECULATIVE_FIX_CANDIDATES = int(os.environ.get("AIOPS_SPECULATIVE_FIX_CANDIDATES", 0))
+
+# Model routing: pick model and thinking budget per agent and per incident
+# instead of running every agent on the same model.
+MODEL_ROUTING = os.environ.get("AIOPS_MODEL_ROUTING", "false").lower() in ("1", "true", "yes")
+
+# "gemini" talks to the real API, "fake" uses the offline FakeLlm stand-in.
+MODEL_BACKEND = os.environ.get("AIOPS_MODEL_BACKEND", "gemini").lower()
+
+# Explicit context caching of the static prompt prefix (instruction, tools, file listing).
+# Implicit provider caching works without it as long as the prefix stays stable.
+CONTEXT_CACHE = os.environ.get("AIOPS_CONTEXT_CACHE", "false").lower() in ("1", "true", "yes")
+CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("AIOPS_CONTEXT_CACHE_TTL_SECONDS", 3600))
+
+# Estimated context token ceiling per agent for the tool loop history.
+# Older tool responses are compacted into summaries once a request exceeds it.
+CONTEXT_TOKEN_CEILING = int(os.environ.get("AIOPS_CONTEXT_TOKEN_CEILING", 24000))
+CONTEXT_TOKEN_CEILINGS = {
+    "root_agent": int(os.environ.get("AIOPS_ROOT_CONTEXT_TOKEN_CEILING", 16000)),
+}
+
+# Compare the traced function body with the current source before running any agent,
+# and close incidents whose failing code is already gone.
+TRACE_PRECHECK = os.environ.get("AIOPS_TRACE_PRECHECK", "true").lower() in ("1", "true", "yes")
+
+# Validated fixes keyed by exception fingerprint + code context hash. A recurring
+# incident replays its stored fix and only runs the validator.
+FIX_STORE = os.environ.get("AIOPS_FIX_STORE", "true").lower() in ("1", "true", "yes")
+FIX_STORE_FILE = os.environ.get("AIOPS_FIX_STORE_FILE", "fix_store.json")
+
+# Durable incident runs: ADK sessions persisted in SQLite plus per-stage checkpoints
+# (analysis, fix, validation), so a restarted run resumes after the last completed stage.
+CHECKPOINTS = os.environ.get("AIOPS_CHECKPOINTS", "true").lower() in ("1", "true", "yes")
+CHECKPOINT_DB = os.environ.get("AIOPS_CHECKPOINT_DB", "aiops_checkpoints.db")
+SESSION_DB = os.environ.get("AIOPS_SESSION_DB", "aiops_sessions.db")
+
+# Concurrent identical tool calls (file reads, trace lookups, memory searches) and
+# identical model requests share one in-flight call instead of each doing the work.
+SINGLE_FLIGHT = os.environ.get("AIOPS_SINGLE_FLIGHT", "true").lower() in ("1", "true", "yes")
+
+# Process-wide pacing of model calls: token buckets for requests and tokens per minute,
+# served by incident priority and round-robin across incidents.
+LLM_SCHEDULER = os.environ.get("AIOPS_LLM_SCHEDULER", "true").lower() in ("1", "true", "yes")
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get("AIOPS_LLM_REQUESTS_PER_MINUTE", 60))
+LLM_TOKENS_PER_MINUTE = int(os.environ.get("AIOPS_LLM_TOKENS_PER_MINUTE", 250000))
+
+# Continuous trace ingestion (python main.py --ingest): a polled inbox directory and a
+# local HTTP receiver feed a bounded, deduplicated incident queue.
+INGEST_INBOX = os.environ.get("AIOPS_INGEST_INBOX", "inbox")
+INGEST_SPOOL = os.environ.get("AIOPS_INGEST_SPOOL", "ingest_spool")
+INGEST_POLL_SECONDS = float(os.environ.get("AIOPS_INGEST_POLL_SECONDS", 1.0))
+INGEST_QUEUE_SIZE = int(os.environ.get("AIOPS_INGEST_QUEUE_SIZE", 100))
+INGEST_WORKERS = int(os.environ.get("AIOPS_INGEST_WORKERS", 2))
+INGEST_DEDUPE_SECONDS = float(os.environ.get("AIOPS_INGEST_DEDUPE_SECONDS", 3600))
+
+# Trees with more files than this are summarized per directory (list_codebase_files,
+# prompt file listing) instead of listed path by path; browse_codebase drills down.
+CODEBASE_LISTING_MAX_FILES = int(os.environ.get("AIOPS_CODEBASE_LISTING_MAX_FILES", 200))
+
+# Per-incident in-memory overlay for fixed files. At the end of an incident "validated"
+# commits them to disk when validation passed, "always" commits every fix and "never"
+# discards them (OverlayWorkspace.materialize writes them elsewhere on request).
+OVERLAY_FS = os.environ.get("AIOPS_OVERLAY_FS", "true").lower() in ("1", "true", "yes")
+OVERLAY_COMMIT = os.environ.get("AIOPS_OVERLAY_COMMIT", "validated").lower()
+OVERLAY_COMMIT_MODES = ("validated", "always", "never")
+if OVERLAY_COMMIT not in OVERLAY_COMMIT_MODES:
+    raise ValueError(
+        f"Unknown AIOPS_OVERLAY_COMMIT '{OVERLAY_COMMIT}', use one of {', '.join(OVERLAY_COMMIT_MODES)}"
+    )
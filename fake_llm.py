@@ -0,0 +1,74 @@
+from typing import AsyncGenerator, Callable, List, Optional
+
+from pydantic import Field
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse, LLMRegistry
+from google.genai import types
+
+from validation import VALIDATION_PASS
+
+
+def _estimate_tokens(text: str) -> int:
+    # Rough 4-characters-per-token estimate, good enough for offline accounting
+    return max(1, len(text) // 4)
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    texts = []
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if isinstance(instruction, str):
+        texts.append(instruction)
+    elif instruction is not None and instruction.parts:
+        texts.extend(part.text or "" for part in instruction.parts)
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            texts.append(part.text or "")
+    return "\n".join(texts)
+
+
+class FakeLlm(BaseLlm):
+    """
+    Offline stand-in for Gemini models.
+    Records every request it receives and answers with canned text, so the agent
+    wiring (model routing, callbacks, scheduling) can be exercised without network
+    access or API quota. Model names starting with 'fake-' resolve to this class.
+    """
+
+    model: str = "fake-flash"
+    responder: Optional[Callable[[LlmRequest], str]] = None
+    calls: List[LlmRequest] = Field(default_factory=list)
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r"fake-.*"]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        self.calls.append(llm_request)
+
+        if self.responder:
+            text = self.responder(llm_request)
+        else:
+            text = f"[{llm_request.model or self.model}] Done. {VALIDATION_PASS}"
+
+        prompt_tokens = _estimate_tokens(_request_text(llm_request))
+        response_tokens = _estimate_tokens(text)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=response_tokens,
+                total_token_count=prompt_tokens + response_tokens,
+            ),
+        )
+
+    def thinking_budgets(self) -> List[Optional[int]]:
+        """Returns the thinking budget of every recorded request, in call order."""
+        budgets = []
+        for request in self.calls:
+            thinking = request.config.thinking_config if request.config else None
+            budgets.append(thinking.thinking_budget if thinking else None)
+        return budgets
+
+
+LLMRegistry.register(FakeLlm)
@@ -1,20 +1,74 @@
 import os
 import subprocess
 import json
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING, MutableMapping
 
+from config import CODEBASE_LISTING_MAX_FILES
+from incident_context import current_trace_path
+from overlay_fs import current_overlay, current_overlay_id, read_text, write_text
+from single_flight import single_flight
 
+if TYPE_CHECKING:
+    from google.adk.tools import ToolContext
+
+# Session state key: original path -> 'fixed_' path of every fix written in the session,
+# so checkpoints and the fix store use the files this incident wrote, not whatever is on disk
+FIXED_FILES_STATE_KEY = "fixed_files"
+
+
+def remember_fixed_file(state: MutableMapping, original_path, fixed_path):
+    """Records a written fix in the session state under FIXED_FILES_STATE_KEY."""
+    written = dict(state.get(FIXED_FILES_STATE_KEY) or {})
+    written[os.path.normpath(str(original_path))] = os.path.normpath(str(fixed_path))
+    # Assign a new dict so the change is tracked as a state delta
+    state[FIXED_FILES_STATE_KEY] = written
+
+# ========================================
+# CODEBASE FILE INDEX
+# ========================================
+# Relative file paths per base directory, refreshed after CODEBASE_INDEX_TTL_SECONDS
+# or when one of the write tools below changes the tree. Keeps repeated listings
+# cheap, especially in the long-running server mode.
+CODEBASE_INDEX_TTL_SECONDS = 30
+
+_codebase_index = {}
+
+
+def get_codebase_index(base_directory: str = "codebase") -> list:
+    """Returns the sorted relative paths of all files under base_directory."""
+    cached = _codebase_index.get(base_directory)
+    if cached and time.monotonic() - cached[0] < CODEBASE_INDEX_TTL_SECONDS:
+        return cached[1]
+
+    base_path = Path(base_directory)
+    files = sorted(
+        str(file_path.relative_to(base_path))
+        for file_path in base_path.rglob("*")
+        if file_path.is_file()
+    )
+    _codebase_index[base_directory] = (time.monotonic(), files)
+    return files
+
+
+def invalidate_codebase_index():
+    """Forces the next get_codebase_index() call to rescan the tree."""
+    _codebase_index.clear()
+
+
+@single_flight(key=current_overlay_id)
 def read_file(file_path: str) -> str:
     """Reads the content of a file."""
     print(f"📖 [FILE] Reading file: {file_path}")
     try:
-        with open(file_path, "r") as f:
-            return f.read()
+        # Fixed files of the running incident live in its overlay workspace
+        return read_text(file_path)
     except Exception as e:
         return f"Error reading file {file_path}: {str(e)}"
 
 
-def write_file(file_path: str, content: str) -> str:
+def write_file(file_path: str, content: str, tool_context: "ToolContext" = None) -> str:
     """
     Creates a new file with 'fixed_' prefix in the same directory as the original file.
     Generic implementation that works with any file path.
@@ -22,6 +76,9 @@ def write_file(file_path: str, content: str) -> str:
     Example: 
         - Input: 'codebase/services/user.py'
         - Output: 'codebase/services/fixed_user.py'
+
+    During an incident the fixed file lives in the incident's overlay workspace;
+    read_file() sees it right away, the disk only once the incident is committed.
     """
     try:
         # Extract directory and filename
@@ -37,9 +94,11 @@ def write_file(file_path: str, content: str) -> str:
         
         print(f"📝 [FILE] Creating fixed file: {fixed_file_path}")
         
-        # Write content to the new fixed file
-        with open(fixed_file_path, "w") as f:
-            f.write(content)
+        # Write content to the new fixed file (the incident's workspace while one is active)
+        if not write_text(fixed_file_path, content):
+            invalidate_codebase_index()
+        if tool_context is not None:
+            remember_fixed_file(tool_context.state, file_path, fixed_file_path)
         
         result = f"Successfully created fixed file: {fixed_file_path}\nOriginal file unchanged: {file_path}"
         print(f"✅ [FILE] {result}")
@@ -49,21 +108,85 @@ def write_file(file_path: str, content: str) -> str:
         return f"Error creating fixed file for {file_path}: {str(e)}"
 
 
+def candidate_file_path(file_path: str, candidate: int) -> Path:
+    """
+    Returns the path of a speculative fix candidate for the original file.
+
+    Example:
+        - Input: 'codebase/services/user.py', 2
+        - Output: 'codebase/services/fixed_2_user.py'
+    """
+    path_obj = Path(file_path)
+    return path_obj.parent / f"fixed_{candidate}_{path_obj.name}"
+
+
+def write_candidate_file(file_path: str, content: str, candidate: int) -> str:
+    """
+    Creates a 'fixed_<n>_' candidate file next to the original file.
+    Used by speculative fixing so that concurrent candidates never overwrite each other.
+    """
+    try:
+        candidate_path = candidate_file_path(file_path, candidate)
+        print(f"📝 [FILE] Creating fix candidate {candidate}: {candidate_path}")
+
+        if not write_text(candidate_path, content):
+            invalidate_codebase_index()
+
+        return f"Successfully created fix candidate: {candidate_path}\nOriginal file unchanged: {file_path}"
+
+    except Exception as e:
+        return f"Error creating fix candidate for {file_path}: {str(e)}"
+
+
+def promote_candidate_file(file_path: str, candidate: int) -> str:
+    """
+    Promotes a validated 'fixed_<n>_' candidate to the regular 'fixed_' file
+    so the rest of the workflow finds the fix where it always does.
+    """
+    try:
+        path_obj = Path(file_path)
+        fixed_path = path_obj.parent / f"fixed_{path_obj.name}"
+        overlay = current_overlay()
+        if overlay is not None:
+            overlay.rename(candidate_file_path(file_path, candidate), fixed_path)
+        else:
+            os.replace(candidate_file_path(file_path, candidate), fixed_path)
+            invalidate_codebase_index()
+
+        print(f"✅ [FILE] Promoted fix candidate {candidate} to {fixed_path}")
+        return str(fixed_path)
+
+    except Exception as e:
+        return f"Error promoting fix candidate for {file_path}: {str(e)}"
+
+
+@single_flight(key=current_overlay_id)
 def list_files(directory: str = ".") -> str:
     """Lists files in the specified directory."""
     try:
         files = os.listdir(directory)
+        overlay = current_overlay()
+        if overlay is not None:
+            pending = [os.path.basename(path) for path in overlay.paths()
+                       if os.path.dirname(path) == os.path.normpath(directory)]
+            files = sorted(set(files) | set(pending))
         return "\n".join(files)
     except Exception as e:
         return f"Error listing files: {str(e)}"
 
 
+@single_flight(key=current_trace_path)
 def find_trace_file() -> str:
     """
     Searches for trace.json file in the codebase directory.
     Returns the full path to the trace.json file.
     Always searches in the 'codebase' folder.
     """
+    # Incidents delivered by the ingestion service carry their own trace
+    incident_trace = current_trace_path()
+    if incident_trace:
+        return incident_trace
+
     base_directory = "codebase"
     print(f"🔍 [SEARCH] Looking for trace.json in {base_directory}")
     try:
@@ -88,6 +211,7 @@ def find_trace_file() -> str:
         return f"Error searching for trace.json: {str(e)}"
 
 
+@single_flight(key=current_trace_path)
 def find_error_source_file() -> str:
     """
     Reads trace.json to identify the source file that caused the error.
@@ -223,6 +347,7 @@ Use read_file('{actual_file_path}') to read the faulty code.
         return f"Error finding error source file: {str(e)}"
 
 
+@single_flight(key=current_trace_path)
 def check_if_error_exists() -> str:
     """
     Checks if the error from trace.json still exists in the current code.
@@ -367,8 +492,16 @@ Current Code Analysis:
             if "has no attribute" in error_msg:
                 result += f"\n   Error message: {error_msg}"
         
-        result += f"\n\n💡 Recommendation: Analyzer should compare trace error with current code to confirm if fix is needed."
-        result += f"\n   Read file '{actual_file_path}' and check if the error condition still exists."
+        # Definitive answer from comparing the traced function body with the current source
+        from code_compare import check_incident, format_verdict
+
+        verdict = check_incident(trace_path, base_directory)
+        result += f"\n\nTrace vs Current Code:\n{format_verdict(verdict)}"
+        if verdict.resolved:
+            result += f"\n\n✅ Recommendation: The error is already fixed in the current code. No fix is needed."
+        else:
+            result += f"\n\n💡 Recommendation: Analyzer should compare trace error with current code to confirm if fix is needed."
+            result += f"\n   Read file '{actual_file_path}' and check if the error condition still exists."
         
         print(result)
         return result
@@ -379,11 +512,13 @@ Current Code Analysis:
         return f"Error checking if error exists: {str(e)}"
 
 
+@single_flight()
 def list_codebase_files() -> str:
     """
     Lists all files in the codebase directory recursively.
     Useful for understanding the project structure.
     Always lists files in the 'codebase' folder.
+    Large trees are summarized per directory; use browse_codebase() to drill down.
     """
     base_directory = "codebase"
     print(f"📂 [LIST] Listing all files in {base_directory}")
@@ -393,16 +528,18 @@ def list_codebase_files() -> str:
         if not base_path.exists():
             return f"Error: Directory {base_directory} does not exist"
 
-        files = []
-        for file_path in base_path.rglob("*"):
-            if file_path.is_file():
-                relative_path = file_path.relative_to(base_path)
-                files.append(str(relative_path))
+        files = get_codebase_index(base_directory)
 
         if not files:
             return f"No files found in {base_directory}"
 
-        result = f"Files in {base_directory}:\n" + "\n".join(sorted(files))
+        if len(files) > CODEBASE_LISTING_MAX_FILES:
+            # Large trees get the summarized tree instead of every path
+            from codebase_browser import browse_codebase
+            print(f"✅ [LIST] {len(files)} files - returning the summarized tree")
+            return browse_codebase()
+
+        result = f"Files in {base_directory}:\n" + "\n".join(files)
         print(f"✅ [LIST] Found {len(files)} files")
         return result
 
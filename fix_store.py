@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import re
+import textwrap
+import time
+from pathlib import Path
+from typing import Optional
+
+from config import FIX_STORE_FILE
+from overlay_fs import path_exists, read_text
+from code_compare import MISSING, compare_frame, locate_function, normalize_source, source_hash
+from trace_parser import app_frames, load_trace_attributes, parse_stack_frames
+from validation import check_python_syntax, validation_passed
+
+# ========================================
+# VALIDATED FIX STORE
+# ========================================
+# Fixes that passed validation, keyed by exception fingerprint + code context hash:
+#   fingerprint  - exception type, message and failing function name (no file path,
+#                  so the same bug in another service or branch still matches)
+#   context hash - hash of the normalized traced function body
+# Each entry holds a function-level patch (the fixed function source) and the
+# validation outcome. Persisted to FIX_STORE_FILE like memory.json.
+
+_store: Optional[dict] = None
+
+# Message parts that vary between occurrences of the same bug
+_VOLATILE_MESSAGE_PARTS = re.compile(r"0x[0-9a-fA-F]+|\b\d+\b")
+
+
+def _load_store() -> dict:
+    global _store
+    if _store is None:
+        _store = {"fixes": {}, "stats": {}}
+        if os.path.exists(FIX_STORE_FILE):
+            try:
+                with open(FIX_STORE_FILE, "r") as f:
+                    _store = json.load(f)
+            except Exception as e:
+                print(f"⚠️ [FIX_STORE] Failed to load {FIX_STORE_FILE}: {e}")
+        _store.setdefault("fixes", {})
+        _store.setdefault("stats", {})
+    return _store
+
+
+def _save_store():
+    try:
+        with open(FIX_STORE_FILE, "w") as f:
+            json.dump(_load_store(), f, indent=4)
+    except Exception as e:
+        print(f"⚠️ [FIX_STORE] Failed to save to {FIX_STORE_FILE}: {e}")
+
+
+def _count(stat: str, amount: float = 1):
+    stats = _load_store()["stats"]
+    stats[stat] = stats.get(stat, 0) + amount
+
+
+def incident_key(trace_path: str) -> Optional[tuple]:
+    """Returns (key, error frame) for the traced incident, or None when the trace has no app frame."""
+    return incident_key_from_attributes(load_trace_attributes(trace_path))
+
+
+def incident_key_from_attributes(attrs: dict) -> Optional[tuple]:
+    """incident_key() for exception event attributes that are not in a file (yet)."""
+    frames = app_frames(parse_stack_frames(attrs))
+    if not frames or not frames[0].get("exception.function_body"):
+        return None
+    frame = frames[0]
+    message = _VOLATILE_MESSAGE_PARTS.sub("#", attrs.get("exception.message", ""))
+    fingerprint = hashlib.sha256(
+        f"{attrs.get('exception.type', '')}|{message}|{frame.get('exception.function_name', '')}".encode()
+    ).hexdigest()[:16]
+    context_hash = source_hash(normalize_source(frame["exception.function_body"]))[:16]
+    return f"{fingerprint}:{context_hash}", frame
+
+
+def _function_source(file_path: str, function_name: str) -> Optional[str]:
+    try:
+        source = read_text(file_path)
+    except OSError:
+        return None
+    span = locate_function(source, function_name)
+    if span is None:
+        return None
+    return "\n".join(source.splitlines()[span[0] - 1:span[1]])
+
+
+def record_validated_fix(trace_path: str, original_path: str, fixed_path: str, validation: str) -> str:
+    """Stores the validated fix of the traced function as a function-level patch."""
+    found = incident_key(trace_path)
+    if not found:
+        return "Error: trace has no application frame to key the fix on"
+    key, frame = found
+    function_name = frame.get("exception.function_name", "")
+
+    original_function = _function_source(original_path, function_name)
+    fixed_function = _function_source(fixed_path, function_name)
+    if original_function is None or fixed_function is None:
+        return f"Error: function '{function_name}' not found in {original_path} or {fixed_path}"
+    if normalize_source(original_function) == normalize_source(fixed_function):
+        return f"Error: the fix does not change '{function_name}'"
+
+    store = _load_store()
+    previous = store["fixes"].get(key, {})
+    store["fixes"][key] = {
+        "function_name": function_name,
+        "exception_message": load_trace_attributes(trace_path).get("exception.message", ""),
+        "fixed_function": fixed_function,
+        "source_file": original_path,
+        "validation": "PASS" if validation_passed(validation) else "FAIL",
+        "validation_summary": validation.strip()[-500:],
+        "recorded_at": time.time(),
+        "replays": previous.get("replays", 0),
+    }
+    _save_store()
+    print(f"📚 [FIX_STORE] Recorded validated fix {key} for {function_name}")
+    return key
+
+
+def _apply_patch(entry: dict, frame: dict) -> Optional[tuple]:
+    """
+    Replaces the failing function in the current file with the stored fixed function.
+    The current function may have drifted from the traced one; the validator run
+    after the replay decides whether the stored fix still holds.
+    Returns (original path, patched content) or None.
+    """
+    comparison = compare_frame(frame)
+    if comparison.verdict == MISSING or comparison.file_path is None:
+        return None
+    source = Path(comparison.file_path).read_text()
+    span = locate_function(source, entry["function_name"], comparison.current_start_line or 0)
+    if span is None:
+        return None
+
+    lines = source.splitlines()
+    first_line = lines[span[0] - 1]
+    indent = first_line[:len(first_line) - len(first_line.lstrip())]
+    # Stored functions are re-indented to wherever the function sits in this file
+    fixed_lines = [indent + line if line else line
+                   for line in textwrap.dedent(entry["fixed_function"]).splitlines()]
+    patched = lines[:span[0] - 1] + fixed_lines + lines[span[1]:]
+    return comparison.file_path, "\n".join(patched) + ("\n" if source.endswith("\n") else "")
+
+
+def lookup(trace_path: str) -> Optional[tuple]:
+    """Returns (key, entry, frame) of a validated fix for the traced incident, counting hits and misses."""
+    found = incident_key(trace_path)
+    _count("lookups")
+    entry = _load_store()["fixes"].get(found[0]) if found else None
+    if not entry or entry.get("validation") != "PASS":
+        _count("misses")
+        _save_store()
+        return None
+    _count("hits")
+    _save_store()
+    return found[0], entry, found[1]
+
+
+async def replay_known_fix(trace_path: str, run_validator) -> Optional[str]:
+    """
+    Applies a stored fix for the incident and runs only the validator on it.
+    run_validator(fixed_path, original_path) must return the validator's answer.
+    Returns the validator's answer on a passing replay, None on a miss or a failed
+    replay (the caller then falls back to the full agent pipeline).
+    """
+    from file_tools import write_file
+
+    started = time.perf_counter()
+    hit = lookup(trace_path)
+    if not hit:
+        return None
+    key, entry, frame = hit
+
+    patched = _apply_patch(entry, frame)
+    if not patched:
+        print(f"⚠️ [FIX_STORE] Stored fix {key} does not apply to the current code")
+        _count("replay_failures")
+        _save_store()
+        return None
+    original_path, content = patched
+    result = write_file(original_path, content)
+    if result.startswith("Error"):
+        return None
+    path_obj = Path(original_path)
+    fixed_path = str(path_obj.parent / f"fixed_{path_obj.name}")
+
+    syntax_error = check_python_syntax(fixed_path) if fixed_path.endswith(".py") else ""
+    answer = "" if syntax_error else await run_validator(fixed_path, original_path)
+    elapsed = time.perf_counter() - started
+    _count("replay_seconds", elapsed)
+
+    if not validation_passed(answer):
+        print(f"❌ [FIX_STORE] Replayed fix {key} failed validation - falling back to the agents")
+        _count("replay_failures")
+        _save_store()
+        return None
+
+    entry["replays"] = entry.get("replays", 0) + 1
+    _count("replays_passed")
+    _save_store()
+    print(f"⚡ [FIX_STORE] Replayed validated fix {key} in {elapsed:.1f}s")
+    return f"Replayed known fix {key} for '{entry['function_name']}'.\nFixed file: {fixed_path}\n{answer}"
+
+
+def record_pipeline_run(seconds: float):
+    """Records the duration of a full agent pipeline run, the baseline for time saved."""
+    _count("pipeline_runs")
+    _count("pipeline_seconds", seconds)
+    _save_store()
+
+
+def fix_store_report() -> str:
+    stats = _load_store()["stats"]
+    lookups = stats.get("lookups", 0)
+    if not lookups:
+        return "📚 [FIX_STORE] No lookups yet"
+    passed = stats.get("replays_passed", 0)
+    average_pipeline = stats.get("pipeline_seconds", 0) / max(stats.get("pipeline_runs", 0), 1)
+    average_replay = stats.get("replay_seconds", 0) / max(stats.get("hits", 0), 1)
+    saved = passed * max(average_pipeline - average_replay, 0) if stats.get("pipeline_runs") else 0
+    return (
+        f"📚 [FIX_STORE] {len(_load_store()['fixes'])} fixes stored\n"
+        f"- Lookups: {lookups}, hits: {stats.get('hits', 0)} ({stats.get('hits', 0) / lookups:.0%}), "
+        f"replays passed: {passed}, replay failures: {stats.get('replay_failures', 0)}\n"
+        f"- Average full pipeline: {average_pipeline:.1f}s, average replay: {average_replay:.1f}s, "
+        f"time saved: {saved:.1f}s"
+    )
+
+
+# ========================================
+# CALLBACK
+# ========================================
+async def record_fix_on_validation_pass(callback_context, llm_response):
+    """
+    Runs AFTER every validator LLM call. A passing validation stores the 'fixed_'
+    file this session wrote for the failing file, for future replays.
+    """
+    try:
+        if not llm_response.content or not llm_response.content.parts:
+            return None
+        text = "".join(part.text or "" for part in llm_response.content.parts)
+        if not validation_passed(text):
+            return None
+
+        from file_tools import FIXED_FILES_STATE_KEY, find_trace_file
+        trace_path = find_trace_file()
+        found = incident_key(trace_path) if os.path.isfile(trace_path) else None
+        if not found:
+            return None
+        comparison = compare_frame(found[1])
+        if comparison.file_path:
+            # The fixed file write_file() wrote in this session is the one the validator checked
+            written = callback_context.state.get(FIXED_FILES_STATE_KEY) or {}
+            fixed_path = written.get(os.path.normpath(comparison.file_path))
+            if fixed_path and path_exists(fixed_path):
+                record_validated_fix(trace_path, comparison.file_path, fixed_path, text)
+        return None
+
+    except Exception as e:
+        return None
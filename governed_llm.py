@@ -0,0 +1,59 @@
+from typing import AsyncGenerator
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+
+from llm_scheduler import get_scheduler
+
+
+def _estimate_request_tokens(llm_request: LlmRequest) -> int:
+    # Same 4-characters-per-token estimate as the history compaction
+    chars = 0
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if isinstance(instruction, str):
+        chars += len(instruction)
+    elif instruction is not None and instruction.parts:
+        chars += sum(len(part.text or "") for part in instruction.parts)
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            chars += len(part.text or "")
+            if part.function_response is not None:
+                chars += len(str(part.function_response.response))
+    return max(1, chars // 4)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    return getattr(error, "code", None) == 429 or "RESOURCE_EXHAUSTED" in str(error)
+
+
+class GovernedLlm(BaseLlm):
+    """
+    Wraps another model so every call first takes its turn and budget from the
+    process-wide LlmScheduler, then reports its real token use back.
+    """
+
+    inner: BaseLlm
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        scheduler = get_scheduler()
+        estimated = _estimate_request_tokens(llm_request)
+        await scheduler.acquire(estimated)
+
+        used = None
+        try:
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                if response.usage_metadata and response.usage_metadata.total_token_count:
+                    used = response.usage_metadata.total_token_count
+                yield response
+        except Exception as e:
+            if _is_rate_limit(e):
+                scheduler.rate_limited()
+            raise
+        finally:
+            if used is not None:
+                scheduler.settle(estimated, used)
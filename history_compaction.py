@@ -0,0 +1,174 @@
+import hashlib
+import json
+from typing import Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse, LlmRequest
+from google.genai import types
+
+from config import CONTEXT_TOKEN_CEILING, CONTEXT_TOKEN_CEILINGS
+
+# Tool responses smaller than this are never worth compacting
+LARGE_RESPONSE_CHARS = 600
+
+# Tools whose multi-line banners can be reduced to their "- key: value" lines
+BANNER_TOOLS = {"find_error_source_file", "check_if_error_exists"}
+
+
+def _estimate_tokens(chars: int) -> int:
+    # Rough 4-characters-per-token estimate
+    return chars // 4
+
+
+def _response_text(response: dict) -> str:
+    if set(response) == {"result"} and isinstance(response["result"], str):
+        return response["result"]
+    return json.dumps(response, default=str)
+
+
+def _content_chars(content: types.Content) -> int:
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_response and part.function_response.response:
+            chars += len(_response_text(part.function_response.response))
+        elif part.function_call:
+            chars += len(json.dumps(part.function_call.args or {}, default=str))
+    return chars
+
+
+def _call_key(name: str, args: dict) -> tuple:
+    """Identifies calls that return the same data (read_file of the same path, same banner)."""
+    if name == "read_file":
+        return name, args.get("file_path", "")
+    return name, json.dumps(args, sort_keys=True, default=str)
+
+
+def _summarize(name: str, args: dict, text: str, superseded: bool) -> str:
+    digest = hashlib.sha256(text.encode()).hexdigest()[:12]
+    if name == "read_file":
+        summary = (
+            f"[compacted] read_file('{args.get('file_path', '')}'): "
+            f"{text.count(chr(10)) + 1} lines, sha256 {digest}."
+        )
+    elif name in BANNER_TOOLS:
+        facts = [line.strip() for line in text.splitlines() if line.strip().startswith("- ")]
+        summary = f"[compacted] {name}():\n" + "\n".join(facts[:6])
+    else:
+        summary = f"[compacted] {name}: {len(text)} characters, sha256 {digest}."
+
+    if superseded:
+        summary += " A newer result of the same call appears later in the conversation."
+    else:
+        summary += " Call the tool again if the full content is needed."
+    return summary
+
+
+def _compact_part(part: types.Part, call_args: dict, superseded: bool) -> types.Part:
+    response = part.function_response
+    text = _response_text(response.response)
+    return types.Part(
+        function_response=types.FunctionResponse(
+            id=response.id,
+            name=response.name,
+            response={"result": _summarize(response.name, call_args, text, superseded)},
+        )
+    )
+
+
+def compact_contents(contents: list, token_ceiling: int) -> tuple:
+    """
+    Returns (compacted contents, number of compacted tool responses).
+
+    1. Large tool responses superseded by a later identical call (the same file read
+       again, the same banner again) are replaced with a compact summary.
+    2. While the estimate is still above the token ceiling, the oldest remaining large
+       tool responses are compacted as well. The most recent tool response is always kept.
+    Content objects are replaced, never mutated, so the session history stays intact.
+    """
+    call_args = {}
+    for content in contents:
+        for part in content.parts or []:
+            if part.function_call and part.function_call.id:
+                call_args[part.function_call.id] = dict(part.function_call.args or {})
+
+    # (content index, part index, key, size) of every tool response, in conversation order
+    responses = []
+    for content_index, content in enumerate(contents):
+        for part_index, part in enumerate(content.parts or []):
+            response = part.function_response
+            if not response or not response.response:
+                continue
+            size = len(_response_text(response.response))
+            if response.id in call_args:
+                key = _call_key(response.name, call_args[response.id])
+            else:
+                # Without the matching call we cannot tell what was read - never treat it as superseded
+                key = (response.name, f"#{len(responses)}")
+            responses.append((content_index, part_index, key, size))
+
+    latest = {}
+    for position, (_, _, key, _) in enumerate(responses):
+        latest[key] = position
+
+    to_compact = {}
+    for position, (content_index, part_index, key, size) in enumerate(responses):
+        if size >= LARGE_RESPONSE_CHARS and latest[key] != position:
+            to_compact[(content_index, part_index)] = True
+
+    total_tokens = _estimate_tokens(sum(_content_chars(content) for content in contents))
+    for content_index, part_index, key, size in responses[:-1]:
+        if total_tokens <= token_ceiling:
+            break
+        if size >= LARGE_RESPONSE_CHARS and (content_index, part_index) not in to_compact:
+            to_compact[(content_index, part_index)] = False
+            total_tokens -= _estimate_tokens(size)
+
+    if not to_compact:
+        return contents, 0
+
+    compacted = []
+    for content_index, content in enumerate(contents):
+        indexes = [index for index in range(len(content.parts or [])) if (content_index, index) in to_compact]
+        if not indexes:
+            compacted.append(content)
+            continue
+        parts = list(content.parts)
+        for index in indexes:
+            response = parts[index].function_response
+            parts[index] = _compact_part(
+                parts[index], call_args.get(response.id, {}), to_compact[(content_index, index)]
+            )
+        compacted.append(types.Content(role=content.role, parts=parts))
+    return compacted, len(to_compact)
+
+
+async def compact_history_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Runs BEFORE every LLM call to keep the resent tool loop history small.
+    Stale file reads and banners are replaced with summaries and the request is kept
+    under the agent's context token ceiling, so per-call latency stays flat.
+    """
+    try:
+        if not llm_request.contents:
+            return None
+
+        agent_name = callback_context.agent_name
+        ceiling = CONTEXT_TOKEN_CEILINGS.get(agent_name, CONTEXT_TOKEN_CEILING)
+        before = _estimate_tokens(sum(_content_chars(content) for content in llm_request.contents))
+
+        contents, compacted = compact_contents(llm_request.contents, ceiling)
+        if compacted:
+            llm_request.contents = contents
+            after = _estimate_tokens(sum(_content_chars(content) for content in contents))
+            print(
+                f"🗜️ [COMPACT] {agent_name}: ~{before} -> ~{after} tokens "
+                f"({compacted} tool responses compacted)"
+            )
+        return None
+
+    except Exception as e:
+        return None  # Send the full history on error
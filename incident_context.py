@@ -0,0 +1,51 @@
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+# ========================================
+# INCIDENT CONTEXT
+# ========================================
+# The incident a piece of work belongs to, carried in a context variable. asyncio
+# tasks copy the context they are created in, so every agent, tool and model call
+# of an incident run sees it without threading it through ADK.
+
+# Lower value = served first
+PRIORITIES = {"critical": 0, "high": 1, "normal": 2, "low": 3}
+DEFAULT_PRIORITY = "normal"
+
+
+@dataclass(frozen=True)
+class IncidentContext:
+    incident_id: str
+    priority: str = DEFAULT_PRIORITY
+    # Trace of this incident; None means the default codebase/trace.json
+    trace_path: Optional[str] = None
+
+    @property
+    def rank(self) -> int:
+        return PRIORITIES[self.priority]
+
+
+_current_incident: contextvars.ContextVar = contextvars.ContextVar("aiops_incident", default=None)
+
+
+def current_incident() -> Optional[IncidentContext]:
+    return _current_incident.get()
+
+
+def current_trace_path() -> Optional[str]:
+    incident = _current_incident.get()
+    return incident.trace_path if incident else None
+
+
+@contextmanager
+def incident_scope(incident_id: str, priority: str = DEFAULT_PRIORITY, trace_path: Optional[str] = None):
+    """Runs the enclosed code as part of the given incident."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}', use one of {', '.join(PRIORITIES)}")
+    token = _current_incident.set(IncidentContext(incident_id, priority, trace_path))
+    try:
+        yield _current_incident.get()
+    finally:
+        _current_incident.reset(token)
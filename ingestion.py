@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import json
+import math
+import shutil
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import (
+    INGEST_DEDUPE_SECONDS,
+    INGEST_INBOX,
+    INGEST_POLL_SECONDS,
+    INGEST_QUEUE_SIZE,
+    INGEST_SPOOL,
+    INGEST_WORKERS,
+)
+from incident_context import DEFAULT_PRIORITY, PRIORITIES
+from runtime import AgentRuntime, DEFAULT_QUERY
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 4318
+
+# ========================================
+# TRACE INGESTION
+# ========================================
+# Exception events arrive from two inputs:
+#   inbox    - trace files (the trace.json shape: a list of {"event_attributes": ...})
+#              moved into INGEST_INBOX (write elsewhere, then move), picked up by polling
+#   receiver - POST /v1/events on a local HTTP port with a batch of events in the
+#              same shape ({"events": [...]} or a bare list)
+# Each event becomes one incident in a bounded queue. Incidents with the same key
+# (fix_store.incident_key: exception fingerprint + traced code hash) are dropped
+# while one is queued or running, and for INGEST_DEDUPE_SECONDS after it was
+# dispatched. A full queue pushes back: the receiver answers 429 and the inbox
+# leaves files in place until there is room. Workers hand incidents to the agent
+# runtime with their own spooled trace file.
+
+
+@dataclass
+class IngestedIncident:
+    key: str
+    event: dict
+    source: str
+    priority: str = DEFAULT_PRIORITY
+    ingested_at: float = field(default_factory=time.monotonic)
+    trace_path: Optional[str] = None
+
+
+def incident_key_for_event(attrs: dict) -> str:
+    """Dedupe key of an exception event; events without an app frame key on type, message and stack."""
+    from fix_store import incident_key_from_attributes
+
+    found = incident_key_from_attributes(attrs)
+    if found:
+        return found[0]
+    raw = "|".join(str(attrs.get(name, "")) for name in
+                   ("exception.type", "exception.message", "exception.stacktrace"))
+    return "raw:" + hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def parse_events(payload) -> List[dict]:
+    """Exception events of a trace file or receiver batch. Raises ValueError on anything else."""
+    if isinstance(payload, dict) and "events" in payload:
+        payload = payload["events"]
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError("expected a list of events or {\"events\": [...]}")
+    events = []
+    for event in payload:
+        if not isinstance(event, dict) or not isinstance(event.get("event_attributes"), dict):
+            raise ValueError("every event needs an 'event_attributes' object")
+        events.append(event)
+    return events
+
+
+class IngestionMetrics:
+
+    def __init__(self, latency_window: int = 1000):
+        self.counts = {"received": 0, "accepted": 0, "duplicates": 0, "rejected": 0,
+                       "dispatched": 0, "failed": 0}
+        self.latencies = deque(maxlen=latency_window)
+
+    def count(self, name: str, amount: int = 1):
+        self.counts[name] += amount
+
+    def snapshot(self, queue_depth: int) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            **self.counts,
+            "queue_depth": queue_depth,
+            "ingest_to_dispatch_seconds": {
+                "avg": round(statistics.fmean(latencies), 3) if latencies else None,
+                # Nearest rank: the smallest latency at or above 95% of the samples
+                "p95": round(latencies[math.ceil(0.95 * len(latencies)) - 1], 3) if latencies else None,
+                "max": round(latencies[-1], 3) if latencies else None,
+            },
+        }
+
+
+class IngestionService:
+    """
+    Runs the inbox watcher, the receiver and the dispatch workers around one warm
+    AgentRuntime. Everything asynchronous runs on a single background event loop,
+    the receiver's HTTP threads hand batches over to it.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 inbox: str = INGEST_INBOX, spool: str = INGEST_SPOOL):
+        self.host = host
+        self.port = port
+        self.inbox = Path(inbox)
+        self.spool = Path(spool)
+        self.runtime = AgentRuntime()
+        self.loop = asyncio.new_event_loop()
+        self.queue: Optional[asyncio.Queue] = None
+        self.metrics = IngestionMetrics()
+        self._active: Dict[str, IngestedIncident] = {}  # queued or running, by key
+        self._recent: Dict[str, float] = {}  # key -> dispatch time
+
+    # ---------- intake (event loop) ----------
+    def _is_duplicate(self, key: str) -> bool:
+        now = time.monotonic()
+        for recent_key, dispatched_at in list(self._recent.items()):
+            if now - dispatched_at > INGEST_DEDUPE_SECONDS:
+                del self._recent[recent_key]
+        return key in self._active or key in self._recent
+
+    async def offer(self, events: List[dict], source: str) -> dict:
+        """
+        Queues the events as incidents. All-or-nothing on backpressure: when the new
+        incidents do not fit, none are queued and 'rejected' is set.
+        """
+        self.metrics.count("received", len(events))
+        incidents, duplicates = [], 0
+        for event in events:
+            key = incident_key_for_event(event["event_attributes"])
+            if self._is_duplicate(key) or any(incident.key == key for incident in incidents):
+                duplicates += 1
+                continue
+            priority = event.get("priority", DEFAULT_PRIORITY)
+            incidents.append(IngestedIncident(key, event, source,
+                                              priority if priority in PRIORITIES else DEFAULT_PRIORITY))
+        self.metrics.count("duplicates", duplicates)
+
+        if len(incidents) > self.queue.maxsize - self.queue.qsize():
+            self.metrics.count("rejected", len(incidents))
+            return {"accepted": 0, "duplicates": duplicates, "rejected": len(incidents)}
+        for incident in incidents:
+            self._active[incident.key] = incident
+            self.queue.put_nowait(incident)
+        self.metrics.count("accepted", len(incidents))
+        if incidents:
+            print(f"📥 [INGEST] {len(incidents)} incident(s) from {source}, {duplicates} duplicate(s), "
+                  f"queue {self.queue.qsize()}/{self.queue.maxsize}")
+        return {"accepted": len(incidents), "duplicates": duplicates, "rejected": 0}
+
+    async def watch_inbox(self):
+        """Polls the inbox; files stay in place while the queue is full."""
+        self.inbox.mkdir(parents=True, exist_ok=True)
+        while True:
+            for path in sorted(self.inbox.glob("*.json"), key=lambda path: path.stat().st_mtime):
+                if self.queue.full():
+                    break
+                try:
+                    events = parse_events(json.loads(path.read_text()))
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ [INGEST] Skipping {path.name}: {e}")
+                    self._archive(path, "failed")
+                    continue
+                result = await self.offer(events, f"inbox:{path.name}")
+                if result["rejected"]:
+                    break
+                self._archive(path, "processed")
+            await asyncio.sleep(INGEST_POLL_SECONDS)
+
+    def _archive(self, path: Path, folder: str):
+        target = self.inbox / folder
+        target.mkdir(exist_ok=True)
+        shutil.move(str(path), str(target / path.name))
+
+    # ---------- dispatch (event loop) ----------
+    def _spool_trace(self, incident: IngestedIncident) -> str:
+        directory = self.spool / incident.key.replace(":", "-")
+        directory.mkdir(parents=True, exist_ok=True)
+        trace_path = directory / "trace.json"
+        trace_path.write_text(json.dumps([incident.event], indent=4))
+        return str(trace_path)
+
+    async def dispatch_worker(self, number: int):
+        while True:
+            incident = await self.queue.get()
+            latency = time.monotonic() - incident.ingested_at
+            self.metrics.latencies.append(latency)
+            self.metrics.count("dispatched")
+            self._recent[incident.key] = time.monotonic()
+            print(f"🚚 [INGEST] Worker {number} dispatching {incident.key} ({incident.priority}) "
+                  f"{latency * 1000:.0f} ms after ingest")
+            try:
+                incident.trace_path = self._spool_trace(incident)
+                await self.runtime.run_incident(DEFAULT_QUERY, priority=incident.priority,
+                                                trace_path=incident.trace_path)
+            except Exception as e:
+                self.metrics.count("failed")
+                print(f"❌ [INGEST] Incident {incident.key} failed: {e}")
+            finally:
+                self._active.pop(incident.key, None)
+                self.queue.task_done()
+
+    async def _start(self):
+        self.queue = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+        warm_seconds = await self.runtime.warm()
+        print(f"🔥 [INGEST] Runtime warmed in {warm_seconds:.2f}s")
+        self.loop.create_task(self.watch_inbox())
+        for number in range(INGEST_WORKERS):
+            self.loop.create_task(self.dispatch_worker(number))
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # ---------- receiver (HTTP threads) ----------
+    def submit(self, events: List[dict], source: str) -> dict:
+        return asyncio.run_coroutine_threadsafe(self.offer(events, source), self.loop).result()
+
+    def snapshot(self) -> dict:
+        async def take():
+            return self.metrics.snapshot(self.queue.qsize())
+        return asyncio.run_coroutine_threadsafe(take(), self.loop).result()
+
+    def serve_forever(self):
+        threading.Thread(target=self._run_loop, name="ingest-loop", daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+
+        server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        print(f"📡 [INGEST] Watching {self.inbox}/ and receiving events on "
+              f"http://{self.host}:{self.port}/v1/events")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def _make_handler(service: IngestionService):
+    class ReceiverHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status: int, payload: dict, headers: Optional[dict] = None):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                return self._send_json(404, {"status": "error", "message": "Not found"})
+            self._send_json(200, service.snapshot())
+
+        def do_POST(self):
+            if self.path != "/v1/events":
+                return self._send_json(404, {"status": "error", "message": "Not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                events = parse_events(json.loads(self.rfile.read(length) or b"[]"))
+            except Exception as e:
+                return self._send_json(400, {"status": "error", "message": f"Invalid batch: {str(e)}"})
+
+            result = service.submit(events, f"receiver:{self.address_string()}")
+            if result["rejected"]:
+                # OTLP clients retry 429 with backoff
+                return self._send_json(429, {"status": "busy", **result},
+                                       {"Retry-After": str(max(1, int(INGEST_POLL_SECONDS)))})
+            self._send_json(200, {"status": "success", **result})
+
+        def log_message(self, format, *args):
+            print(f"🌐 [INGEST] {self.address_string()} {format % args}")
+
+    return ReceiverHandler
@@ -0,0 +1,212 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from config import LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE
+from incident_context import PRIORITIES, IncidentContext, current_incident
+
+# ========================================
+# LLM CALL SCHEDULER
+# ========================================
+# Every model call waits here for a slot in two token buckets shared by all
+# incidents of the process: requests/minute and tokens/minute. Waiting calls are
+# served by priority class first (a queued critical call always goes before a
+# queued low one) and round-robin across incidents within a class, so one busy
+# incident cannot starve the others. Calls already running are never interrupted.
+# Token use is estimated up front and settled with the real usage afterwards.
+
+UNSCOPED = IncidentContext("unscoped")
+
+
+class TokenBucket:
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60):
+        self.rate = per_minute / 60
+        self.capacity = self.rate * burst_seconds
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (requests above the capacity wait for a full bucket)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(missing / self.rate, 0.0)
+
+    def take(self, amount: float):
+        """Takes amount, going into debt when needed (negative amounts give tokens back)."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+@dataclass(eq=False)
+class _Waiter:
+    future: asyncio.Future
+    tokens: int
+    incident: IncidentContext
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class PriorityStats:
+    granted: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+
+
+class LlmScheduler:
+    """
+    Paces model calls of one event loop against the shared request and token budget.
+    acquire() before a call, settle() with the real token use after it and
+    rate_limited() when the provider still answered 429.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, burst_seconds: float = 60):
+        # burst_seconds: how much unused budget may pile up; the provider quota is per minute
+        self.requests = TokenBucket(requests_per_minute, burst_seconds)
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds)
+        # priority rank -> incident id -> waiting calls, in round-robin order
+        self._queues: Dict[int, OrderedDict] = {rank: OrderedDict() for rank in sorted(PRIORITIES.values())}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.stats: Dict[str, PriorityStats] = {priority: PriorityStats() for priority in PRIORITIES}
+        self.max_queue_depth = 0
+        self.rate_limit_hits = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(waiters) for incidents in self._queues.values() for waiters in incidents.values())
+
+    async def acquire(self, tokens: int, incident: Optional[IncidentContext] = None) -> float:
+        """Waits for the call's turn and budget. Returns the seconds waited."""
+        incident = incident or current_incident() or UNSCOPED
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens, incident)
+        self._queues[incident.rank].setdefault(incident.incident_id, deque()).append(waiter)
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._remove(waiter)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        stats = self.stats[incident.priority]
+        stats.granted += 1
+        stats.total_wait_seconds += waited
+        stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+        return waited
+
+    def settle(self, estimated_tokens: int, used_tokens: int):
+        self.tokens.take(used_tokens - estimated_tokens)
+
+    def rate_limited(self):
+        """The provider rejected a call anyway: stop granting until the buckets refill."""
+        self.rate_limit_hits += 1
+        self.requests.drain()
+        self.tokens.drain()
+        print("🚦 [SCHEDULER] Provider rate limit hit - pausing model calls")
+
+    def _remove(self, waiter: _Waiter):
+        incidents = self._queues[waiter.incident.rank]
+        waiters = incidents.get(waiter.incident.incident_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del incidents[waiter.incident.incident_id]
+        self._dispatch()
+
+    def _head(self) -> Optional[tuple]:
+        for incidents in self._queues.values():
+            if incidents:
+                incident_id, waiters = next(iter(incidents.items()))
+                return incidents, incident_id, waiters
+        return None
+
+    def _dispatch(self):
+        while True:
+            head = self._head()
+            if head is None:
+                return
+            incidents, incident_id, waiters = head
+            waiter = waiters[0]
+            if waiter.future.done():
+                waiters.popleft()
+            else:
+                delay = max(self.requests.wait_time(1), self.tokens.wait_time(waiter.tokens))
+                if delay > 0:
+                    if self._timer is None:
+                        self._timer = waiter.future.get_loop().call_later(delay, self._wake)
+                    return
+                self.requests.take(1)
+                self.tokens.take(waiter.tokens)
+                waiters.popleft()
+                waiter.future.set_result(None)
+
+            # Round-robin: the incident just served goes to the back of its class
+            del incidents[incident_id]
+            if waiters:
+                incidents[incident_id] = waiters
+
+    def _wake(self):
+        self._timer = None
+        self._dispatch()
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "queue_depth_by_priority": {
+                priority: sum(len(waiters) for waiters in self._queues[rank].values())
+                for priority, rank in PRIORITIES.items()
+            },
+            "max_queue_depth": self.max_queue_depth,
+            "rate_limit_hits": self.rate_limit_hits,
+            "waits": {
+                priority: {
+                    "granted": stats.granted,
+                    "avg_wait_seconds": round(stats.total_wait_seconds / max(stats.granted, 1), 3),
+                    "max_wait_seconds": round(stats.max_wait_seconds, 3),
+                }
+                for priority, stats in self.stats.items()
+            },
+        }
+
+
+_scheduler: Optional[LlmScheduler] = None
+
+
+def get_scheduler() -> LlmScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LlmScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+    return _scheduler
+
+
+def configure_scheduler(requests_per_minute: float, tokens_per_minute: float, burst_seconds: float = 60) -> LlmScheduler:
+    """Replaces the process-wide scheduler, e.g. for a smaller budget in benchmarks."""
+    global _scheduler
+    _scheduler = LlmScheduler(requests_per_minute, tokens_per_minute, burst_seconds)
+    return _scheduler
+
+
+def scheduler_report() -> str:
+    metrics = get_scheduler().metrics()
+    granted = sum(waits["granted"] for waits in metrics["waits"].values())
+    if not granted:
+        return "🚦 [SCHEDULER] No model calls scheduled yet"
+    lines = [f"🚦 [SCHEDULER] {granted} model calls, max queue depth {metrics['max_queue_depth']}, "
+             f"rate limit hits {metrics['rate_limit_hits']}"]
+    for priority, waits in metrics["waits"].items():
+        if waits["granted"]:
+            lines.append(f"- {priority}: {waits['granted']} calls, wait avg {waits['avg_wait_seconds']:.2f}s "
+                         f"/ max {waits['max_wait_seconds']:.2f}s")
+    return "\n".join(lines)
@@ -1,52 +1,140 @@
-from agent import root_agent
-from google.adk.runners import InMemoryRunner
-from google.genai import types
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+
+# Only the standard library is imported here. The ADK, the agents and the memory
+# store are imported when an incident actually runs, so --help, --submit and the
+# startup benchmark do not pay for them.
+from runtime import AgentRuntime, DEFAULT_QUERY
+
+
+def run_once(priority: str):
+    from fix_store import fix_store_report
+    from llm_scheduler import scheduler_report
+    from prompt_cache import prefix_reuse_report
+    from single_flight import single_flight_report
 
-def main():
     print("Starting AIOps Agent...")
-    query = "There is a bug in the codebase folder. Please find the trace.json file, identify the error source file, analyze the issue, fix the code, and validate the fix."
-    
-    print(f"Query: {query}")
-    
-    # Initialize the runner with the root agent
-    runner = InMemoryRunner(agent=root_agent)
-    
-    user_id = "aio_ops_user"
-    session_id = "aio_ops_session"
-    
-    # Create the session
-    runner.session_service._create_session_impl(
-        app_name=runner.app_name,
-        user_id=user_id,
-        session_id=session_id
-    )
-    
+    print(f"Query: {DEFAULT_QUERY}")
     print("\n--- Agent Workflow Started ---\n")
-    
-    # runner.run is a synchronous generator that yields events
+
     try:
-        events = runner.run(
-            user_id=user_id,
-            session_id=session_id,
-            new_message=types.Content(role="user", parts=[types.Part(text=query)])
-        )
-        
-        for event in events:
-            # Check if the event has content and parts
-            if event.content and event.content.parts:
-                for part in event.content.parts:
-                    if part.text:
-                        print(part.text, end="", flush=True)
-            
-            # Monitor for errors
-            if hasattr(event, 'error_message') and event.error_message:
-                print(f"\n[Error]: {event.error_message}")
+        asyncio.run(AgentRuntime().run_incident(DEFAULT_QUERY, stream=True, priority=priority))
     except Exception as e:
         print(f"\n[Error]: {e}")
         import traceback
         traceback.print_exc()
 
     print("\n\n--- Process Completed ---")
+    print(prefix_reuse_report())
+    print(fix_store_report())
+    print(single_flight_report())
+    print(scheduler_report())
+
+
+def benchmark_startup(runs: int):
+    """
+    Measures cold start in fresh interpreters:
+    - cli:    importing main (what every invocation pays)
+    - agents: importing main and building the agent graph (what a one-shot run pays before its first model call)
+    """
+    scenarios = {
+        "cli": "import main",
+        "agents": "import main; main.AgentRuntime().runner",
+    }
+    print(f"⏱️ [BENCH] Startup time over {runs} runs (median / min)")
+    for name, code in scenarios.items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+            timings.append(time.perf_counter() - started)
+            if completed.returncode != 0:
+                print(f"❌ [BENCH] {name} failed:\n{completed.stderr.strip()}")
+                break
+        else:
+            print(f"- {name}: {statistics.median(timings):.3f}s / {min(timings):.3f}s")
+
+
+def benchmark_scheduler(incidents: int, calls: int):
+    """
+    Exercises the model call scheduler offline: incidents of every priority fire their
+    model calls at FakeLlm at the same time against a small budget (4 requests/s),
+    then the wait times per priority are reported.
+    """
+    from google.adk.models import LlmRequest
+    from google.genai import types
+
+    from fake_llm import FakeLlm
+    from governed_llm import GovernedLlm
+    from incident_context import PRIORITIES, incident_scope
+    from llm_scheduler import configure_scheduler, scheduler_report
+
+    configure_scheduler(requests_per_minute=240, tokens_per_minute=10_000_000, burst_seconds=1)
+    llm = GovernedLlm(model="fake-gemini-2.5-flash", inner=FakeLlm(model="fake-gemini-2.5-flash"))
+    priorities = list(PRIORITIES)
+
+    async def call(index: int):
+        request = LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=f"call {index}")])])
+        async for _ in llm.generate_content_async(request):
+            pass
+
+    async def incident(number: int):
+        with incident_scope(f"bench-{number}", priorities[number % len(priorities)]):
+            await asyncio.gather(*(call(index) for index in range(calls)))
+
+    async def run_all():
+        await asyncio.gather(*(incident(number) for number in range(incidents)))
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    print(f"⏱️ [BENCH] {incidents * calls} model calls from {incidents} incidents in "
+          f"{time.perf_counter() - started:.2f}s")
+    print(scheduler_report())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AIOps Agent - autonomous bug fixing")
+    parser.add_argument("--serve", action="store_true", help="run the warm agent server")
+    parser.add_argument("--submit", action="store_true", help="send the incident to a running server")
+    parser.add_argument("--ingest", action="store_true",
+                        help="run the ingestion service (inbox directory + event receiver)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="server port (default 8765, 4318 for --ingest)")
+    parser.add_argument("--bench-startup", action="store_true", help="measure CLI and agent cold start")
+    parser.add_argument("--runs", type=int, default=5, help="runs per startup benchmark scenario")
+    parser.add_argument("--priority", default="normal", choices=["critical", "high", "normal", "low"],
+                        help="priority of the incident's model calls against other incidents")
+    parser.add_argument("--bench-scheduler", action="store_true",
+                        help="run concurrent fake model calls through the scheduler")
+    parser.add_argument("--incidents", type=int, default=8, help="incidents in the scheduler benchmark")
+    parser.add_argument("--calls", type=int, default=3, help="model calls per incident in the scheduler benchmark")
+    args = parser.parse_args()
+
+    if args.serve:
+        from agent_server import AgentServer
+
+        AgentServer(args.host, args.port or 8765).serve_forever()
+    elif args.ingest:
+        from ingestion import IngestionService
+
+        IngestionService(args.host, args.port or 4318).serve_forever()
+    elif args.submit:
+        from agent_server import submit_incident
+
+        result = submit_incident(DEFAULT_QUERY, args.host, args.port or 8765, args.priority)
+        print(result.get("output") or result.get("message", ""))
+        print(f"\n--- Process Completed in {result.get('seconds', '?')}s ---")
+    elif args.bench_startup:
+        benchmark_startup(args.runs)
+    elif args.bench_scheduler:
+        benchmark_scheduler(args.incidents, args.calls)
+    else:
+        run_once(args.priority)
+
 
 if __name__ == "__main__":
     main()
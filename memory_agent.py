@@ -8,6 +8,7 @@ from google.adk.sessions.session import Session
 from google.adk.events.event import Event
 from google.genai import types
 from config import MEMORY_USER_ID
+from single_flight import single_flight
 
 MEMORY_FILE = "memory.json"
 
@@ -36,8 +37,16 @@ def _save_memory_to_file():
     except Exception as e:
         print(f"⚠️ [MEMORY] Failed to save to {MEMORY_FILE}: {e}")
 
-# load memories on startup
-_load_memory_from_file()
+# memories are loaded on first use instead of at import time, so importing
+# this module (and everything that imports it) stays cheap
+_memories_loaded = False
+
+def _ensure_memories_loaded():
+    """Loads memory.json into the local cache the first time it is needed."""
+    global _memories_loaded
+    if not _memories_loaded:
+        _load_memory_from_file()
+        _memories_loaded = True
 
 # flag to track if service has been initialized
 _service_initialized = False
@@ -48,6 +57,7 @@ async def _initialize_service():
     if _service_initialized:
         return
     
+    _ensure_memories_loaded()
     for mem in _all_memories_cache:
         text = mem.get("text", "")
         if text:
@@ -103,6 +113,7 @@ async def save_memory(text: str, metadata: Optional[dict] = None):
     except Exception as e:
         return f"Error saving memory: {str(e)}"
 
+@single_flight()
 async def search_memory(query: str, limit: int = 5):
     """
     Searches for relevant memories using ADK's InMemoryMemoryService.
@@ -140,10 +151,12 @@ async def search_memory(query: str, limit: int = 5):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@single_flight()
 def get_all_memories():
     """
     Retrieves all memories from the local cache.
     """
+    _ensure_memories_loaded()
     if not _all_memories_cache:
         return "No memories found."
     
@@ -0,0 +1,211 @@
+import os
+from dataclasses import dataclass
+from typing import Optional, Union
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import BaseLlm, LlmResponse, LlmRequest
+from google.genai import types
+
+from config import LLM_SCHEDULER, MODEL_BACKEND, SINGLE_FLIGHT
+from file_tools import find_trace_file
+from trace_parser import load_trace_attributes, parse_stack_frames, app_frames, resolve_codebase_file
+from validation import validation_failed
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# Session state key holding how many times the incident has been escalated
+ESCALATION_STATE_KEY = "model_escalation"
+
+# ========================================
+# MODEL TIERS
+# ========================================
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    thinking_budget: int
+
+
+MODEL_TIERS = [
+    ModelRoute("gemini-2.5-flash-lite", 0),
+    ModelRoute("gemini-2.5-flash", 512),
+    ModelRoute("gemini-2.5-pro", 2048),
+]
+
+# Starting tier per agent for each incident complexity.
+# Escalation moves every agent up one tier per failed validation.
+BASE_TIERS = {
+    "trivial": {"root_agent": 0, "analyzer_agent": 0, "fixer_agent": 0, "validator_agent": 0},
+    "standard": {"root_agent": 1, "analyzer_agent": 1, "fixer_agent": 1, "validator_agent": 0},
+    "complex": {"root_agent": 1, "analyzer_agent": 2, "fixer_agent": 2, "validator_agent": 1},
+}
+
+# Exceptions that are usually a one-token typo (wrong attribute, undefined name, bad import)
+TRIVIAL_EXCEPTIONS = {"AttributeError", "NameError", "ImportError", "ModuleNotFoundError"}
+
+
+# ========================================
+# INCIDENT PROFILE
+# ========================================
+@dataclass
+class IncidentProfile:
+    exception_type: str = ""
+    frame_count: int = 0
+    app_frame_count: int = 0
+    source_lines: int = 0
+
+    @property
+    def complexity(self) -> str:
+        if not self.exception_type or self.app_frame_count > 5 or self.source_lines > 1000:
+            return "complex"
+        if (
+            self.exception_type in TRIVIAL_EXCEPTIONS
+            and self.app_frame_count <= 2
+            and self.source_lines <= 300
+        ):
+            return "trivial"
+        return "standard"
+
+
+def profile_incident(trace_path: str) -> IncidentProfile:
+    """Extracts complexity signals (exception class, frame counts, source size) from a trace."""
+    attrs = load_trace_attributes(trace_path)
+    frames = parse_stack_frames(attrs)
+    own_frames = app_frames(frames)
+
+    source_lines = 0
+    if own_frames:
+        source_path = resolve_codebase_file(own_frames[0].get("exception.file", ""))
+        if source_path:
+            try:
+                with open(source_path, "r") as f:
+                    source_lines = sum(1 for _ in f)
+            except Exception:
+                pass
+
+    return IncidentProfile(
+        exception_type=attrs.get("exception.type", ""),
+        frame_count=len(frames),
+        app_frame_count=len(own_frames),
+        source_lines=source_lines,
+    )
+
+
+# profiles are cached per trace file and invalidated when the trace changes
+_profile_cache = {}
+
+
+def get_incident_profile() -> IncidentProfile:
+    trace_path = find_trace_file()
+    if trace_path.startswith("Error") or not os.path.exists(trace_path):
+        return IncidentProfile()
+
+    mtime = os.path.getmtime(trace_path)
+    cached = _profile_cache.get(trace_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    profile = profile_incident(trace_path)
+    _profile_cache[trace_path] = (mtime, profile)
+    return profile
+
+
+def choose_route(agent_name: str, profile: IncidentProfile, escalation: int = 0) -> ModelRoute:
+    """Chooses the model and thinking budget for an agent on a given incident."""
+    # Speculative candidates ('fixer_agent_candidate_2') route like the agent they stand in for
+    role = agent_name.split("_candidate_")[0]
+    base_tier = BASE_TIERS[profile.complexity].get(role, 1)
+    tier = min(base_tier + escalation, len(MODEL_TIERS) - 1)
+    route = MODEL_TIERS[tier]
+    if MODEL_BACKEND == "fake":
+        return ModelRoute(f"fake-{route.model}", route.thinking_budget)
+    return route
+
+
+def agent_model(model: str = DEFAULT_MODEL) -> Union[str, BaseLlm]:
+    """Returns the model an LlmAgent is built with for the configured backend."""
+    if MODEL_BACKEND == "fake":
+        from fake_llm import FakeLlm
+
+        llm = FakeLlm(model=f"fake-{model}")
+    elif SINGLE_FLIGHT or LLM_SCHEDULER:
+        from google.adk.models import LLMRegistry
+
+        llm = LLMRegistry.new_llm(model)
+    else:
+        return model
+
+    if LLM_SCHEDULER:
+        from governed_llm import GovernedLlm
+
+        llm = GovernedLlm(model=llm.model, inner=llm)
+    # Outermost, so coalesced requests take their scheduler slot only once
+    if SINGLE_FLIGHT:
+        from single_flight_llm import SingleFlightLlm
+
+        return SingleFlightLlm(model=llm.model, inner=llm)
+    return llm
+
+
+# ========================================
+# CALLBACKS
+# ========================================
+# last route printed per agent, so the log only shows routing changes
+_last_routes = {}
+
+
+async def model_routing_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Runs BEFORE every LLM call to pick the model and thinking budget for the agent,
+    based on the incident's complexity and how often validation has failed so far.
+    """
+    try:
+        agent_name = callback_context.agent_name
+        escalation = callback_context.state.get(ESCALATION_STATE_KEY, 0)
+        profile = get_incident_profile()
+        route = choose_route(agent_name, profile, escalation)
+
+        llm_request.model = route.model
+        if llm_request.config is None:
+            llm_request.config = types.GenerateContentConfig()
+        include_thoughts = bool(
+            llm_request.config.thinking_config and llm_request.config.thinking_config.include_thoughts
+        )
+        llm_request.config.thinking_config = types.ThinkingConfig(
+            include_thoughts=include_thoughts and route.thinking_budget > 0,
+            thinking_budget=route.thinking_budget,
+        )
+
+        if _last_routes.get(agent_name) != route:
+            _last_routes[agent_name] = route
+            print(
+                f"🧭 [ROUTER] {agent_name} -> {route.model} "
+                f"(thinking {route.thinking_budget}, {profile.complexity}, escalation {escalation})"
+            )
+        return None
+
+    except Exception as e:
+        return None  # Keep the agent's own model on error
+
+
+async def escalate_on_validation_failure(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """
+    Runs AFTER every validator LLM call. A failed validation escalates the incident,
+    so the next analyze -> fix -> validate cycle runs on a larger model.
+    """
+    try:
+        if not llm_response.content or not llm_response.content.parts:
+            return None
+
+        text = "".join(part.text or "" for part in llm_response.content.parts)
+        if validation_failed(text):
+            escalation = callback_context.state.get(ESCALATION_STATE_KEY, 0) + 1
+            callback_context.state[ESCALATION_STATE_KEY] = escalation
+            print(f"⬆️ [ROUTER] Validation failed - escalating to level {escalation}")
+        return None
+
+    except Exception as e:
+        return None
@@ -0,0 +1,225 @@
+import contextvars
+import os
+import stat
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# ========================================
+# OVERLAY WORKSPACE
+# ========================================
+# Per-incident, in-memory copy-on-write layer over the real tree: path -> content.
+# While an incident runs, write_file and the speculative candidates write into its
+# workspace instead of the codebase, and read_file, the syntax check, the fix store
+# and the checkpoints read through it. Parallel incidents each have their own
+# workspace (a context variable, copied into every task of the run), so they never
+# see or overwrite each other's fixed_ files. Nothing reaches the disk until the
+# workspace is materialized into a separate directory or committed.
+
+
+def _stage_file(path: str, content: str) -> str:
+    """
+    Writes content to a new temporary file next to path and returns its name. It gets
+    the permissions of the existing path, or those open() gives a new file under the
+    umask (applied by os.open itself, so the process-wide umask is never touched).
+    """
+    temporary = os.path.join(os.path.dirname(path) or ".", f".overlay-{uuid.uuid4().hex}.tmp")
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            f.write(content)
+        try:
+            # os.replace keeps the staged file's mode
+            os.chmod(temporary, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+    except Exception:
+        _remove_files([temporary])
+        raise
+    return temporary
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class OverlayWorkspace:
+
+    def __init__(self, incident_id: str):
+        self.incident_id = incident_id
+        self.validation_passed = False
+        self._files: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.normpath(str(path))
+
+    def write(self, path, content: str):
+        with self._lock:
+            self._files[self._key(path)] = content
+
+    def read(self, path) -> Optional[str]:
+        with self._lock:
+            return self._files.get(self._key(path))
+
+    def exists(self, path) -> bool:
+        with self._lock:
+            return self._key(path) in self._files
+
+    def remove(self, path):
+        with self._lock:
+            self._files.pop(self._key(path), None)
+
+    def rename(self, source, target):
+        with self._lock:
+            self._files[self._key(target)] = self._files.pop(self._key(source))
+
+    def paths(self) -> List[str]:
+        with self._lock:
+            return sorted(self._files)
+
+    def discard(self) -> List[str]:
+        """Drops every pending file. Returns the discarded paths."""
+        with self._lock:
+            paths = sorted(self._files)
+            self._files.clear()
+        return paths
+
+    def materialize(self, root: str) -> List[str]:
+        """
+        Writes the workspace into a separate directory (relative paths kept), e.g. to
+        run the fixed code, without touching the real tree. The workspace stays pending.
+        Raises ValueError, before writing anything, when a path would land outside root.
+        """
+        written = []
+        with self._lock:
+            files = dict(self._files)
+        # Paths come from the agents' write_file calls and may contain '..'
+        root_path = Path(root).resolve()
+        targets = {}
+        for path in files:
+            target = (root_path / path.lstrip(os.sep)).resolve()
+            if not target.is_relative_to(root_path):
+                raise ValueError(f"Refusing to materialize '{path}' outside {root}")
+            targets[path] = target
+        for path, content in files.items():
+            target = targets[path]
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text(content)
+            written.append(str(target))
+        return written
+
+    def commit(self) -> List[str]:
+        """
+        Writes every pending file to its real path. All files are first staged as
+        temporary files next to their targets, with the target's permissions (the
+        umask default for new files), and only moved into place with os.replace once
+        every one was written; a failure while staging leaves the tree untouched.
+        os.replace is atomic per file only: if a move fails, the files moved before it
+        stay committed, the remaining temporary files are removed and the files not
+        moved stay pending in the workspace.
+        """
+        with self._lock:
+            files = dict(self._files)
+
+        staged = []
+        try:
+            for path, content in files.items():
+                staged.append((_stage_file(path, content), path))
+        except Exception:
+            _remove_files(temporary for temporary, _ in staged)
+            raise
+
+        moved = []
+        try:
+            for temporary, path in staged:
+                os.replace(temporary, path)
+                moved.append(path)
+        finally:
+            _remove_files(temporary for temporary, _ in staged[len(moved):])
+            with self._lock:
+                for path in moved:
+                    self._files.pop(path, None)
+            if moved:
+                from file_tools import invalidate_codebase_index
+                invalidate_codebase_index()
+        return sorted(moved)
+
+
+_current_overlay: contextvars.ContextVar = contextvars.ContextVar("aiops_overlay", default=None)
+
+
+def current_overlay() -> Optional[OverlayWorkspace]:
+    return _current_overlay.get()
+
+
+def current_overlay_id(*args, **kwargs) -> Optional[str]:
+    """Single-flight key part: reads inside different workspaces must not be coalesced."""
+    overlay = _current_overlay.get()
+    return overlay.incident_id if overlay else None
+
+
+@contextmanager
+def overlay_scope(incident_id: str):
+    """Runs the enclosed code with its own overlay workspace."""
+    workspace = OverlayWorkspace(incident_id)
+    token = _current_overlay.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current_overlay.reset(token)
+
+
+# ========================================
+# OVERLAY-AWARE FILE ACCESS
+# ========================================
+def read_text(path) -> str:
+    """Content of path as the current incident sees it: its workspace first, then the disk."""
+    overlay = _current_overlay.get()
+    content = overlay.read(path) if overlay else None
+    return content if content is not None else Path(path).read_text()
+
+
+def write_text(path, content: str) -> bool:
+    """Writes into the current workspace, or to disk without one. Returns True when it stayed in memory."""
+    overlay = _current_overlay.get()
+    if overlay is not None:
+        overlay.write(path, content)
+        return True
+    with open(path, "w") as f:
+        f.write(content)
+    return False
+
+
+def path_exists(path) -> bool:
+    overlay = _current_overlay.get()
+    return (overlay is not None and overlay.exists(path)) or os.path.isfile(path)
+
+
+# ========================================
+# CALLBACK
+# ========================================
+async def record_overlay_validation(callback_context, llm_response):
+    """Runs AFTER every validator LLM call and remembers the verdict for the commit decision."""
+    try:
+        from validation import validation_failed, validation_passed
+
+        overlay = _current_overlay.get()
+        if overlay is None or not llm_response.content or not llm_response.content.parts:
+            return None
+        text = "".join(part.text or "" for part in llm_response.content.parts)
+        if validation_passed(text):
+            overlay.validation_passed = True
+        elif validation_failed(text):
+            overlay.validation_passed = False
+        return None
+
+    except Exception as e:
+        return None
@@ -0,0 +1,212 @@
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmResponse, LlmRequest
+from google.genai import types
+
+from config import CODEBASE_LISTING_MAX_FILES, CONTEXT_CACHE, CONTEXT_CACHE_TTL_SECONDS
+from file_tools import get_codebase_index
+
+# ========================================
+# STATIC PROMPT PREFIX
+# ========================================
+# The prompt is assembled so that everything that does not change between calls
+# comes first: agent instruction, tool schemas, then the codebase file listing.
+# Dynamic memory context is appended after the conversation (see callback_tool.py),
+# which keeps the prefix byte-identical and lets the provider reuse its cache.
+
+# base directory -> (index list the listing was built from, listing)
+_codebase_listings: Dict[str, Tuple[list, str]] = {}
+
+
+def _get_codebase_listing(base_directory: str = "codebase") -> str:
+    """
+    The codebase file listing, rebuilt only when the cached file index is, so it stays
+    identical across calls while the tree is unchanged and follows it in long-running
+    modes. 'fixed_' files written during the run are left out.
+    """
+    index = get_codebase_index(base_directory)
+    cached = _codebase_listings.get(base_directory)
+    if cached and cached[0] is index:
+        return cached[1]
+
+    files = [path for path in index if not os.path.basename(path).startswith("fixed_")]
+    if len(files) > CODEBASE_LISTING_MAX_FILES:
+        # Top-level rollup only; the agents drill down with browse_codebase()
+        top_level = sorted({path.split("/")[0] + ("/" if "/" in path else "") for path in files})
+        listing = (f"{base_directory} has {len(files)} files; top-level entries:\n"
+                   + "\n".join(top_level)
+                   + "\nUse browse_codebase() to list directories with file counts and sizes.")
+    else:
+        listing = f"Files in {base_directory}:\n" + "\n".join(files)
+    _codebase_listings[base_directory] = (index, listing)
+    return listing
+
+
+def _instruction_parts(llm_request: LlmRequest) -> List[types.Part]:
+    instruction = llm_request.config.system_instruction
+    if instruction is None:
+        return []
+    if isinstance(instruction, str):
+        return [types.Part(text=instruction)]
+    if isinstance(instruction, types.Content):
+        return list(instruction.parts or [])
+    return [types.Part(text=str(instruction))]
+
+
+# ========================================
+# EXPLICIT CONTEXT CACHE
+# ========================================
+_genai_client = None
+
+# static prefix hash -> cached content name ("" when the prefix cannot be cached)
+_cached_contents = {}
+
+
+def _static_prefix_key(model: str, system_instruction: types.Content, tools) -> str:
+    digest = hashlib.sha256(model.encode())
+    digest.update(system_instruction.model_dump_json(exclude_none=True).encode())
+    for tool in tools or []:
+        digest.update(tool.model_dump_json(exclude_none=True).encode())
+    return digest.hexdigest()
+
+
+async def _get_cached_content(agent_name: str, llm_request: LlmRequest) -> str:
+    """Returns the name of an explicit cache holding the static prefix, creating it once."""
+    global _genai_client
+    key = _static_prefix_key(llm_request.model, llm_request.config.system_instruction, llm_request.config.tools)
+    if key in _cached_contents:
+        return _cached_contents[key]
+
+    try:
+        if _genai_client is None:
+            from google import genai
+
+            _genai_client = genai.Client()
+
+        cache = await _genai_client.aio.caches.create(
+            model=llm_request.model,
+            config=types.CreateCachedContentConfig(
+                display_name=f"aiops-{agent_name}",
+                system_instruction=llm_request.config.system_instruction,
+                tools=llm_request.config.tools,
+                ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s",
+            ),
+        )
+        _cached_contents[key] = cache.name
+        print(f"🗄️ [CACHE] Created context cache for {agent_name}: {cache.name}")
+    except Exception as e:
+        # e.g. prefix below the provider's minimum cacheable size - rely on implicit caching
+        _cached_contents[key] = ""
+        print(f"⚠️ [CACHE] Explicit cache unavailable for {agent_name}: {str(e)}")
+    return _cached_contents[key]
+
+
+# ========================================
+# PREFIX REUSE INSTRUMENTATION
+# ========================================
+# agent name -> serialized segments of the previous request
+_previous_segments = {}
+
+# agent name -> {"calls", "reused_chars", "total_chars", "prompt_tokens", "cached_tokens"}
+_prefix_stats = {}
+
+
+def _request_segments(llm_request: LlmRequest) -> List[str]:
+    segments = [part.model_dump_json(exclude_none=True) for part in _instruction_parts(llm_request)]
+    segments += [tool.model_dump_json(exclude_none=True) for tool in llm_request.config.tools or []]
+    if llm_request.config.cached_content:
+        segments.insert(0, llm_request.config.cached_content)
+    segments += [content.model_dump_json(exclude_none=True) for content in llm_request.contents or []]
+    return segments
+
+
+def _record_prefix_reuse(agent_name: str, llm_request: LlmRequest):
+    segments = _request_segments(llm_request)
+    previous = _previous_segments.get(agent_name, [])
+
+    reused_chars = 0
+    for current, before in zip(segments, previous):
+        if current != before:
+            break
+        reused_chars += len(current)
+
+    stats = _prefix_stats.setdefault(
+        agent_name,
+        {"calls": 0, "reused_chars": 0, "total_chars": 0, "prompt_tokens": 0, "cached_tokens": 0},
+    )
+    stats["calls"] += 1
+    stats["reused_chars"] += reused_chars
+    stats["total_chars"] += sum(len(segment) for segment in segments)
+    _previous_segments[agent_name] = segments
+
+
+def prefix_reuse_report() -> str:
+    """Summarizes, per agent, how much of each prompt repeated the previous prompt's prefix."""
+    if not _prefix_stats:
+        return "No model calls recorded."
+
+    lines = ["Prompt prefix reuse per agent:"]
+    for agent_name, stats in sorted(_prefix_stats.items()):
+        ratio = stats["reused_chars"] / stats["total_chars"] if stats["total_chars"] else 0.0
+        line = f"- {agent_name}: {stats['calls']} calls, prefix reuse {ratio:.0%}"
+        if stats["prompt_tokens"]:
+            cached_ratio = stats["cached_tokens"] / stats["prompt_tokens"]
+            line += f", provider cache hits {cached_ratio:.0%} of {stats['prompt_tokens']} prompt tokens"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# ========================================
+# CALLBACKS
+# ========================================
+async def stable_prefix_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    Runs BEFORE every LLM call, after the other callbacks have modified the request.
+    Appends the codebase file listing to the static instruction, optionally moves the
+    static prefix into an explicit context cache, and records prefix reuse.
+    """
+    try:
+        agent_name = callback_context.agent_name
+        if llm_request.config is None:
+            llm_request.config = types.GenerateContentConfig()
+
+        parts = _instruction_parts(llm_request)
+        # Only agents that can read files get the listing
+        if "read_file" in (llm_request.tools_dict or {}):
+            parts.append(types.Part(text="\n" + _get_codebase_listing()))
+        if parts:
+            llm_request.config.system_instruction = types.Content(role="system", parts=parts)
+
+        model = llm_request.model or ""
+        if CONTEXT_CACHE and parts and not model.startswith("fake-"):
+            cached_content = await _get_cached_content(agent_name, llm_request)
+            if cached_content:
+                # The provider rejects requests that repeat what the cache already holds
+                llm_request.config.cached_content = cached_content
+                llm_request.config.system_instruction = None
+                llm_request.config.tools = None
+                llm_request.config.tool_config = None
+
+        _record_prefix_reuse(agent_name, llm_request)
+        return None
+
+    except Exception as e:
+        return None  # Send the request unchanged on error
+
+
+async def record_cache_usage(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Runs AFTER every LLM call to record how many prompt tokens the provider served from cache."""
+    usage = llm_response.usage_metadata
+    if usage and usage.prompt_token_count:
+        stats = _prefix_stats.get(callback_context.agent_name)
+        if stats is not None:
+            stats["prompt_tokens"] += usage.prompt_token_count
+            stats["cached_tokens"] += usage.cached_content_token_count or 0
+    return None
@@ -0,0 +1,271 @@
+import os
+import time
+import uuid
+from typing import List, Optional
+
+from config import OVERLAY_COMMIT, OVERLAY_FS
+from incident_context import DEFAULT_PRIORITY, incident_scope
+from overlay_fs import overlay_scope
+
+DEFAULT_QUERY = (
+    "There is a bug in the codebase folder. Please find the trace.json file, identify the error "
+    "source file, analyze the issue, fix the code, and validate the fix."
+)
+
+USER_ID = "aio_ops_user"
+APP_NAME = "aiops"
+
+
+class AgentRuntime:
+    """
+    Owns the agent graph and the runner.
+    The ADK modules and the agents are imported lazily on first use, so commands that
+    never run an incident stay fast. warm() builds everything up front for the
+    long-running server mode: agents, memory index, codebase file index and symbol index.
+    """
+
+    def __init__(self):
+        self._runner = None
+
+    @property
+    def runner(self):
+        if self._runner is None:
+            from agent import root_agent
+            from config import CHECKPOINTS, SESSION_DB
+
+            if CHECKPOINTS:
+                from google.adk.runners import Runner
+                from google.adk.sessions import DatabaseSessionService
+
+                self._runner = Runner(
+                    app_name=APP_NAME,
+                    agent=root_agent,
+                    session_service=DatabaseSessionService(db_url=f"sqlite:///{SESSION_DB}"),
+                )
+            else:
+                from google.adk.runners import InMemoryRunner
+
+                self._runner = InMemoryRunner(agent=root_agent)
+        return self._runner
+
+    async def warm(self) -> float:
+        """Builds the agents and loads the memory and file indexes. Returns seconds taken."""
+        started = time.perf_counter()
+        from memory_agent import _initialize_service
+        from file_tools import get_codebase_index
+        from symbol_index import get_symbol_index
+
+        self.runner
+        await _initialize_service()
+        get_codebase_index()
+        get_symbol_index()
+        return time.perf_counter() - started
+
+    def precheck(self) -> Optional[str]:
+        """
+        Compares the trace with the current code. Returns a closing report when the
+        failing code is already gone, None when the incident needs the agents.
+        """
+        from config import TRACE_PRECHECK
+        if not TRACE_PRECHECK:
+            return None
+
+        from code_compare import check_incident, format_verdict
+        from file_tools import find_trace_file
+
+        started = time.perf_counter()
+        trace_path = find_trace_file()
+        if not os.path.isfile(trace_path):
+            return None
+        verdict = check_incident(trace_path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"⚡ [PRECHECK] {verdict.reason} ({elapsed_ms:.1f} ms)")
+        if not verdict.resolved:
+            return None
+        return (f"Incident closed without an agent run: the error '{verdict.error_message}' "
+                f"can no longer occur in the current code.\n{format_verdict(verdict)}")
+
+    async def run_incident(
+        self,
+        query: str = DEFAULT_QUERY,
+        session_id: Optional[str] = None,
+        stream: bool = False,
+        priority: str = DEFAULT_PRIORITY,
+        trace_path: Optional[str] = None,
+    ) -> str:
+        """
+        Runs one incident through the root agent and returns the collected text output.
+        priority orders its model calls against other incidents competing for the quota.
+        trace_path points every tool at the incident's own trace instead of codebase/trace.json.
+        """
+        run_id = f"run-{uuid.uuid4().hex[:12]}"
+        with incident_scope(run_id, priority, trace_path):
+            if not OVERLAY_FS:
+                return await self._run_incident(query, session_id, stream)
+            with overlay_scope(run_id) as workspace:
+                try:
+                    return await self._run_incident(query, session_id, stream)
+                finally:
+                    self.finish_workspace(workspace)
+
+    def finish_workspace(self, workspace) -> Optional[List[str]]:
+        """
+        Commits the incident's pending fixed files to disk when validation passed (or
+        always, per AIOPS_OVERLAY_COMMIT), otherwise discards them. Returns the committed paths.
+        """
+        pending = workspace.paths()
+        if not pending:
+            return None
+        if OVERLAY_COMMIT == "always" or (OVERLAY_COMMIT == "validated" and workspace.validation_passed):
+            committed = workspace.commit()
+            print(f"💾 [OVERLAY] Committed {', '.join(committed)}")
+            return committed
+        workspace.discard()
+        print(f"🗑️ [OVERLAY] Discarded unvalidated {', '.join(pending)}")
+        return None
+
+    async def _run_incident(self, query: str, session_id: Optional[str], stream: bool) -> str:
+        resolved = self.precheck()
+        if resolved:
+            if stream:
+                print(resolved)
+            return resolved
+
+        incident_id = self.incident_id()
+        resumed = self.resume_completed(incident_id)
+        if resumed:
+            if stream:
+                print(resumed)
+            return resumed
+
+        replayed = await self.replay_known_fix()
+        if replayed:
+            if stream:
+                print(replayed)
+            return replayed
+
+        started = time.perf_counter()
+        output = await self._run_agents(query, session_id or self.incident_session_id(incident_id), stream,
+                                        incident_id)
+
+        from config import FIX_STORE
+        if FIX_STORE:
+            from fix_store import record_pipeline_run
+            record_pipeline_run(time.perf_counter() - started)
+        return output
+
+    def incident_id(self) -> Optional[str]:
+        """Stable id of the current incident, derived from its trace. None without checkpoints or trace."""
+        from config import CHECKPOINTS
+        if not CHECKPOINTS:
+            return None
+
+        from checkpoint_store import incident_id_for
+        from file_tools import find_trace_file
+
+        trace_path = find_trace_file()
+        return incident_id_for(trace_path) if os.path.isfile(trace_path) else None
+
+    def incident_session_id(self, incident_id: Optional[str]) -> Optional[str]:
+        """
+        Persistent session of the incident for the current traced source: after a code
+        change the incident starts a fresh session instead of reloading the old history.
+        """
+        if not incident_id:
+            return None
+
+        from checkpoint_store import current_source_hash
+
+        source_hash = current_source_hash()
+        return f"{incident_id}-{source_hash[:8]}" if source_hash else incident_id
+
+    def resume_completed(self, incident_id: Optional[str]) -> Optional[str]:
+        """
+        Returns the stored outcome when a previous run of this incident already passed
+        validation and its fixed_ files are untouched. Partially completed incidents
+        resume inside the pipeline, where each agent skips its checkpointed stage.
+        """
+        if not incident_id:
+            return None
+
+        from checkpoint_store import get_checkpoint_store
+
+        checkpoints = get_checkpoint_store().completed(incident_id)
+        if checkpoints:
+            print(f"💾 [CHECKPOINT] {incident_id}: completed stages {', '.join(sorted(checkpoints))}")
+        validation = checkpoints.get("validation")
+        if "fix" not in checkpoints or not validation:
+            return None
+        return (f"Incident {incident_id} was already fixed and validated; nothing to redo.\n"
+                f"Fixed files: {', '.join(sorted(checkpoints['fix']['files']))}\n{validation['text']}")
+
+    async def replay_known_fix(self) -> Optional[str]:
+        """Applies a stored validated fix for the incident and runs only the validator on it."""
+        from config import FIX_STORE
+        if not FIX_STORE:
+            return None
+
+        from file_tools import find_trace_file
+        from fix_store import replay_known_fix
+
+        trace_path = find_trace_file()
+        if not os.path.isfile(trace_path):
+            return None
+
+        async def run_validator(fixed_path: str, original_path: str) -> str:
+            from agent import validator_agent
+            from speculative_fix import run_agent_once
+
+            return await run_agent_once(
+                validator_agent,
+                f"A known fix was applied to '{fixed_path}' (original file: '{original_path}'). "
+                f"Validate it against trace.json.",
+                {},
+            )
+
+        return await replay_known_fix(trace_path, run_validator)
+
+    async def _run_agents(
+        self, query: str, session_id: Optional[str], stream: bool, incident_id: Optional[str] = None
+    ) -> str:
+        from google.genai import types
+        from checkpoint_store import INCIDENT_STATE_KEY
+
+        runner = self.runner
+        session_id = session_id or f"incident-{uuid.uuid4().hex[:12]}"
+        # A persistent session of an interrupted run is picked up again instead of recreated
+        session = await runner.session_service.get_session(
+            app_name=runner.app_name, user_id=USER_ID, session_id=session_id
+        )
+        if session is None:
+            session = await runner.session_service.create_session(
+                app_name=runner.app_name,
+                user_id=USER_ID,
+                session_id=session_id,
+                state={INCIDENT_STATE_KEY: incident_id} if incident_id else None,
+            )
+        else:
+            print(f"💾 [CHECKPOINT] Resuming session {session_id} ({len(session.events)} events)")
+
+        output = []
+        async for event in runner.run_async(
+            user_id=USER_ID,
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+        ):
+            # Check if the event has content and parts
+            if event.content and event.content.parts:
+                for part in event.content.parts:
+                    if part.text:
+                        output.append(part.text)
+                        if stream:
+                            print(part.text, end="", flush=True)
+
+            # Monitor for errors
+            if getattr(event, "error_message", None):
+                error = f"\n[Error]: {event.error_message}"
+                output.append(error)
+                if stream:
+                    print(error)
+
+        return "".join(output)
@@ -0,0 +1,132 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+from config import SINGLE_FLIGHT
+
+# ========================================
+# SINGLE-FLIGHT COALESCING
+# ========================================
+# Concurrent identical requests (same tool, same arguments; same model request)
+# share one in-flight call: the first caller does the work, every caller that
+# arrives before it finishes waits for and receives the same result (or error).
+# Nothing is cached - once the call completes, the next request runs again.
+# Only side-effect free calls are coalesced; writes and memory saves are not.
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync_calls: Dict[tuple, Future] = {}
+        self._async_calls: Dict[tuple, asyncio.Task] = {}
+        self.metrics: Dict[str, Dict[str, int]] = {}
+
+    def _join(self, calls: dict, key: tuple, new_future: Callable) -> tuple:
+        """Returns (future, is_leader) for key and counts the request."""
+        with self._lock:
+            stats = self.metrics.setdefault(key[0], {"calls": 0, "executions": 0, "coalesced": 0})
+            stats["calls"] += 1
+            future = calls.get(key)
+            if future is not None:
+                stats["coalesced"] += 1
+                return future, False
+            stats["executions"] += 1
+            future = calls[key] = new_future()
+            return future, True
+
+    def _leave(self, calls: dict, key: tuple):
+        with self._lock:
+            calls.pop(key, None)
+
+    def do(self, key: tuple, fn: Callable):
+        """Runs fn() once for all threads calling with the same key at the same time."""
+        future, leader = self._join(self._sync_calls, key, Future)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(self._sync_calls, key)
+
+    async def do_async(self, key: tuple, fn: Callable):
+        """Awaits fn() once for all tasks of this event loop awaiting the same key at the same time."""
+        loop = asyncio.get_running_loop()
+        # asyncio futures belong to one loop, so in-flight calls are per loop
+        loop_key = key + (id(loop),)
+
+        async def shared_call():
+            try:
+                return await fn()
+            finally:
+                self._leave(self._async_calls, loop_key)
+
+        def start_task() -> asyncio.Task:
+            task = loop.create_task(shared_call())
+            # callers may all be gone; avoid "exception never retrieved"
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            return task
+
+        # The shared call runs as its own task and every caller, the first one included,
+        # awaits it through a shield: cancelling one caller never cancels the others.
+        task, _ = self._join(self._async_calls, loop_key, start_task)
+        return await asyncio.shield(task)
+
+    def reset_metrics(self):
+        with self._lock:
+            self.metrics.clear()
+
+
+flight = SingleFlight()
+
+
+def single_flight(name: Optional[str] = None, key: Optional[Callable] = None):
+    """
+    Decorator coalescing concurrent identical calls of a sync or async function.
+    The key is the function name plus its arguments; key(*args, **kwargs) may add
+    whatever else the result depends on. functools.wraps keeps the signature and
+    docstring, so decorated functions still work as ADK tools.
+    """
+    def decorator(func):
+        if not SINGLE_FLIGHT:
+            return func
+        flight_name = name or func.__name__
+
+        def flight_key(args, kwargs) -> tuple:
+            extra = key(*args, **kwargs) if key else None
+            return flight_name, repr(args), repr(sorted(kwargs.items())), extra
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                return await flight.do_async(flight_key(args, kwargs), lambda: func(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return flight.do(flight_key(args, kwargs), lambda: func(*args, **kwargs))
+        return wrapper
+
+    return decorator
+
+
+def single_flight_report() -> str:
+    with flight._lock:
+        metrics = {name: dict(stats) for name, stats in flight.metrics.items()}
+    calls = sum(stats["calls"] for stats in metrics.values())
+    if not calls:
+        return "🛫 [SINGLE_FLIGHT] No coalescable requests yet"
+    coalesced = sum(stats["coalesced"] for stats in metrics.values())
+    lines = [f"🛫 [SINGLE_FLIGHT] {calls} requests, {coalesced} coalesced ({coalesced / calls:.0%})"]
+    for flight_name, stats in sorted(metrics.items()):
+        lines.append(f"- {flight_name}: {stats['calls']} calls, {stats['executions']} executed, "
+                     f"{stats['coalesced']} coalesced")
+    return "\n".join(lines)
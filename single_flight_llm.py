@@ -0,0 +1,45 @@
+import hashlib
+from typing import AsyncGenerator, Optional
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+
+from single_flight import flight
+
+
+def _request_key(llm_request: LlmRequest) -> Optional[str]:
+    """Hash of everything sent to the model, or None when the request cannot be serialized."""
+    try:
+        payload = llm_request.model_dump_json(exclude_none=True)
+    except Exception:
+        return None
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SingleFlightLlm(BaseLlm):
+    """
+    Wraps another model so that concurrent identical requests (same model, contents,
+    instruction, tools and config) make one model call. Every caller receives its
+    own copy of the responses. Streaming requests are passed through unchanged.
+    """
+
+    inner: BaseLlm
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return []
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        request_key = None if stream else _request_key(llm_request)
+        if request_key is None:
+            async for response in self.inner.generate_content_async(llm_request, stream):
+                yield response
+            return
+
+        async def call_model():
+            return [response async for response in self.inner.generate_content_async(llm_request, stream)]
+
+        responses = await flight.do_async((f"llm:{llm_request.model or self.model}", request_key), call_model)
+        for response in responses:
+            yield response.model_copy(deep=True)
@@ -0,0 +1,264 @@
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+from google.adk.agents import LlmAgent
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from config import FIX_STORE, MEMORY_USER_ID, SPECULATIVE_FIX_CANDIDATES, MODEL_ROUTING
+from fix_store import record_validated_fix
+from overlay_fs import current_overlay
+from model_router import agent_model, model_routing_callback, ESCALATION_STATE_KEY
+from memory_agent import save_memory, get_all_memories
+from validation import VALIDATION_PASS, VALIDATION_FAIL, validation_passed, check_python_syntax
+from file_tools import (
+    read_file,
+    find_trace_file,
+    find_error_source_file,
+    candidate_file_path,
+    write_candidate_file,
+    promote_candidate_file,
+    remember_fixed_file,
+    invalidate_codebase_index,
+)
+
+# ========================================
+# CANDIDATE STRATEGIES
+# ========================================
+# Each candidate gets its own temperature and fixing strategy so that the
+# candidates explore different fixes instead of producing the same patch N times.
+CANDIDATE_STRATEGIES = [
+    (0.2, "Apply the smallest possible change that removes the error. Do not touch unrelated lines."),
+    (0.7, "Fix the root cause and guard the surrounding code against the same failure."),
+    (1.0, "Fix the error the way an experienced maintainer of this codebase would, following its existing style."),
+]
+
+
+def _candidate_strategy(candidate: int):
+    temperature, strategy = CANDIDATE_STRATEGIES[(candidate - 1) % len(CANDIDATE_STRATEGIES)]
+    # Candidates beyond the strategy list reuse a strategy with a hotter temperature
+    round_offset = (candidate - 1) // len(CANDIDATE_STRATEGIES)
+    return min(temperature + 0.3 * round_offset, 2.0), strategy
+
+
+def _build_candidate_agents(candidate: int, written_files: list):
+    """Builds the fixer and validator agents for a single fix candidate."""
+    temperature, strategy = _candidate_strategy(candidate)
+
+    def write_file(file_path: str, content: str) -> str:
+        """
+        Saves the fixed content of the original file as this candidate's fix.
+        The original file remains unchanged.
+        """
+        result = write_candidate_file(file_path, content, candidate)
+        if not result.startswith("Error"):
+            written_files.append(file_path)
+        return result
+
+    fixer = LlmAgent(
+        name=f"fixer_agent_candidate_{candidate}",
+        model=agent_model("gemini-2.5-flash"),
+        description=f"Produces fix candidate {candidate}.",
+        instruction=f"""
+    You are an expert AIOps Fixer producing fix candidate {candidate}.
+    Strategy: {strategy}
+    1. Use the analysis provided in the request.
+    2. Use find_error_source_file() to get the path of the faulty code file if needed.
+    3. Read the faulty code using read_file().
+    4. Use write_file(original_file_path, fixed_content) to save the complete fixed file.
+       The original file remains unchanged.
+    """,
+        tools=[
+            find_error_source_file,
+            find_trace_file,
+            read_file,
+            write_file,
+            get_all_memories,
+        ],
+        generate_content_config=types.GenerateContentConfig(temperature=temperature),
+        before_model_callback=model_routing_callback if MODEL_ROUTING else None,
+    )
+
+    validator = LlmAgent(
+        name=f"validator_agent_candidate_{candidate}",
+        model=agent_model("gemini-2.5-flash"),
+        description=f"Validates fix candidate {candidate}.",
+        instruction=f"""
+    You are an expert AIOps Validator. Your task is to:
+    1. Read every candidate file named in the request using read_file().
+    2. Read the trace.json to understand the original error.
+    3. Verify the candidate files together address the error from trace.json without breaking the surrounding code.
+    4. End your answer with exactly '{VALIDATION_PASS}' or '{VALIDATION_FAIL}'.
+    """,
+        tools=[
+            find_error_source_file,
+            find_trace_file,
+            read_file,
+        ],
+        generate_content_config=types.GenerateContentConfig(temperature=0.0),
+        before_model_callback=model_routing_callback if MODEL_ROUTING else None,
+    )
+    return fixer, validator
+
+
+# ========================================
+# CANDIDATE PIPELINE
+# ========================================
+async def run_agent_once(agent: LlmAgent, prompt: str, state: dict) -> str:
+    """Runs an agent in its own session and returns its final response text."""
+    runner = InMemoryRunner(agent=agent, app_name="aiops")
+    session = await runner.session_service.create_session(
+        app_name=runner.app_name, user_id=MEMORY_USER_ID, state=dict(state)
+    )
+
+    final_text = ""
+    async for event in runner.run_async(
+        user_id=MEMORY_USER_ID,
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text=prompt)]),
+    ):
+        if event.is_final_response() and event.content and event.content.parts:
+            final_text = "".join(part.text or "" for part in event.content.parts)
+    return final_text
+
+
+async def _run_candidate(candidate: int, analysis: str, state: dict,
+                         written_files: List[str]) -> Optional[Tuple[int, List[str]]]:
+    """
+    Fixes and validates a single candidate. written_files collects the original paths
+    the candidate wrote a fix for. Returns (candidate, original file paths) when the
+    candidate passes validation, otherwise None.
+    """
+    fixer, validator = _build_candidate_agents(candidate, written_files)
+    try:
+        await run_agent_once(fixer, f"Analysis of the bug:\n{analysis}\n\nWrite fix candidate {candidate}.", state)
+        if not written_files:
+            print(f"⚠️ [SPECULATIVE] Candidate {candidate} did not write a fix")
+            return None
+
+        original_paths = list(dict.fromkeys(written_files))
+        fixed_paths = [str(candidate_file_path(path, candidate)) for path in original_paths]
+
+        # Cheap local check first - no need to spend a validator call on broken syntax
+        for fixed_path in fixed_paths:
+            syntax_error = check_python_syntax(fixed_path) if fixed_path.endswith(".py") else ""
+            if syntax_error:
+                print(f"❌ [SPECULATIVE] Candidate {candidate} rejected: {syntax_error}")
+                return None
+
+        files = "\n".join(f"- '{fixed_path}' for the original file '{original_path}'"
+                          for fixed_path, original_path in zip(fixed_paths, original_paths))
+        verdict = await run_agent_once(
+            validator,
+            f"Validate every file of fix candidate {candidate} together:\n{files}",
+            state,
+        )
+        if validation_passed(verdict):
+            print(f"✅ [SPECULATIVE] Candidate {candidate} passed validation")
+            return candidate, original_paths
+
+        print(f"❌ [SPECULATIVE] Candidate {candidate} failed validation")
+        return None
+
+    except asyncio.CancelledError:
+        print(f"🛑 [SPECULATIVE] Candidate {candidate} cancelled")
+        raise
+    except Exception as e:
+        print(f"❌ [SPECULATIVE] Candidate {candidate} error: {str(e)}")
+        return None
+
+
+def _discard_candidates(written: Dict[int, List[str]]):
+    """
+    Removes the 'fixed_<n>_' files this run's losing or cancelled candidates left behind.
+    Only the candidate paths written here are touched, never another run's candidates.
+    """
+    overlay = current_overlay()
+    for candidate, original_paths in written.items():
+        for original_path in set(original_paths):
+            path = candidate_file_path(original_path, candidate)
+            if overlay is not None:
+                overlay.remove(path)
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    if overlay is None:
+        invalidate_codebase_index()
+
+
+# ========================================
+# TOOL
+# ========================================
+async def speculative_fix(analysis: str, tool_context: ToolContext) -> str:
+    """
+    Generates several fix candidates concurrently and validates them in parallel.
+    Each candidate is written to its own 'fixed_<n>_' file. The first candidate that
+    passes validation is promoted to the regular 'fixed_' file and the rest are cancelled.
+
+    Args:
+        analysis: The root cause analysis produced by the analyzer_agent.
+    """
+    candidates = max(SPECULATIVE_FIX_CANDIDATES, 2)
+    escalation = tool_context.state.get(ESCALATION_STATE_KEY, 0)
+    state = {ESCALATION_STATE_KEY: escalation}
+    print(f"🚀 [SPECULATIVE] Generating {candidates} fix candidates in parallel")
+
+    written: Dict[int, List[str]] = {candidate: [] for candidate in range(1, candidates + 1)}
+    tasks = [
+        asyncio.create_task(_run_candidate(candidate, analysis, state, written[candidate]))
+        for candidate in written
+    ]
+
+    winner = None
+    try:
+        for finished in asyncio.as_completed(tasks):
+            winner = await finished
+            if winner:
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if winner is None:
+        _discard_candidates(written)
+        # Same as a failed validator run: the next attempt goes to a larger model
+        tool_context.state[ESCALATION_STATE_KEY] = escalation + 1
+        result = f"{VALIDATION_FAIL} - none of the {candidates} fix candidates passed validation."
+        await save_memory(f"Speculative fix failed: none of the {candidates} candidates passed validation.")
+        print(f"❌ [SPECULATIVE] {result}")
+        return result
+
+    candidate, original_paths = winner
+    promoted = {original_path: promote_candidate_file(original_path, candidate) for original_path in original_paths}
+    _discard_candidates(written)
+    errors = [fixed_path for fixed_path in promoted.values() if fixed_path.startswith("Error")]
+    if errors:
+        # The validated fix never reached its fixed_ file; reporting PASS would point at nothing
+        tool_context.state[ESCALATION_STATE_KEY] = escalation + 1
+        result = f"{VALIDATION_FAIL} - fix candidate {candidate} passed validation but could not be promoted: " + \
+            "; ".join(errors)
+        await save_memory(f"Speculative fix failed: candidate {candidate} could not be promoted.")
+        print(f"❌ [SPECULATIVE] {result}")
+        return result
+
+    for original_path, fixed_path in promoted.items():
+        remember_fixed_file(tool_context.state, original_path, fixed_path)
+    overlay = current_overlay()
+    if overlay is not None:
+        overlay.validation_passed = True
+    if FIX_STORE:
+        for original_path, fixed_path in promoted.items():
+            record_validated_fix(find_trace_file(), original_path, fixed_path, VALIDATION_PASS)
+    files = "\n".join(f"Fixed file: {fixed_path}\nOriginal file unchanged: {original_path}"
+                      for original_path, fixed_path in promoted.items())
+    result = f"{VALIDATION_PASS} - fix candidate {candidate} passed validation.\n{files}"
+    await save_memory(
+        f"Speculative fix: candidate {candidate} passed validation. Fixed files: "
+        + ", ".join(f"{fixed_path} (original: {original_path})" for original_path, fixed_path in promoted.items())
+    )
+    return result
@@ -0,0 +1,227 @@
+import difflib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional
+
+from file_tools import FIXED_FILES_STATE_KEY
+from overlay_fs import read_text
+from symbol_index import SymbolIndex, get_symbol_index
+
+if TYPE_CHECKING:
+    from google.adk.tools import ToolContext
+
+# ========================================
+# STATIC SWEEP
+# ========================================
+# Whole-codebase checks for the bug classes that turn into incidents, run over the
+# symbol index (one parallel AST pass, cached per file hash):
+#   attributes - Class.attr where the class is defined in the codebase and neither
+#                it nor its indexed bases define attr (e.g. User.emails)
+#   names      - names that are never bound anywhere in their module
+#   arity      - calls to codebase functions with too many, too few or unknown arguments
+# Every check errs on the side of silence: anything it cannot prove is skipped.
+# Fixes written in the session are checked in place of the files they fix, so the
+# fixer can sweep its own 'fixed_' files, including those still in its overlay.
+
+CHECKS = ("attributes", "names", "arity")
+
+# Bases whose attributes are known; classes deriving from anything else that is not
+# indexed (pydantic, Exception, ...) may inherit any attribute and are not checked.
+_KNOWN_BASES = {
+    "object": set(),
+    "Base": {"metadata", "registry", "query", "__table__", "__mapper__", "__tablename__", "__table_args__"},
+    "DeclarativeBase": {"metadata", "registry", "__table__", "__mapper__", "__tablename__", "__table_args__"},
+}
+
+
+@dataclass
+class Finding:
+    check: str
+    file_path: str
+    line: int
+    function: str
+    message: str
+    suggestion: Optional[str] = None
+
+    def format(self) -> str:
+        where = f"{self.file_path}:{self.line}" + (f" in {self.function}" if self.function else "")
+        hint = f" -> did you mean '{self.suggestion}'?" if self.suggestion else ""
+        return f"- [{self.check}] {where}: {self.message}{hint}"
+
+
+def _local_classes(index: SymbolIndex, path: str) -> Dict[str, str]:
+    """Class names usable in a module (defined there or imported), mapped to the indexed class name."""
+    symbols = index.files[path]["symbols"]
+    names = {name: name for name in symbols.get("classes", {})}
+    for item in symbols.get("imports", []):
+        if item["name"] and index.classes(item["name"]):
+            names[item["alias"] or item["name"]] = item["name"]
+    return names
+
+
+def _known_attributes(index: SymbolIndex, class_name: str) -> Optional[set]:
+    """All attributes of a class, or None when some base is outside the index."""
+    attributes, pending, seen = set(), [class_name], set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        if current in _KNOWN_BASES:
+            attributes |= _KNOWN_BASES[current]
+            continue
+        definitions = index.classes(current)
+        if not definitions:
+            return None
+        for _, definition in definitions:
+            attributes |= set(definition["attributes"])
+            pending.extend(base.split(".")[-1] for base in definition["bases"])
+    return attributes
+
+
+def check_attributes(index: SymbolIndex) -> List[Finding]:
+    findings = []
+    known: Dict[str, Optional[set]] = {}
+    for path, entry in index.files.items():
+        classes = _local_classes(index, path)
+        for ref in entry["symbols"].get("attribute_refs", []):
+            class_name = classes.get(ref["base"])
+            if not class_name or ref["attr"].startswith("__"):
+                continue
+            if class_name not in known:
+                known[class_name] = _known_attributes(index, class_name)
+            attributes = known[class_name]
+            if attributes is None or ref["attr"] in attributes:
+                continue
+            close = difflib.get_close_matches(ref["attr"], sorted(attributes), n=1)
+            findings.append(Finding("attributes", path, ref["line"], ref["caller"],
+                                    f"type object '{class_name}' has no attribute '{ref['attr']}'",
+                                    close[0] if close else None))
+    return findings
+
+
+def check_names(index: SymbolIndex) -> List[Finding]:
+    findings = []
+    for path, entry in index.files.items():
+        symbols = entry["symbols"]
+        candidates = set(symbols.get("classes", {})) | {name.split(".")[-1] for name in symbols.get("functions", {})}
+        candidates |= {item["alias"] or item["name"] or item["module"] for item in symbols.get("imports", [])}
+        for name in symbols.get("unbound_names", []):
+            close = difflib.get_close_matches(name["name"], sorted(candidates), n=1)
+            findings.append(Finding("names", path, name["line"], "",
+                                    f"name '{name['name']}' is not defined", close[0] if close else None))
+    return findings
+
+
+def _resolve_function(index: SymbolIndex, path: str, callee: str) -> Optional[dict]:
+    """Signature of a bare-name call to a module-level codebase function, when unambiguous."""
+    symbols = index.files[path]["symbols"]
+    if callee in symbols.get("functions", {}):
+        return symbols["functions"][callee]
+    for item in symbols.get("imports", []):
+        if item["name"] and (item["alias"] or item["name"]) == callee:
+            definitions = [info for _, qualified, info in index.functions(item["name"]) if qualified == item["name"]]
+            return definitions[0] if len(definitions) == 1 else None
+    return None
+
+
+def check_arity(index: SymbolIndex) -> List[Finding]:
+    findings = []
+    for path, entry in index.files.items():
+        for call in entry["symbols"].get("calls", []):
+            if "." in call["callee"] or call["starred"]:
+                continue
+            signature = _resolve_function(index, path, call["callee"])
+            # Decorators may change the signature (routes, caches, ...)
+            if not signature or signature["decorators"]:
+                continue
+
+            problem = None
+            keywords = set(call["keywords"])
+            positional = call["positional"]
+            if positional > len(signature["args"]) and not signature["varargs"]:
+                problem = f"takes {len(signature['args'])} positional arguments but {positional} were given"
+            else:
+                unknown = keywords - set(signature["args"]) - set(signature["kwonly"])
+                if unknown and not signature["varkw"]:
+                    problem = f"got an unexpected keyword argument '{sorted(unknown)[0]}'"
+                else:
+                    missing = [arg for arg in signature["args"][positional:signature["required"]] if arg not in keywords]
+                    missing += [arg for arg in signature["kwonly_required"] if arg not in keywords]
+                    if missing:
+                        problem = f"missing required argument(s): {', '.join(missing)}"
+            if problem:
+                findings.append(Finding("arity", path, call["line"], call["caller"],
+                                        f"{call['callee']}() {problem}"))
+    return findings
+
+
+_CHECK_FUNCTIONS = {"attributes": check_attributes, "names": check_names, "arity": check_arity}
+
+
+def fixed_sources(state: Mapping, base_directory: str = "codebase") -> Dict[str, str]:
+    """Python fixes written in the session, keyed by the relative path of the file they fix."""
+    sources = {}
+    for original_path, fixed_path in (state.get(FIXED_FILES_STATE_KEY) or {}).items():
+        relative = Path(os.path.relpath(original_path, base_directory)).as_posix()
+        if relative.startswith("../") or not relative.endswith(".py"):
+            continue
+        try:
+            sources[relative] = read_text(fixed_path)
+        except OSError:
+            continue
+    return sources
+
+
+def sweep(checks=CHECKS, base_directory: str = "codebase",
+          sources: Optional[Dict[str, str]] = None) -> List[Finding]:
+    """Runs the checks; sources (relative path -> source) replace the files on disk."""
+    index = get_symbol_index(base_directory)
+    if sources:
+        index = index.with_sources(sources)
+    findings = []
+    for check in checks:
+        findings.extend(_CHECK_FUNCTIONS[check](index))
+    # Paths usable with read_file / write_file
+    for finding in findings:
+        finding.file_path = str(Path(base_directory) / finding.file_path)
+    return sorted(findings, key=lambda finding: (finding.file_path, finding.line))
+
+
+# ========================================
+# TOOL
+# ========================================
+def static_sweep(checks: str = "attributes,names,arity", match: str = "",
+                 tool_context: "ToolContext" = None) -> str:
+    """
+    Checks the whole codebase in one pass for sibling bugs of the same class:
+    non-existent class/model attributes (e.g. User.emails), undefined names and
+    calls with the wrong number of arguments. Files fixed with write_file() are
+    checked as fixed, so remaining findings in them mean the fix is incomplete.
+
+    Args:
+        checks: Comma separated subset of "attributes", "names", "arity".
+        match: Optional text a finding must contain, e.g. "emails" to list every
+               occurrence of the same mistake.
+    """
+    requested = [check.strip() for check in checks.split(",") if check.strip()]
+    unknown = [check for check in requested if check not in _CHECK_FUNCTIONS]
+    if unknown:
+        return f"Error: unknown check(s) {', '.join(unknown)}; use {', '.join(CHECKS)}"
+
+    print(f"🧹 [SWEEP] Running {', '.join(requested)} checks over the codebase")
+    try:
+        sources = fixed_sources(tool_context.state) if tool_context is not None else {}
+        findings = [finding for finding in sweep(requested, sources=sources) if match in finding.format()]
+    except Exception as e:
+        return f"Error running static sweep: {str(e)}"
+
+    fixed = (f" (checked with the fixes in place of: {', '.join(f'codebase/{path}' for path in sorted(sources))})"
+             if sources else "")
+    if not findings:
+        return f"No {', '.join(requested)} problems found" + (f" matching '{match}'" if match else "") + fixed
+    files = sorted({finding.file_path for finding in findings})
+    lines = [f"Found {len(findings)} problem(s) in {len(files)} file(s){fixed}:"]
+    lines.extend(finding.format() for finding in findings)
+    return "\n".join(lines)
@@ -0,0 +1,374 @@
+import ast
+import builtins
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from file_tools import get_codebase_index
+
+# ========================================
+# SYMBOL INDEX
+# ========================================
+# One AST pass per module records classes (with their attributes and SQLAlchemy
+# columns), functions, imports, call sites, attribute references and names that
+# are never bound. Files are re-parsed only when their content hash changes, so
+# after the first build a refresh costs one read and hash per file.
+
+# Below this many changed files the parse runs inline: starting the process
+# pool costs more than parsing a handful of modules.
+PARALLEL_PARSE_THRESHOLD = 16
+
+_COLUMN_FACTORIES = {"Column", "mapped_column"}
+_RELATIONSHIP_FACTORIES = {"relationship", "backref"}
+
+
+def _dotted_name(node: ast.AST) -> str:
+    """'a.b.c' for Name/Attribute chains, '' for anything else."""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+        return ".".join(reversed(parts))
+    return ""
+
+
+def _signature(node) -> dict:
+    args = node.args
+    positional = [arg.arg for arg in args.posonlyargs + args.args]
+    return {
+        "args": positional,
+        "required": len(positional) - len(args.defaults),
+        "kwonly": [arg.arg for arg in args.kwonlyargs],
+        "kwonly_required": [arg.arg for arg, default in zip(args.kwonlyargs, args.kw_defaults) if default is None],
+        "varargs": args.vararg is not None,
+        "varkw": args.kwarg is not None,
+    }
+
+
+def _class_attribute(value: ast.AST) -> dict:
+    if isinstance(value, ast.Call):
+        factory = _dotted_name(value.func).split(".")[-1]
+        if factory in _COLUMN_FACTORIES:
+            column_type = next((_dotted_name(arg.func if isinstance(arg, ast.Call) else arg)
+                                for arg in value.args if _dotted_name(arg.func if isinstance(arg, ast.Call) else arg)), "")
+            return {"kind": "column", "type": column_type}
+        if factory in _RELATIONSHIP_FACTORIES:
+            target = value.args[0].value if value.args and isinstance(value.args[0], ast.Constant) else ""
+            return {"kind": "relationship", "type": target}
+    return {"kind": "attribute", "type": ""}
+
+
+class _ModuleVisitor(ast.NodeVisitor):
+
+    def __init__(self):
+        self.classes: Dict[str, dict] = {}
+        self.functions: Dict[str, dict] = {}
+        self.imports: List[dict] = []
+        self.calls: List[dict] = []
+        self.attribute_refs: List[dict] = []
+        self._scope: List[str] = []
+
+    def _current_function(self) -> str:
+        return ".".join(self._scope)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            self.imports.append({"module": alias.name, "name": None, "alias": alias.asname, "line": node.lineno})
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        for alias in node.names:
+            self.imports.append({"module": node.module or "", "name": alias.name, "alias": alias.asname,
+                                 "line": node.lineno})
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        attributes = {}
+        for statement in node.body:
+            if isinstance(statement, ast.Assign):
+                for target in statement.targets:
+                    if isinstance(target, ast.Name):
+                        attributes[target.id] = dict(_class_attribute(statement.value), line=statement.lineno)
+            elif isinstance(statement, ast.AnnAssign) and isinstance(statement.target, ast.Name):
+                attributes[statement.target.id] = dict(
+                    _class_attribute(statement.value) if statement.value else {"kind": "attribute", "type": ""},
+                    line=statement.lineno)
+            elif isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                attributes[statement.name] = {"kind": "method", "type": "", "line": statement.lineno}
+                # Instance attributes assigned in methods (self.x = ...)
+                for inner in ast.walk(statement):
+                    if isinstance(inner, (ast.Assign, ast.AnnAssign)):
+                        for target in (inner.targets if isinstance(inner, ast.Assign) else [inner.target]):
+                            if (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                                    and target.value.id == "self" and target.attr not in attributes):
+                                attributes[target.attr] = {"kind": "attribute", "type": "", "line": inner.lineno}
+        self.classes[node.name] = {
+            "line": node.lineno,
+            "end_line": node.end_lineno,
+            "bases": [_dotted_name(base) for base in node.bases if _dotted_name(base)],
+            "attributes": attributes,
+        }
+        self._scope.append(node.name)
+        self.generic_visit(node)
+        self._scope.pop()
+
+    def _visit_function(self, node):
+        qualified = ".".join(self._scope + [node.name])
+        self.functions[qualified] = dict(
+            _signature(node), line=node.lineno, end_line=node.end_lineno,
+            is_async=isinstance(node, ast.AsyncFunctionDef),
+            decorators=[_dotted_name(d.func if isinstance(d, ast.Call) else d) for d in node.decorator_list],
+        )
+        self._scope.append(node.name)
+        self.generic_visit(node)
+        self._scope.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_Call(self, node: ast.Call):
+        callee = _dotted_name(node.func)
+        if callee:
+            self.calls.append({
+                "callee": callee,
+                "line": node.lineno,
+                "caller": self._current_function(),
+                "positional": len(node.args),
+                "keywords": [keyword.arg for keyword in node.keywords],
+                "starred": any(isinstance(arg, ast.Starred) for arg in node.args)
+                           or any(keyword.arg is None for keyword in node.keywords),
+            })
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if isinstance(node.value, ast.Name):
+            self.attribute_refs.append({"base": node.value.id, "attr": node.attr, "line": node.lineno,
+                                        "col": node.col_offset, "caller": self._current_function()})
+        self.generic_visit(node)
+
+
+def _unbound_names(tree: ast.Module) -> List[dict]:
+    """
+    Names that are read somewhere in the module but never bound anywhere in it
+    (assignment, argument, import, def/class, except/with/for target) and are not
+    builtins. Module-wide rather than per scope, so it only reports names that
+    cannot resolve at all, such as typos.
+    """
+    bound = set(dir(builtins)) | {"__file__", "__name__", "__doc__", "__spec__", "__package__", "__builtins__"}
+    loads = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and any(alias.name == "*" for alias in node.names):
+            return []  # star imports make every name possibly bound
+        if isinstance(node, ast.Name):
+            if isinstance(node.ctx, ast.Load):
+                loads.append(node)
+            else:
+                bound.add(node.id)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            bound.update((alias.asname or alias.name).split(".")[0] for alias in node.names)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+        elif isinstance(node, ast.MatchAs) and node.name:
+            bound.add(node.name)
+    return [{"name": node.id, "line": node.lineno} for node in loads if node.id not in bound]
+
+
+def extract_symbols(source: str) -> dict:
+    """Parses one module. Returns its symbol table, or {'error': ...} when it does not parse."""
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        return {"error": f"SyntaxError line {e.lineno}: {e.msg}"}
+    visitor = _ModuleVisitor()
+    visitor.visit(tree)
+    return {
+        "classes": visitor.classes,
+        "functions": visitor.functions,
+        "imports": visitor.imports,
+        "calls": visitor.calls,
+        "attribute_refs": visitor.attribute_refs,
+        "unbound_names": _unbound_names(tree),
+    }
+
+
+def _parse_file(path: str) -> tuple:
+    # Top level so the process pool can pickle it
+    source = Path(path).read_text()
+    return path, hashlib.sha1(source.encode()).hexdigest(), extract_symbols(source)
+
+
+class SymbolIndex:
+
+    def __init__(self, base_directory: str = "codebase"):
+        self.base_directory = base_directory
+        self.files: Dict[str, dict] = {}  # relative path -> {"hash": ..., "symbols": ...}
+        self.last_parsed = 0
+
+    def _python_files(self) -> List[str]:
+        # 'fixed_' files are agent output, not part of the application
+        return [path for path in get_codebase_index(self.base_directory)
+                if path.endswith(".py") and not os.path.basename(path).startswith("fixed_")]
+
+    def refresh(self) -> "SymbolIndex":
+        """Re-parses new and changed modules and drops deleted ones."""
+        base = Path(self.base_directory)
+        current = self._python_files()
+        changed = []
+        for relative in current:
+            try:
+                digest = hashlib.sha1((base / relative).read_bytes()).hexdigest()
+            except OSError:
+                continue
+            if self.files.get(relative, {}).get("hash") != digest:
+                changed.append(str(base / relative))
+
+        if len(changed) >= PARALLEL_PARSE_THRESHOLD:
+            with ProcessPoolExecutor() as pool:
+                results = list(pool.map(_parse_file, changed, chunksize=4))
+        else:
+            results = [_parse_file(path) for path in changed]
+
+        for path, digest, symbols in results:
+            self.files[str(Path(path).relative_to(base))] = {"hash": digest, "symbols": symbols}
+        for relative in set(self.files) - set(current):
+            del self.files[relative]
+        self.last_parsed = len(results)
+        return self
+
+    def with_sources(self, sources: Dict[str, str]) -> "SymbolIndex":
+        """
+        Copy of the index in which the given modules (relative path -> source) replace
+        the files on disk, e.g. fixes that live in 'fixed_' files or an overlay workspace.
+        """
+        view = SymbolIndex(self.base_directory)
+        view.files = dict(self.files)
+        for relative, source in sources.items():
+            view.files[relative] = {"hash": hashlib.sha1(source.encode()).hexdigest(),
+                                    "symbols": extract_symbols(source)}
+        return view
+
+    # ---------- lookups ----------
+    def classes(self, name: str) -> List[tuple]:
+        return [(path, entry["symbols"]["classes"][name]) for path, entry in self.files.items()
+                if name in entry["symbols"].get("classes", {})]
+
+    def class_attributes(self, name: str) -> Dict[str, dict]:
+        """Attributes of a class including those of its indexed base classes."""
+        attributes, pending, seen = {}, [name], set()
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            for _, definition in self.classes(current):
+                for attr, info in definition["attributes"].items():
+                    attributes.setdefault(attr, dict(info, owner=current))
+                pending.extend(base.split(".")[-1] for base in definition["bases"])
+        return attributes
+
+    def functions(self, name: str) -> List[tuple]:
+        """Definitions whose qualified name is, or ends with, name."""
+        return [(path, qualified, info) for path, entry in self.files.items()
+                for qualified, info in entry["symbols"].get("functions", {}).items()
+                if qualified == name or qualified.endswith(f".{name}")]
+
+    def call_sites(self, name: str) -> List[tuple]:
+        return [(path, call) for path, entry in self.files.items()
+                for call in entry["symbols"].get("calls", [])
+                if call["callee"] == name or call["callee"].endswith(f".{name}")]
+
+    def imports(self, path: str) -> List[dict]:
+        entry = self.files.get(path) or next(
+            (entry for relative, entry in self.files.items() if relative.endswith(path)), None)
+        return entry["symbols"].get("imports", []) if entry else []
+
+
+_symbol_index: Optional[SymbolIndex] = None
+
+
+def get_symbol_index(base_directory: str = "codebase") -> SymbolIndex:
+    """Returns the process-wide index, refreshed against the current files."""
+    global _symbol_index
+    if _symbol_index is None or _symbol_index.base_directory != base_directory:
+        _symbol_index = SymbolIndex(base_directory)
+    return _symbol_index.refresh()
+
+
+# ========================================
+# TOOL
+# ========================================
+_QUERY = re.compile(r"^\s*(attributes|columns|definition|callers|imports)\s+(?:of|in|for)\s+(\S+?)\s*\??$", re.I)
+
+
+def _format_attributes(name: str, index: SymbolIndex, columns_only: bool) -> str:
+    definitions = index.classes(name)
+    if not definitions:
+        return f"Error: class '{name}' not found in the codebase"
+    lines = [f"class {name} defined in " + ", ".join(f"{path}:{d['line']}" for path, d in definitions)]
+    for attr, info in sorted(index.class_attributes(name).items(), key=lambda item: item[1]["line"]):
+        if columns_only and info["kind"] != "column":
+            continue
+        detail = f" ({info['type']})" if info["type"] else ""
+        owner = f" [from {info['owner']}]" if info["owner"] != name else ""
+        lines.append(f"- {attr}: {info['kind']}{detail}, line {info['line']}{owner}")
+    return "\n".join(lines)
+
+
+def query_symbols(query: str) -> str:
+    """
+    Answers questions about the codebase from the symbol index, without reading files.
+    Supported queries:
+        - "attributes of User"   : attributes, columns, relationships and methods of a class
+        - "columns of User"      : only the SQLAlchemy columns
+        - "definition of load_user" : where a function or class is defined and its signature
+        - "callers of load_user" : every call site
+        - "imports of services/user.py" : what a module imports
+    A bare name is looked up as a class and as a function.
+    """
+    print(f"🧭 [SYMBOLS] {query}")
+    try:
+        index = get_symbol_index()
+        match = _QUERY.match(query)
+        kind, name = (match.group(1).lower(), match.group(2)) if match else ("definition", query.strip())
+
+        if kind in ("attributes", "columns"):
+            return _format_attributes(name, index, columns_only=kind == "columns")
+
+        if kind == "callers":
+            sites = index.call_sites(name)
+            if not sites:
+                return f"No call sites of '{name}' found"
+            return "\n".join(f"- {path}:{call['line']} in {call['caller'] or '<module>'}: {call['callee']}()"
+                             for path, call in sites)
+
+        if kind == "imports":
+            imports = index.imports(name)
+            if not imports:
+                return f"No imports found for '{name}'"
+            return "\n".join(
+                f"- line {item['line']}: " + (f"from {item['module']} import {item['name']}" if item["name"]
+                                             else f"import {item['module']}")
+                + (f" as {item['alias']}" if item["alias"] else "")
+                for item in imports)
+
+        results = []
+        for path, definition in index.classes(name):
+            results.append(f"class {name} at {path}:{definition['line']}-{definition['end_line']} "
+                           f"(bases: {', '.join(definition['bases']) or 'none'})")
+        for path, qualified, info in index.functions(name):
+            prefix = "async def" if info["is_async"] else "def"
+            results.append(f"{prefix} {qualified}({', '.join(info['args'])}) at "
+                           f"{path}:{info['line']}-{info['end_line']}")
+        return "\n".join(results) if results else f"Error: '{name}' is not defined in the codebase"
+
+    except Exception as e:
+        return f"Error querying symbol index: {str(e)}"
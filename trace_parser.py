@@ -0,0 +1,62 @@
+import os
+import json
+from pathlib import Path
+from typing import List, Optional
+
+
+def load_trace_attributes(trace_path: str) -> dict:
+    """
+    Loads the exception attributes of the first event in an OpenTelemetry trace.json.
+    The old simple format ({"error": ..., "traceback": [...]}) is mapped onto the same keys.
+    Returns an empty dict when the trace cannot be read.
+    """
+    try:
+        with open(trace_path, "r") as f:
+            trace_data = json.load(f)
+    except Exception:
+        return {}
+
+    if isinstance(trace_data, list) and len(trace_data) > 0:
+        return trace_data[0].get("event_attributes", {}) or {}
+
+    if isinstance(trace_data, dict):
+        error = trace_data.get("error", "")
+        return {
+            "exception.type": error.split(":")[0] if ":" in error else "",
+            "exception.message": error,
+            "exception.stacktrace": "\n".join(trace_data.get("traceback", [])),
+        }
+
+    return {}
+
+
+def parse_stack_frames(attrs: dict) -> List[dict]:
+    """Parses exception.stack_details into a list of frame dicts (empty on failure)."""
+    stack_details_str = attrs.get("exception.stack_details", "")
+    if not stack_details_str:
+        return []
+    try:
+        frames = json.loads(stack_details_str)
+        return frames if isinstance(frames, list) else []
+    except json.JSONDecodeError:
+        return []
+
+
+def app_frames(frames: List[dict]) -> List[dict]:
+    """Returns only the frames that belong to the application (non-external files)."""
+    return [frame for frame in frames if frame.get("exception.is_file_external", "true") == "false"]
+
+
+def relative_app_path(file_path: str) -> str:
+    """Strips the deployment prefix (/srv/app/) from a traced file path."""
+    if "/srv/app/" in file_path:
+        return file_path.split("/srv/app/")[1]
+    return os.path.basename(file_path)
+
+
+def resolve_codebase_file(file_path: str, base_directory: str = "codebase") -> Optional[str]:
+    """Finds the codebase file matching a traced file path, by file name."""
+    if not file_path:
+        return None
+    matching_files = list(Path(base_directory).rglob(os.path.basename(file_path)))
+    return str(matching_files[0]) if matching_files else None
@@ -0,0 +1,36 @@
+import re
+
+# Validators finish their answer with one of these markers so that the
+# orchestration code can tell a passing fix from a failing one.
+VALIDATION_PASS = "VALIDATION: PASS"
+VALIDATION_FAIL = "VALIDATION: FAIL"
+
+_VERDICT_PATTERN = re.compile(r"VALIDATION:\s*(PASS|FAIL)", re.IGNORECASE)
+
+
+def validation_passed(text: str) -> bool:
+    """Returns True when the last validation marker in the text is PASS."""
+    verdicts = _VERDICT_PATTERN.findall(text or "")
+    return bool(verdicts) and verdicts[-1].upper() == "PASS"
+
+
+def validation_failed(text: str) -> bool:
+    """Returns True when the last validation marker in the text is FAIL."""
+    verdicts = _VERDICT_PATTERN.findall(text or "")
+    return bool(verdicts) and verdicts[-1].upper() == "FAIL"
+
+
+def check_python_syntax(file_path: str) -> str:
+    """
+    Compiles a Python file without executing it.
+    Returns an empty string when the file compiles, otherwise the error.
+    """
+    try:
+        from overlay_fs import read_text
+        source = read_text(file_path)
+        compile(source, file_path, "exec")
+        return ""
+    except SyntaxError as e:
+        return f"SyntaxError in {file_path} line {e.lineno}: {e.msg}"
+    except Exception as e:
+        return f"Error compiling {file_path}: {str(e)}"